@@ -0,0 +1,427 @@
+"""Benchmarks of the hot paths over growing synthetic corpora.
+
+Every case runs on seeded inputs from synthetic_corpus, so two runs on
+different commits see identical data. Per (case, size) the report holds the
+best and median wall time of the timed repeats, items per second and the
+peak traced Python allocation of one extra run under tracemalloc (kept out
+of the timings, since tracing slows allocation-heavy code several fold).
+
+    python benchmark.py --out before.json
+    python benchmark.py --compare before.json
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import synthetic_corpus
+from graph_metrics import compute_graph_statistics
+from graph_stats import (
+    build_recipe_csr_graph,
+    build_recipe_graph_final,
+    calculate_final_graph_statistics,
+    corpus_from_dataframe,
+)
+
+# the flavor / scoring code lives in recipe_flavors
+RECIPE_FLAVORS_SRC = Path(__file__).resolve().parents[1] / "recipe_flavors" / "src"
+sys.path.insert(0, str(RECIPE_FLAVORS_SRC))
+
+from batch_scorer import FlavorMatrix, score_recipes  # noqa: E402
+from export_many_recipes import (  # noqa: E402
+    compute_score_avg,
+    export_recipe_jsons,
+    heatmap_long,
+    ingredient_contributions,
+    load_flavor_edges,
+    load_recipes,
+)
+from flavor_network import artifact_dir, load_flavor_network  # noqa: E402
+from rating_calculation import RatingEngine  # noqa: E402
+from recipe_shards import export_shards  # noqa: E402
+
+REPORT_FORMAT = "benchmark-v1"
+DEFAULT_SIZES = [500, 2000, 10000]
+# flavor-network edges generated per recipe of the corpus size
+EDGES_PER_RECIPE = 2
+# relative slowdown reported as a regression by --compare
+REGRESSION_THRESHOLD = 0.10
+# ingredients scored per recipe, as export_many_recipes does
+EXPORT_MAX_LEN = 12
+
+
+@dataclass
+class Inputs:
+    """Generated files and parsed data for one corpus size"""
+
+    size: int
+    flavor_csv: Path
+    recipes_df: pd.DataFrame
+    cuisine_recipes: List[Dict]
+
+
+@dataclass
+class Case:
+    """A timed callable: setup (untimed) -> state, run(state) per repeat"""
+
+    name: str
+    setup: Callable[[Inputs], object]
+    run: Callable[[object], object]
+    items: Callable[[Inputs], int]
+    # called before every run, untimed (drops caches and artifacts)
+    reset: Optional[Callable[[object], None]] = None
+    # exact networkx paths are quadratic or worse; skip sizes above this
+    max_size: Optional[int] = None
+    # at most this many timed repeats (for the slowest cases)
+    max_repeat: Optional[int] = None
+
+
+def make_inputs(root: Path, size: int, ingredients: int, seed: int) -> Inputs:
+    names = synthetic_corpus.ingredient_names(ingredients, seed=seed)
+    out = root / str(size)
+    flavor_csv = synthetic_corpus.write_flavor_edges(
+        out / "flavor_edges.csv", names, EDGES_PER_RECIPE * size, seed=seed
+    )
+    recipes_csv = synthetic_corpus.write_recipes(out / "recipes_ner.csv", names, size, seed=seed)
+    cuisine_csv = synthetic_corpus.write_cuisine_recipes(
+        out / "recipes_cuisine.csv", names, size, seed=seed
+    )
+    return Inputs(
+        size=size,
+        flavor_csv=flavor_csv,
+        recipes_df=pd.read_csv(recipes_csv),
+        cuisine_recipes=load_recipes(cuisine_csv),
+    )
+
+
+def _score_all(score: Callable) -> Callable:
+    def run(state):
+        network, recipes = state
+        # keep the outputs alive, as the exporter does until it writes them
+        return [score(network, recipe["ingredients"]) for recipe in recipes]
+
+    return run
+
+
+def _scoring_setup(inputs: Inputs):
+    return load_flavor_edges(inputs.flavor_csv), inputs.cuisine_recipes
+
+
+def _compiled_flavor_csv(inputs: Inputs) -> Path:
+    load_flavor_network(inputs.flavor_csv)
+    return inputs.flavor_csv
+
+
+@dataclass
+class _Export:
+    """Scoring inputs of the exporters plus a scratch output directory"""
+
+    matrix: FlavorMatrix
+    recipes: List[Dict]
+    ingredients: List[List[str]]
+    out_dir: Path
+
+    def clear(self) -> None:
+        shutil.rmtree(self.out_dir, ignore_errors=True)
+        self.out_dir.mkdir(parents=True)
+
+
+def _export_setup(inputs: Inputs) -> _Export:
+    recipes = inputs.cuisine_recipes
+    return _Export(
+        FlavorMatrix(load_flavor_network(inputs.flavor_csv)),
+        recipes,
+        [r["ingredients"][:EXPORT_MAX_LEN] for r in recipes],
+        # inside the work directory, so it goes away with it
+        inputs.flavor_csv.parent / "export",
+    )
+
+
+def _score_recipes(state: _Export):
+    # drain the generator; the batches are what the exporters consume
+    return list(score_recipes(state.matrix, state.ingredients, max_len=EXPORT_MAX_LEN))
+
+
+def _rating_setup(inputs: Inputs):
+    engine = RatingEngine.from_scores(pd.read_csv(inputs.flavor_csv))
+    return engine, inputs.recipes_df["NER_Simple"]
+
+
+def _csr_graph(inputs: Inputs):
+    return build_recipe_csr_graph(corpus_from_dataframe(inputs.recipes_df))
+
+
+def _recipe_count(inputs: Inputs) -> int:
+    return inputs.size
+
+
+def _edge_count(inputs: Inputs) -> int:
+    return EDGES_PER_RECIPE * inputs.size
+
+
+CASES = [
+    Case(
+        "flavor.load_flavor_edges.compile",
+        setup=lambda inputs: inputs.flavor_csv,
+        run=load_flavor_edges,
+        items=_edge_count,
+        reset=lambda path: shutil.rmtree(artifact_dir(path), ignore_errors=True),
+    ),
+    Case(
+        "flavor.load_flavor_edges.cached",
+        setup=_compiled_flavor_csv,
+        run=load_flavor_edges,
+        items=_edge_count,
+    ),
+    Case("scoring.compute_score_avg", _scoring_setup, _score_all(compute_score_avg), _recipe_count),
+    Case("scoring.heatmap_long", _scoring_setup, _score_all(heatmap_long), _recipe_count),
+    Case(
+        "scoring.ingredient_contributions",
+        _scoring_setup,
+        _score_all(ingredient_contributions),
+        _recipe_count,
+    ),
+    # compute_recipe_rating's replacement: resolve + vectorised pair sums
+    Case(
+        "rating.rate_column",
+        setup=_rating_setup,
+        run=lambda state: state[0].rate_column(state[1]),
+        items=_recipe_count,
+        reset=lambda state: state[0].resolve.cache_clear(),
+    ),
+    # the vectorised replacements of the three cases above
+    Case(
+        "scoring.batch_scorer.score_recipes",
+        setup=_export_setup,
+        run=_score_recipes,
+        items=_recipe_count,
+    ),
+    Case(
+        "export.recipe_jsons",
+        setup=_export_setup,
+        run=lambda state: export_recipe_jsons(
+            state.recipes, state.ingredients, state.matrix, out_dir=state.out_dir
+        ),
+        items=_recipe_count,
+        reset=_Export.clear,
+        max_size=2000,
+    ),
+    Case(
+        "export.shards",
+        setup=_export_setup,
+        run=lambda state: export_shards(
+            state.out_dir, state.recipes, state.ingredients, state.matrix, workers=2
+        ),
+        items=_recipe_count,
+        reset=_Export.clear,
+    ),
+    Case(
+        "graph.build_recipe_graph_final",
+        setup=lambda inputs: inputs.recipes_df,
+        run=build_recipe_graph_final,
+        items=_recipe_count,
+        max_size=2000,
+    ),
+    Case(
+        "graph.calculate_final_graph_statistics",
+        setup=lambda inputs: build_recipe_graph_final(inputs.recipes_df),
+        run=calculate_final_graph_statistics,
+        items=_recipe_count,
+        max_size=500,
+        max_repeat=1,
+    ),
+    Case(
+        "graph.build_recipe_csr_graph",
+        setup=lambda inputs: corpus_from_dataframe(inputs.recipes_df),
+        run=build_recipe_csr_graph,
+        items=_recipe_count,
+        max_size=5000,
+    ),
+    Case(
+        "graph.compute_graph_statistics",
+        setup=_csr_graph,
+        run=compute_graph_statistics,
+        items=_recipe_count,
+        max_size=5000,
+    ),
+]
+
+
+def measure(case: Case, state, repeat: int) -> Dict:
+    """Best / median seconds of `repeat` runs and one traced run's peak"""
+    times = []
+    for _ in range(min(repeat, case.max_repeat or repeat)):
+        if case.reset:
+            case.reset(state)
+        gc.collect()
+        start = time.perf_counter()
+        case.run(state)
+        times.append(time.perf_counter() - start)
+
+    if case.reset:
+        case.reset(state)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        case.run(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "seconds_min": min(times),
+        "seconds_median": statistics.median(times),
+        "peak_traced_bytes": peak,
+    }
+
+
+def git_revision() -> Dict:
+    cwd = Path(__file__).resolve().parent
+
+    def git(*args):
+        try:
+            return subprocess.run(
+                ["git", *args], cwd=cwd, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(status) if status is not None else None}
+
+
+def run_benchmarks(
+    sizes: List[int],
+    cases: List[Case],
+    repeat: int,
+    ingredients: int,
+    seed: int,
+    work_dir: Path,
+    full: bool = False,
+) -> Dict:
+    results = []
+    for size in sizes:
+        # the code under test prints progress; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            inputs = make_inputs(work_dir, size, ingredients, seed)
+        for case in cases:
+            if case.max_size is not None and size > case.max_size and not full:
+                print(f"{case.name:<42} {size:>8}  skipped (> {case.max_size})")
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                state = case.setup(inputs)
+                timing = measure(case, state, repeat)
+            items = case.items(inputs)
+            result = {
+                "case": case.name,
+                "size": size,
+                "items": items,
+                "repeat": min(repeat, case.max_repeat or repeat),
+                **timing,
+                "items_per_second": items / timing["seconds_min"] if timing["seconds_min"] else None,
+            }
+            results.append(result)
+            print(
+                f"{case.name:<42} {size:>8}  {timing['seconds_min'] * 1000:>10.1f} ms"
+                f"  {timing['peak_traced_bytes'] / 2**20:>8.1f} MiB"
+            )
+    return {
+        "format": REPORT_FORMAT,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "seed": seed,
+        "ingredients": ingredients,
+        "edges_per_recipe": EDGES_PER_RECIPE,
+        "sizes": sizes,
+        "results": results,
+    }
+
+
+def compare(report: Dict, baseline: Dict, threshold: float = REGRESSION_THRESHOLD) -> int:
+    """Print time / memory ratios against a baseline; returns the regression count"""
+    old = {(r["case"], r["size"]): r for r in baseline["results"]}
+    if (baseline.get("seed"), baseline.get("ingredients")) != (report["seed"], report["ingredients"]):
+        print("Warning: baseline was generated with different inputs")
+    regressions = 0
+    print(f"\n{'case':<42} {'size':>8}  {'time':>7}  {'memory':>7}")
+    for r in report["results"]:
+        before = old.get((r["case"], r["size"]))
+        if before is None:
+            continue
+        time_ratio = r["seconds_min"] / before["seconds_min"]
+        memory_ratio = r["peak_traced_bytes"] / max(before["peak_traced_bytes"], 1)
+        flag = "  REGRESSION" if time_ratio > 1 + threshold else ""
+        regressions += bool(flag)
+        print(f"{r['case']:<42} {r['size']:>8}  {time_ratio:>6.2f}x  {memory_ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic corpora")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument(
+        "--cases", nargs="+", default=None, help="Case name prefixes to run (default: all)"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--ingredients", type=int, default=synthetic_corpus.DEFAULT_INGREDIENTS
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--full", action="store_true", help="Also run cases above their size cap"
+    )
+    parser.add_argument("--work-dir", type=Path, default=None, help="Keep generated inputs here")
+    parser.add_argument("--out", type=Path, default=Path("benchmark_results.json"))
+    parser.add_argument("--compare", type=Path, default=None, help="Baseline report to diff against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=REGRESSION_THRESHOLD,
+        help="Relative slowdown flagged as a regression",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    cases = [
+        c for c in CASES if args.cases is None or any(c.name.startswith(p) for p in args.cases)
+    ]
+    with contextlib.ExitStack() as stack:
+        work_dir = args.work_dir or Path(stack.enter_context(tempfile.TemporaryDirectory()))
+        report = run_benchmarks(
+            args.sizes, cases, args.repeat, args.ingredients, args.seed, work_dir, args.full
+        )
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Persistent, memory-mapped store of ingredient embeddings.
+
+Each (model, normalised ingredient string) pair is encoded at most once.
+Vectors are appended to a raw float32 file and read back through np.memmap,
+so later stages (DBSCAN, lookups) see them without loading a copy into RAM.
+
+Layout under <root>/<model slug>/:
+    vectors.f32   row-major float32 matrix, one row per key
+    keys.txt      one normalised ingredient per line, in row order
+    meta.json     {"model", "dim", "count"}; written last, so it is the
+                  commit point of every append
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from ingredient_normalizer import clean_text
+
+DEFAULT_ROOT = "embeddings"
+DEFAULT_MODEL = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
+
+
+def normalize_ingredient(text: str) -> str:
+    """Shared ingredient cleaning (see ingredient_normalizer.clean_text)"""
+    return clean_text(text)
+
+
+def _model_slug(model_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name)
+
+
+class EmbeddingStore:
+    """Append-only embedding matrix for one model"""
+
+    def __init__(self, root: str = DEFAULT_ROOT, model_name: str = DEFAULT_MODEL):
+        self.model_name = model_name
+        self.path = Path(root) / _model_slug(model_name)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._vectors_file = self.path / "vectors.f32"
+        self._keys_file = self.path / "keys.txt"
+        self._meta_file = self.path / "meta.json"
+
+        self.dim: Optional[int] = None
+        self.keys: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._load()
+
+    # ----------------------------
+    # Persistence
+    # ----------------------------
+
+    def _load(self) -> None:
+        if not self._meta_file.exists():
+            return
+        meta = json.loads(self._meta_file.read_text(encoding="utf-8"))
+        if meta["model"] != self.model_name:
+            raise ValueError(
+                f"{self.path} holds embeddings for {meta['model']}, not {self.model_name}"
+            )
+        self.dim = meta["dim"]
+        count = meta["count"]
+
+        with self._keys_file.open(encoding="utf-8") as f:
+            keys = [line.rstrip("\n") for line in f]
+        self.keys = keys[:count]
+        self._index = {k: i for i, k in enumerate(self.keys)}
+
+        # Drop anything appended after the last commit (interrupted run)
+        nbytes = count * self.dim * 4
+        if self._vectors_file.stat().st_size != nbytes:
+            with self._vectors_file.open("r+b") as f:
+                f.truncate(nbytes)
+        if len(keys) != count:
+            self._keys_file.write_text(
+                "".join(k + "\n" for k in self.keys), encoding="utf-8"
+            )
+
+    def _commit(self) -> None:
+        tmp = self._meta_file.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps({"model": self.model_name, "dim": self.dim, "count": len(self.keys)}),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self._meta_file)
+
+    def add(self, keys: Sequence[str], vectors: np.ndarray) -> None:
+        """Append already-normalised keys with their vectors"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(keys):
+            raise ValueError("vectors must be a (len(keys), dim) matrix")
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"expected {self.dim}-dimensional vectors, got {vectors.shape[1]}")
+
+        with self._vectors_file.open("ab") as f:
+            f.write(vectors.tobytes())
+        with self._keys_file.open("a", encoding="utf-8") as f:
+            f.writelines(k + "\n" for k in keys)
+        for k in keys:
+            self._index[k] = len(self.keys)
+            self.keys.append(k)
+        self._commit()
+
+    # ----------------------------
+    # Lookups
+    # ----------------------------
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def vectors(self) -> np.ndarray:
+        """All stored vectors as a read-only memmap (no copy)"""
+        if not self.keys:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return np.memmap(
+            self._vectors_file, dtype=np.float32, mode="r", shape=(len(self.keys), self.dim)
+        )
+
+    def rows(self, keys: Iterable[str]) -> np.ndarray:
+        return np.fromiter((self._index[k] for k in keys), dtype=np.int64)
+
+    def vectors_for(self, keys: Sequence[str]) -> np.ndarray:
+        """Vectors for keys; a zero-copy memmap slice when they are stored contiguously"""
+        rows = self.rows(keys)
+        if len(rows) and np.array_equal(rows, np.arange(rows[0], rows[0] + len(rows))):
+            return self.vectors()[rows[0] : rows[0] + len(rows)]
+        return self.vectors()[rows]
+
+    # ----------------------------
+    # Encoding
+    # ----------------------------
+
+    def encode_missing(
+        self,
+        strings: Iterable[str],
+        encode: Callable[[List[str]], np.ndarray],
+        batch_size: int = 512,
+    ) -> List[str]:
+        """Normalise strings, encode only unseen ones in batches, return the keys.
+
+        Every batch is committed as soon as it is encoded, so an interrupted
+        run keeps its progress.
+        """
+        keys = list(dict.fromkeys(normalize_ingredient(s) for s in strings))
+        missing = [k for k in keys if k not in self._index]
+        if missing:
+            print(f"Encoding {len(missing)} new of {len(keys)} ingredients ({len(self)} cached)")
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start : start + batch_size]
+            self.add(batch, encode(batch))
+        return keys
+
+
+def sentence_transformer_encoder(model_name: str = DEFAULT_MODEL, batch_size: int = 50):
+    """Encoder callable backed by sentence-transformers, loaded lazily"""
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name)
+
+    def encode(batch: List[str]) -> np.ndarray:
+        return model.encode(batch, batch_size=batch_size, show_progress_bar=False)
+
+    return encode
+
+
+def embed_ingredients(
+    strings: Iterable[str],
+    model_name: str = DEFAULT_MODEL,
+    root: str = DEFAULT_ROOT,
+    batch_size: int = 512,
+):
+    """Keys and memmapped vectors for strings, encoding only what is not cached"""
+    store = EmbeddingStore(root, model_name)
+    strings = list(strings)
+    keys = [normalize_ingredient(s) for s in strings]
+    if any(k not in store for k in keys):
+        encoder = sentence_transformer_encoder(model_name)
+        store.encode_missing(keys, encoder, batch_size=batch_size)
+    keys = list(dict.fromkeys(keys))
+    return keys, store.vectors_for(keys)
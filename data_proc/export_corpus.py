@@ -0,0 +1,256 @@
+"""Columnar, dictionary-encoded recipe corpus for the vis front-end.
+
+Replaces the recipes.json dump (JSON-encoded lists inside JSON, fetched and
+parsed in full) with flat typed arrays the browser can wrap without parsing:
+
+Layout under <out>/:
+    manifest.json           {"format", "count", "seed", "stratify", "vocab",
+                            "id_dtype", "details_block", "details_offsets",
+                            "files"}; vocab[i] is ingredient ID i
+    ingredient_sizes.u8.gz  ingredient count of every recipe
+    ingredient_ids.u16.gz   ingredient IDs of all recipes back to back
+                            (.u32.gz when the vocabulary outgrows uint16)
+    titles.txt.gz           one title per line, in recipe order
+    details.jsonl           {"index", "link", "directions"} per line, index being
+                            the CSV row; recipes come in blocks of details_block
+                            lines starting at the byte offsets details_offsets,
+                            so the app fetches one block with a Range request
+
+The .gz columns are everything the app needs up front; they are gzipped here
+and inflated in the browser, so transfer stays small without server-side
+compression. Binary columns are little-endian.
+
+The sample is drawn in two passes over the CSV: the first only reads the
+stratification column, the second keeps the selected rows.
+"""
+
+import argparse
+import gzip
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from graph_stats import parse_ingredients
+from instrumentation import add_arguments as add_instrumentation_arguments
+from instrumentation import stage, start_run
+
+FORMAT = "recipe-columns-v1"
+DEFAULT_OUT = Path(__file__).parent.parent / "vis" / "public" / "corpus"
+DEFAULT_CHUNK_SIZE = 50_000
+
+INDEX_COLUMN = "Unnamed: 0"
+CORPUS_COLUMNS = [INDEX_COLUMN, "title", "directions", "link", "NER_Simple"]
+
+# ingredient counts above this share one stratum
+MAX_SIZE_STRATUM = 20
+
+# ingredients kept per recipe (sizes are stored as uint8)
+MAX_INGREDIENTS = 255
+
+# recipes per Range-fetchable block of details.jsonl
+DETAILS_BLOCK = 256
+
+
+def _size_strata(chunk: pd.DataFrame) -> np.ndarray:
+    sizes = [len(parse_ingredients(x)) for x in chunk["NER_Simple"]]
+    return np.minimum(np.asarray(sizes, dtype=np.int64), MAX_SIZE_STRATUM).astype(str)
+
+
+def read_strata(file_path, stratify: str, chunksize: int = DEFAULT_CHUNK_SIZE) -> np.ndarray:
+    """Stratum label of every CSV row ("size", "none" or a column name)"""
+    if stratify == "none":
+        n = sum(len(c) for c in pd.read_csv(file_path, usecols=[INDEX_COLUMN], chunksize=chunksize))
+        return np.zeros(n, dtype=str)
+    column = "NER_Simple" if stratify == "size" else stratify
+    labels = []
+    for chunk in pd.read_csv(file_path, usecols=[column], chunksize=chunksize):
+        if stratify == "size":
+            labels.append(_size_strata(chunk))
+        else:
+            labels.append(chunk[column].fillna("").astype(str).to_numpy())
+    return np.concatenate(labels) if labels else np.zeros(0, dtype=str)
+
+
+def stratified_sample(labels: np.ndarray, size: Optional[int], seed: int = 0) -> np.ndarray:
+    """Row numbers of a seeded, proportionally stratified sample, in random order.
+
+    Every stratum gets its share of `size` (largest remainder rounding) and
+    contributes its rows with the smallest random keys. size=None keeps all
+    rows, shuffled.
+    """
+    n = len(labels)
+    keys = np.random.default_rng(seed).random(n)
+    if size is None or size >= n:
+        return np.argsort(keys, kind="stable")
+
+    strata, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    exact = counts * size / n
+    quota = np.floor(exact).astype(np.int64)
+    short = size - quota.sum()
+    quota[np.argsort(-(exact - quota), kind="stable")[:short]] += 1
+
+    # order rows by (stratum, key); each stratum keeps its first `quota` rows
+    order = np.lexsort((keys, inverse))
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n) - np.repeat(starts, counts)
+    chosen = np.flatnonzero(rank < quota[inverse])
+    return chosen[np.argsort(keys[chosen], kind="stable")]
+
+
+def _steps(raw) -> List[str]:
+    if pd.isna(raw):
+        return []
+    try:
+        return [str(step) for step in json.loads(raw)]
+    except ValueError:
+        return [str(raw)]
+
+
+def _single_line(text) -> str:
+    return "" if pd.isna(text) else " ".join(str(text).split())
+
+
+def read_rows(file_path, rows: np.ndarray, chunksize: int = DEFAULT_CHUNK_SIZE) -> pd.DataFrame:
+    """The selected CSV rows, in the order given by `rows`"""
+    wanted = np.zeros(rows.max() + 1 if len(rows) else 0, dtype=bool)
+    wanted[rows] = True
+    parts = []
+    offset = 0
+    for chunk in pd.read_csv(file_path, usecols=CORPUS_COLUMNS, chunksize=chunksize):
+        end = offset + len(chunk)
+        mask = wanted[offset:end]
+        if mask.any():
+            part = chunk.iloc[np.flatnonzero(mask)]
+            parts.append(part.set_axis(np.flatnonzero(mask) + offset))
+        offset = end
+        if offset >= len(wanted):
+            break
+    selected = pd.concat(parts) if parts else pd.DataFrame(columns=CORPUS_COLUMNS)
+    return selected.loc[rows]
+
+
+def _write_gzip(path: Path, data: bytes) -> None:
+    # mtime=0 keeps the artifacts byte-identical across runs
+    path.write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+
+
+def write_corpus(recipes: pd.DataFrame, out_dir: Path, seed: int, stratify: str) -> Dict:
+    vocabulary: Dict[str, int] = {}
+    ids: List[int] = []
+    sizes = np.zeros(len(recipes), dtype=np.uint8)
+    for r, ner_simple in enumerate(recipes["NER_Simple"]):
+        ingredients = parse_ingredients(ner_simple)[:MAX_INGREDIENTS]
+        for ingredient in ingredients:
+            ids.append(vocabulary.setdefault(ingredient, len(vocabulary)))
+        sizes[r] = len(ingredients)
+
+    id_dtype = "uint16" if len(vocabulary) <= 0xFFFF else "uint32"
+    ids_file = "ingredient_ids.u16.gz" if id_dtype == "uint16" else "ingredient_ids.u32.gz"
+
+    details = []
+    block_offsets = [0]
+    size = 0
+    rows = zip(recipes[INDEX_COLUMN], recipes["link"], recipes["directions"])
+    for r, (index, link, directions) in enumerate(rows):
+        record = {"index": int(index), "link": _single_line(link), "directions": _steps(directions)}
+        details.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+        size += len(details[-1])
+        if (r + 1) % DETAILS_BLOCK == 0 or r + 1 == len(recipes):
+            block_offsets.append(size)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    _write_gzip(out_dir / "ingredient_sizes.u8.gz", sizes.tobytes())
+    _write_gzip(
+        out_dir / ids_file,
+        np.asarray(ids, dtype="<u2" if id_dtype == "uint16" else "<u4").tobytes(),
+    )
+    _write_gzip(
+        out_dir / "titles.txt.gz",
+        "\n".join(_single_line(x) for x in recipes["title"]).encode("utf-8"),
+    )
+    (out_dir / "details.jsonl").write_bytes(b"".join(details))
+
+    manifest = {
+        "format": FORMAT,
+        "count": len(recipes),
+        "seed": seed,
+        "stratify": stratify,
+        "vocab": list(vocabulary),
+        "id_dtype": id_dtype,
+        "details_block": DETAILS_BLOCK,
+        "details_offsets": block_offsets,
+        "files": {
+            "ingredient_sizes": "ingredient_sizes.u8.gz",
+            "ingredient_ids": ids_file,
+            "titles": "titles.txt.gz",
+            "details": "details.jsonl",
+        },
+    }
+    (out_dir / "manifest.json").write_text(
+        json.dumps(manifest, ensure_ascii=False, separators=(",", ":")), encoding="utf-8"
+    )
+    return manifest
+
+
+def export_corpus(
+    file_path,
+    out_dir: Path = DEFAULT_OUT,
+    sample: Optional[int] = None,
+    seed: int = 0,
+    stratify: str = "size",
+    chunksize: int = DEFAULT_CHUNK_SIZE,
+) -> Dict:
+    with stage("corpus.strata", unit="recipes") as span:
+        labels = read_strata(file_path, stratify, chunksize=chunksize)
+        rows = stratified_sample(labels, sample, seed=seed)
+        span.advance(len(labels))
+    print(f"Sampled {len(rows)} of {len(labels)} recipes ({len(np.unique(labels))} strata by {stratify})")
+    with stage("corpus.read_rows", total=len(rows), unit="recipes") as span:
+        recipes = read_rows(file_path, rows, chunksize=chunksize)
+        span.advance(len(recipes))
+    with stage("corpus.write", unit="recipes") as span:
+        manifest = write_corpus(recipes, Path(out_dir), seed, stratify)
+        span.advance(manifest["count"])
+    files = [Path(out_dir) / "manifest.json"] + [Path(out_dir) / f for f in manifest["files"].values()]
+    total = sum(f.stat().st_size for f in files)
+    eager = total - (Path(out_dir) / manifest["files"]["details"]).stat().st_size
+    print(
+        f"Wrote {manifest['count']} recipes, {len(manifest['vocab'])} ingredients, "
+        f"{total / 1e6:.2f} MB ({eager / 1e6:.2f} MB loaded up front) to {out_dir}"
+    )
+    return manifest
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Columnar recipe corpus for the vis app")
+    parser.add_argument("--input", default="simplified_dataset.csv")
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT)
+    parser.add_argument(
+        "--sample", type=int, default=None, help="Recipes to keep (default: all)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--stratify",
+        default="size",
+        help='"size" (ingredient count), "none", or a CSV column name',
+    )
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNK_SIZE)
+    add_instrumentation_arguments(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    start_run("export_corpus", args)
+    export_corpus(
+        args.input,
+        out_dir=args.out,
+        sample=args.sample,
+        seed=args.seed,
+        stratify=args.stratify,
+        chunksize=args.chunksize,
+    )
@@ -0,0 +1,446 @@
+"""Recipe-graph statistics maintained incrementally as recipes are appended.
+
+The recipe graph links every two recipes sharing an ingredient. Instead of
+rebuilding it on every run, the state below is persisted and updated per
+batch of new recipes:
+
+    postings      ingredient -> recipes using it (the inverted index)
+    degree        degree of every recipe
+    union-find    parent / size per recipe, plus a count of component sizes
+    edge_count    number of distinct recipe pairs sharing an ingredient
+
+A new recipe's edges to earlier recipes come from one sparse product of the
+batch incidence with the postings of the batch's ingredients only, so an
+update costs the batch size plus the edges it creates. Components need even
+less: a recipe is unioned with one representative recipe per ingredient.
+
+Node/edge counts, degrees, density and the component size distribution are
+therefore always exact. The sampled metrics (clustering, betweenness,
+diameter, radius) are recomputed on the full graph only once the recipes
+added since their last computation exceed `staleness` times the recipe count
+at that time; until then their last values are reported with their age.
+
+Layout under <root>/:
+    recipe_ids.txt     one recipe ID per line (append-only)
+    vocabulary.txt     one ingredient per line; line number = ingredient ID
+    ingredient_ids.i32 raw ingredient IDs of all recipes back to back
+    recipe_sizes.i32   ingredient count of every recipe
+    state.npz          degree, union-find, representatives, counters; written
+                       last, so it is the commit point of every update
+    sampled.json       last sampled metrics and the recipe count they saw
+
+Updates cost the batch, but loading does not: the postings are not stored,
+so load() reads all of ingredient_ids.i32 and rebuilds them with one stable
+sort, O(E log E) for E (recipe, ingredient) entries. Storing them would not
+avoid the full read, since the corpus view needs every ingredient ID anyway.
+"""
+
+import json
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import scipy.sparse as sp
+
+# sampled metrics kept between full recomputations
+SAMPLED_METRICS = (
+    "average_clustering_coefficient",
+    "max_betweenness_centrality",
+    "avg_betweenness_centrality",
+    "diameter",
+    "radius",
+)
+
+# Upper bound on postings entries touched per sparse product
+PRODUCT_BUDGET = 1 << 24
+
+
+def _grow(array: np.ndarray, size: int, fill) -> np.ndarray:
+    """array with room for at least `size` entries (capacity doubling)"""
+    if size <= len(array):
+        return array
+    grown = np.full(max(size, 2 * len(array), 16), fill, dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+class IncrementalGraphState:
+    """Persistent inverted index, degrees and components of the recipe graph"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.recipe_ids: List[str] = []
+        self.vocabulary: List[str] = []
+        self._vocab_index: Dict[str, int] = {}
+        self._id_chunks: List[np.ndarray] = []
+        self._size_chunks: List[np.ndarray] = []
+
+        self.degree = np.zeros(0, dtype=np.int64)
+        self.parent = np.zeros(0, dtype=np.int64)
+        self.component_size = np.zeros(0, dtype=np.int64)
+        # first recipe seen with each ingredient; new users are unioned with it
+        self.representative = np.zeros(0, dtype=np.int64)
+        self.ingredient_counts = np.zeros(0, dtype=np.int64)
+        self.component_sizes: Counter = Counter()
+        self.edge_count = 0
+        self.max_degree = 0
+
+        self.postings: List[np.ndarray] = []
+        self.posting_lengths = np.zeros(0, dtype=np.int64)
+
+        self.sampled: Dict = {}
+        self.sampled_at = 0
+
+        # appended since the last save
+        self._pending_ids: List[np.ndarray] = []
+        self._pending_sizes: List[np.ndarray] = []
+        self._saved_recipes = 0
+        self._saved_entries = 0
+        self._saved_vocabulary = 0
+
+    def __len__(self) -> int:
+        return len(self.recipe_ids)
+
+    # ----------------------------
+    # Persistence
+    # ----------------------------
+
+    @classmethod
+    def load(cls, root) -> "IncrementalGraphState":
+        state = cls(root)
+        state.root.mkdir(parents=True, exist_ok=True)
+        state_file = state.root / "state.npz"
+        if not state_file.exists():
+            return state
+
+        with np.load(state_file) as data:
+            n = int(data["recipes"])
+            entries = int(data["entries"])
+            vocab_size = int(data["vocabulary"])
+            state.degree = data["degree"]
+            state.parent = data["parent"]
+            state.component_size = data["component_size"]
+            state.representative = data["representative"]
+            state.ingredient_counts = data["ingredient_counts"]
+            sizes, counts = data["component_sizes"]
+            state.component_sizes = Counter(dict(zip(sizes.tolist(), counts.tolist())))
+            state.edge_count = int(data["edge_count"])
+            state.max_degree = int(data["max_degree"])
+
+        # Drop anything appended after the last commit (interrupted run)
+        state.recipe_ids = state._read_lines("recipe_ids.txt", n)
+        state.vocabulary = state._read_lines("vocabulary.txt", vocab_size)
+        state._vocab_index = {name: i for i, name in enumerate(state.vocabulary)}
+        sizes = state._read_array("recipe_sizes.i32", n)
+        ids = state._read_array("ingredient_ids.i32", entries)
+        state._size_chunks = [sizes]
+        state._id_chunks = [ids]
+        state._saved_recipes = n
+        state._saved_entries = entries
+        state._saved_vocabulary = vocab_size
+
+        # The inverted index is rebuilt with one stable sort rather than stored
+        # (see the module docstring); recipes stay ascending per ingredient
+        order = np.argsort(ids, kind="stable")
+        ingredients = ids[order]
+        recipes = np.repeat(np.arange(n, dtype=np.int64), sizes)[order]
+        # an ingredient repeated within a recipe is now adjacent
+        first = np.ones(len(ids), dtype=bool)
+        first[1:] = (ingredients[1:] != ingredients[:-1]) | (recipes[1:] != recipes[:-1])
+        ingredients, recipes = ingredients[first], recipes[first]
+        lengths = np.bincount(ingredients, minlength=vocab_size)
+        state.postings = np.split(recipes, np.cumsum(lengths)[:-1]) if vocab_size else []
+        state.posting_lengths = lengths.astype(np.int64)
+
+        sampled_file = state.root / "sampled.json"
+        if sampled_file.exists():
+            sampled = json.loads(sampled_file.read_text(encoding="utf-8"))
+            state.sampled = sampled["metrics"]
+            state.sampled_at = sampled["recipes"]
+        return state
+
+    def _read_lines(self, name: str, count: int) -> List[str]:
+        path = self.root / name
+        if not path.exists():
+            return []
+        with path.open(encoding="utf-8") as f:
+            lines = [line.rstrip("\n") for line in f]
+        if len(lines) != count:
+            lines = lines[:count]
+            path.write_text("".join(x + "\n" for x in lines), encoding="utf-8")
+        return lines
+
+    def _read_array(self, name: str, count: int) -> np.ndarray:
+        path = self.root / name
+        if not path.exists():
+            return np.zeros(0, dtype=np.int32)
+        if path.stat().st_size != count * 4:
+            with path.open("r+b") as f:
+                f.truncate(count * 4)
+        return np.fromfile(path, dtype=np.int32)
+
+    def save(self) -> None:
+        n = len(self)
+        with (self.root / "recipe_ids.txt").open("a", encoding="utf-8") as f:
+            f.writelines(x + "\n" for x in self.recipe_ids[self._saved_recipes :])
+        with (self.root / "vocabulary.txt").open("a", encoding="utf-8") as f:
+            f.writelines(x + "\n" for x in self.vocabulary[self._saved_vocabulary :])
+        with (self.root / "ingredient_ids.i32").open("ab") as f:
+            f.writelines(chunk.tobytes() for chunk in self._pending_ids)
+        with (self.root / "recipe_sizes.i32").open("ab") as f:
+            f.writelines(chunk.tobytes() for chunk in self._pending_sizes)
+        entries = self._saved_entries + sum(len(c) for c in self._pending_ids)
+
+        v = len(self.vocabulary)
+        component_sizes = sorted(self.component_sizes)
+        tmp = self.root / "state.tmp.npz"
+        np.savez(
+            tmp,
+            recipes=n,
+            entries=entries,
+            vocabulary=v,
+            degree=self.degree[:n],
+            parent=self.parent[:n],
+            component_size=self.component_size[:n],
+            representative=self.representative[:v],
+            ingredient_counts=self.ingredient_counts[:v],
+            component_sizes=np.array(
+                [component_sizes, [self.component_sizes[s] for s in component_sizes]],
+                dtype=np.int64,
+            ).reshape(2, -1),
+            edge_count=self.edge_count,
+            max_degree=self.max_degree,
+        )
+        os.replace(tmp, self.root / "state.npz")
+
+        self._pending_ids, self._pending_sizes = [], []
+        self._saved_recipes = n
+        self._saved_entries = entries
+        self._saved_vocabulary = v
+
+        tmp = self.root / "sampled.tmp"
+        tmp.write_text(
+            json.dumps({"recipes": self.sampled_at, "metrics": self.sampled}), encoding="utf-8"
+        )
+        os.replace(tmp, self.root / "sampled.json")
+
+    # ----------------------------
+    # Corpus view (RecipeCorpus fields)
+    # ----------------------------
+
+    @staticmethod
+    def _merged(chunks: List[np.ndarray]) -> np.ndarray:
+        if len(chunks) != 1:
+            chunks[:] = [np.concatenate(chunks) if chunks else np.zeros(0, np.int32)]
+        return chunks[0]
+
+    @property
+    def ingredient_ids(self) -> np.ndarray:
+        return self._merged(self._id_chunks)
+
+    @property
+    def recipe_sizes(self) -> np.ndarray:
+        return self._merged(self._size_chunks)
+
+    @property
+    def indptr(self) -> np.ndarray:
+        sizes = self.recipe_sizes
+        indptr = np.zeros(len(sizes) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=indptr[1:])
+        return indptr
+
+    # ----------------------------
+    # Updates
+    # ----------------------------
+
+    def _find(self, x: int) -> int:
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def _union(self, a: int, b: int) -> None:
+        a, b = self._find(a), self._find(b)
+        if a == b:
+            return
+        sa, sb = self.component_size[a], self.component_size[b]
+        if sa < sb:
+            a, b = b, a
+        self.parent[b] = a
+        self.component_size[a] = sa + sb
+        for s in (int(sa), int(sb)):
+            self.component_sizes[s] -= 1
+            if not self.component_sizes[s]:
+                del self.component_sizes[s]
+        self.component_sizes[int(sa + sb)] += 1
+
+    def _encode(self, vocabulary: List[str], ids: np.ndarray) -> np.ndarray:
+        """Map a batch's own ingredient IDs onto the state's vocabulary"""
+        mapping = np.empty(len(vocabulary), dtype=np.int64)
+        for i, name in enumerate(vocabulary):
+            j = self._vocab_index.get(name)
+            if j is None:
+                j = self._vocab_index[name] = len(self.vocabulary)
+                self.vocabulary.append(name)
+            mapping[i] = j
+        return mapping[ids] if len(ids) else np.zeros(0, dtype=np.int64)
+
+    def _gather_postings(self, ingredients: np.ndarray) -> sp.csr_matrix:
+        """(len(ingredients) x n_old) incidence rows of the given ingredients"""
+        lengths = self.posting_lengths[ingredients]
+        indptr = np.zeros(len(ingredients) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        indices = (
+            np.concatenate([self.postings[i][: lengths[k]] for k, i in enumerate(ingredients)])
+            if len(ingredients)
+            else np.zeros(0, dtype=np.int64)
+        )
+        return sp.csr_matrix(
+            (np.ones(len(indices), dtype=np.int32), indices, indptr),
+            shape=(len(ingredients), len(self)),
+        )
+
+    def append(self, corpus) -> None:
+        """Add a RecipeCorpus-shaped batch (recipe_ids, indptr, ingredient_ids,
+        vocabulary) of new recipes and update every exact statistic."""
+        b = len(corpus.recipe_ids)
+        if b == 0:
+            return
+        n_old = len(self)
+        n = n_old + b
+        raw_ids = self._encode(corpus.vocabulary, np.asarray(corpus.ingredient_ids))
+        sizes = np.diff(np.asarray(corpus.indptr)).astype(np.int32)
+        v = len(self.vocabulary)
+
+        self.recipe_ids.extend(corpus.recipe_ids)
+        self._id_chunks.append(raw_ids.astype(np.int32))
+        self._size_chunks.append(sizes)
+        self._pending_ids.append(self._id_chunks[-1])
+        self._pending_sizes.append(sizes)
+        self.ingredient_counts = _grow(self.ingredient_counts, v, 0)
+        self.ingredient_counts[:v] += np.bincount(raw_ids, minlength=v)
+
+        # batch incidence over the batch's distinct ingredients
+        batch = sp.csr_matrix(
+            (np.ones(len(raw_ids), dtype=np.int32), raw_ids, np.asarray(corpus.indptr)),
+            shape=(b, v),
+        )
+        batch.sum_duplicates()
+        batch.data[:] = 1
+        used = np.unique(batch.indices)
+        local = sp.csr_matrix(batch[:, used])
+
+        self.degree = _grow(self.degree, n, 0)
+        self.parent = _grow(self.parent, n, 0)
+        self.component_size = _grow(self.component_size, n, 0)
+        self.representative = _grow(self.representative, v, -1)
+        self.posting_lengths = _grow(self.posting_lengths, v, 0)
+        self.postings.extend(np.zeros(0, dtype=np.int64) for _ in range(v - len(self.postings)))
+
+        # Edges to earlier recipes: batch rows x postings of their ingredients,
+        # in row chunks that keep the product within PRODUCT_BUDGET
+        old_users = self.posting_lengths[used]
+        if n_old and old_users.sum():
+            postings = self._gather_postings(used)
+            cost = np.asarray(local @ old_users.reshape(-1, 1)).ravel()
+            start = 0
+            while start < b:
+                end = start + 1 + int(np.searchsorted(np.cumsum(cost[start:]), PRODUCT_BUDGET))
+                end = min(end, b)
+                cross = local[start:end] @ postings
+                self.degree[n_old + start : n_old + end] += np.diff(cross.indptr)
+                touched, counts = np.unique(cross.indices, return_counts=True)
+                self.degree[touched] += counts
+                if len(touched):
+                    self.max_degree = max(self.max_degree, int(self.degree[touched].max()))
+                self.edge_count += cross.nnz
+                start = end
+
+        # Edges inside the batch
+        within = sp.triu(batch @ batch.T, k=1, format="csr")
+        within.eliminate_zeros()
+        self.edge_count += within.nnz
+        self.degree[n_old:n] += np.diff(within.indptr)
+        self.degree[n_old:n] += np.bincount(within.indices, minlength=b)
+        self.max_degree = max(self.max_degree, int(self.degree[n_old:n].max()))
+
+        # Components: union each new recipe with one earlier user per ingredient
+        self.parent[n_old:n] = np.arange(n_old, n)
+        self.component_size[n_old:n] = 1
+        self.component_sizes[1] += b
+        for r in range(b):
+            recipe = n_old + r
+            for ingredient in batch.indices[batch.indptr[r] : batch.indptr[r + 1]].tolist():
+                rep = self.representative[ingredient]
+                if rep < 0:
+                    self.representative[ingredient] = recipe
+                else:
+                    self._union(recipe, int(rep))
+
+        # Inverted index
+        rows = np.repeat(np.arange(n_old, n, dtype=np.int64), np.diff(batch.indptr))
+        order = np.argsort(batch.indices, kind="stable")
+        ingredients, starts = np.unique(batch.indices[order], return_index=True)
+        for ingredient, users in zip(ingredients.tolist(), np.split(rows[order], starts[1:])):
+            length = self.posting_lengths[ingredient]
+            posting = _grow(self.postings[ingredient], length + len(users), -1)
+            posting[length : length + len(users)] = users
+            self.postings[ingredient] = posting
+            self.posting_lengths[ingredient] = length + len(users)
+
+    # ----------------------------
+    # Statistics
+    # ----------------------------
+
+    def is_stale(self, staleness: float) -> bool:
+        """Whether the sampled metrics should be recomputed"""
+        if not self.sampled:
+            return len(self) > 0
+        return len(self) - self.sampled_at > staleness * self.sampled_at
+
+    def set_sampled(self, stats: Dict) -> None:
+        self.sampled = {
+            k: stats[k]
+            for k in SAMPLED_METRICS + ("metric_estimates", "max_ingredient_fraction")
+            if k in stats
+        }
+        self.sampled_at = len(self)
+
+    def statistics(self) -> Dict:
+        """Exact counts from the incremental state plus the last sampled metrics"""
+        n = len(self)
+        distribution = sorted(self.component_sizes.elements(), reverse=True)
+        stats = {
+            "node_count": n,
+            "edge_count": self.edge_count,
+            "average_node_degree": 2 * self.edge_count / n if n else 0,
+            "density": 2 * self.edge_count / (n * (n - 1)) if n > 1 else 0,
+            "connected_components_count": len(distribution),
+            "largest_component_size": distribution[0] if distribution else 0,
+            "component_size_distribution": distribution,
+            "max_degree_centrality": self.max_degree / (n - 1) if n > 1 else 0,
+            "avg_degree_centrality": 2 * self.edge_count / (n * (n - 1)) if n > 1 else 0,
+        }
+        stats.update(self.sampled)
+        stats["sampled_metrics_recipes"] = self.sampled_at
+        stats["sampled_metrics_stale_recipes"] = n - self.sampled_at
+        return stats
+
+
+def update_state(
+    state: IncrementalGraphState, batch, staleness: float, recompute: Optional[callable] = None
+) -> Dict:
+    """Append batch, refresh sampled metrics through recompute(state) when
+    stale, persist and return the statistics."""
+    state.append(batch)
+    if recompute is not None and state.is_stale(staleness):
+        print(
+            f"Sampled metrics are stale ({len(state) - state.sampled_at} new recipes since "
+            f"{state.sampled_at}); recomputing"
+        )
+        state.set_sampled(recompute(state))
+    state.save()
+    return state.statistics()
@@ -0,0 +1,434 @@
+"""Sampled graph statistics on a compact CSR representation.
+
+Every metric is returned as a MetricEstimate carrying its estimate, an error
+bound (half-width of a 95% confidence interval for sampled metrics, or the
+gap between proven lower/upper bounds for diameter and radius) and the wall
+time spent, so runs can trade accuracy for runtime explicitly.
+
+BFS and betweenness work is sharded over a process pool; each worker receives
+the CSR arrays once through the pool initializer.
+"""
+
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+
+# z-value of a two-sided 95% confidence interval
+Z_95 = 1.96
+
+
+@dataclass
+class CSRGraph:
+    """Undirected, unweighted graph stored as a symmetric CSR adjacency"""
+
+    adjacency: sp.csr_matrix
+    node_ids: List[str]
+
+    @classmethod
+    def from_networkx(cls, G: nx.Graph) -> "CSRGraph":
+        node_ids = list(G.nodes())
+        adjacency = nx.to_scipy_sparse_array(
+            G, nodelist=node_ids, weight=None, dtype=np.int8, format="csr"
+        )
+        return cls.from_adjacency(adjacency, node_ids)
+
+    @classmethod
+    def from_adjacency(cls, adjacency, node_ids: Sequence[str]) -> "CSRGraph":
+        """Build from any (possibly triangular or weighted) sparse adjacency"""
+        adjacency = sp.csr_matrix(adjacency)
+        adjacency = adjacency + adjacency.T
+        adjacency.setdiag(0)
+        adjacency.eliminate_zeros()
+        adjacency.data = np.ones(len(adjacency.data), dtype=np.int8)
+        adjacency.sort_indices()
+        return cls(adjacency=adjacency.tocsr(), node_ids=list(node_ids))
+
+    @property
+    def node_count(self) -> int:
+        return self.adjacency.shape[0]
+
+    @property
+    def edge_count(self) -> int:
+        return self.adjacency.nnz // 2
+
+    def degrees(self) -> np.ndarray:
+        return np.diff(self.adjacency.indptr)
+
+    def subgraph(self, nodes: np.ndarray) -> "CSRGraph":
+        sub = self.adjacency[nodes][:, nodes].tocsr()
+        return CSRGraph(adjacency=sub, node_ids=[self.node_ids[i] for i in nodes])
+
+
+@dataclass
+class MetricEstimate:
+    estimate: float
+    error_bound: float
+    seconds: float
+    method: str
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass
+class StatisticsConfig:
+    """Accuracy / runtime knobs for compute_graph_statistics"""
+
+    seed: int = 0
+    workers: int = 1
+    clustering_samples: int = 1000
+    betweenness_samples: int = 100
+    # Maximum number of BFS runs spent tightening the diameter bounds
+    diameter_bfs_budget: int = 1000
+
+
+# ----------------------------
+# Process pool plumbing
+# ----------------------------
+
+_worker_adjacency: Optional[sp.csr_matrix] = None
+
+
+def _init_worker(data, indices, indptr, shape) -> None:
+    global _worker_adjacency
+    _worker_adjacency = sp.csr_matrix((data, indices, indptr), shape=shape)
+
+
+def _shards(items: np.ndarray, shard_count: int) -> List[np.ndarray]:
+    return [s for s in np.array_split(items, shard_count) if len(s)]
+
+
+def _run_sharded(
+    func: Callable, adjacency: sp.csr_matrix, items: np.ndarray, workers: int
+) -> List:
+    """Apply func to shards of items, in-process or across a process pool"""
+    if workers <= 1 or len(items) < 2:
+        _init_worker(adjacency.data, adjacency.indices, adjacency.indptr, adjacency.shape)
+        return [func(items)]
+
+    shards = _shards(items, workers * 4)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(adjacency.data, adjacency.indices, adjacency.indptr, adjacency.shape),
+    ) as pool:
+        return list(pool.map(func, shards))
+
+
+# ----------------------------
+# Worker tasks
+# ----------------------------
+
+
+def _eccentricities(sources: np.ndarray) -> np.ndarray:
+    """Eccentricity of each source (graph must be connected)"""
+    adjacency = _worker_adjacency
+    n = adjacency.shape[0]
+    # Bound the dense distance block to ~32 MB
+    batch = max(1, (1 << 22) // max(n, 1))
+    out = np.empty(len(sources), dtype=np.int64)
+    for start in range(0, len(sources), batch):
+        block = sources[start : start + batch]
+        dist = csgraph.shortest_path(
+            adjacency, directed=False, unweighted=True, indices=block
+        )
+        out[start : start + batch] = dist.reshape(len(block), n).max(axis=1)
+    return out
+
+
+def _betweenness_moments(sources: np.ndarray):
+    """Brandes dependencies for each source, accumulated as first/second moments.
+
+    Uses level-synchronous BFS where path counts and dependencies of a whole
+    level are pushed with one sparse product.
+    """
+    adjacency = _worker_adjacency
+    n = adjacency.shape[0]
+    total = np.zeros(n)
+    total_sq = np.zeros(n)
+    per_source_mean = np.empty(len(sources))
+
+    for k, s in enumerate(sources):
+        dist = np.full(n, -1, dtype=np.int64)
+        sigma = np.zeros(n)
+        dist[s] = 0
+        sigma[s] = 1.0
+        levels = [np.array([s])]
+        while True:
+            frontier = levels[-1]
+            reached = adjacency[frontier].T @ sigma[frontier]
+            new = np.flatnonzero((reached > 0) & (dist < 0))
+            if len(new) == 0:
+                break
+            dist[new] = len(levels)
+            sigma[new] = reached[new]
+            levels.append(new)
+
+        delta = np.zeros(n)
+        coeff = np.zeros(n)
+        for depth in range(len(levels) - 2, -1, -1):
+            nxt = levels[depth + 1]
+            coeff[:] = 0
+            coeff[nxt] = (1.0 + delta[nxt]) / sigma[nxt]
+            nodes = levels[depth]
+            delta[nodes] = sigma[nodes] * (adjacency[nodes] @ coeff)
+        delta[s] = 0
+
+        total += delta
+        total_sq += delta * delta
+        per_source_mean[k] = delta.mean()
+
+    return total, total_sq, per_source_mean
+
+
+def _local_clustering(nodes: np.ndarray) -> np.ndarray:
+    """Exact local clustering coefficient via triangle counting"""
+    adjacency = _worker_adjacency
+    out = np.empty(len(nodes))
+    batch = 256
+    for start in range(0, len(nodes), batch):
+        block = nodes[start : start + batch]
+        rows = adjacency[block].astype(np.int64)
+        triangles = np.asarray((rows @ adjacency).multiply(rows).sum(axis=1)).ravel() / 2
+        deg = np.diff(rows.indptr)
+        possible = deg * (deg - 1) / 2
+        out[start : start + batch] = np.divide(
+            triangles, possible, out=np.zeros(len(block)), where=possible > 0
+        )
+    return out
+
+
+# ----------------------------
+# Metrics
+# ----------------------------
+
+
+def _sample(rng: np.random.Generator, n: int, k: int) -> np.ndarray:
+    if k >= n:
+        return np.arange(n)
+    return np.sort(rng.choice(n, size=k, replace=False))
+
+
+def _finite_population_correction(n: int, k: int) -> float:
+    return math.sqrt((n - k) / (n - 1)) if n > 1 else 0.0
+
+
+def estimate_clustering(
+    graph: CSRGraph, config: StatisticsConfig, rng: np.random.Generator
+) -> MetricEstimate:
+    start = time.perf_counter()
+    n = graph.node_count
+    if n == 0:
+        return MetricEstimate(0.0, 0.0, 0.0, "empty")
+
+    sample = _sample(rng, n, config.clustering_samples)
+    coeffs = np.concatenate(
+        _run_sharded(_local_clustering, graph.adjacency, sample, config.workers)
+    )
+    k = len(sample)
+    error = 0.0
+    if k > 1:
+        error = (
+            Z_95
+            * coeffs.std(ddof=1)
+            / math.sqrt(k)
+            * _finite_population_correction(n, k)
+        )
+    method = "exact triangle count" if k == n else f"triangle count on {k} random nodes"
+    return MetricEstimate(
+        float(coeffs.mean()), float(error), time.perf_counter() - start, method
+    )
+
+
+def estimate_betweenness(
+    graph: CSRGraph, config: StatisticsConfig, rng: np.random.Generator
+) -> Dict[str, MetricEstimate]:
+    """Max and average normalised betweenness from k random pivot sources"""
+    start = time.perf_counter()
+    n = graph.node_count
+    if n <= 2:
+        zero = MetricEstimate(0.0, 0.0, 0.0, "trivial")
+        return {"max": zero, "avg": zero}
+
+    pivots = _sample(rng, n, config.betweenness_samples)
+    k = len(pivots)
+    parts = _run_sharded(_betweenness_moments, graph.adjacency, pivots, config.workers)
+    total = sum(p[0] for p in parts)
+    total_sq = sum(p[1] for p in parts)
+    per_source_mean = np.concatenate([p[2] for p in parts])
+
+    # Each pivot gives an unbiased estimate delta_s * n, normalised like
+    # networkx.betweenness_centrality(normalized=True, k=k)
+    pivot_scale = n / ((n - 1) * (n - 2))
+    centrality = total / k * pivot_scale
+    top = int(np.argmax(centrality))
+
+    max_error = avg_error = 0.0
+    if 1 < k < n:
+        fpc = _finite_population_correction(n, k)
+        mean_top = total[top] / k
+        var_top = max(total_sq[top] / k - mean_top**2, 0.0) * k / (k - 1)
+        max_error = Z_95 * math.sqrt(var_top / k) * fpc * pivot_scale
+        avg_error = (
+            Z_95 * per_source_mean.std(ddof=1) / math.sqrt(k) * fpc * pivot_scale
+        )
+
+    seconds = time.perf_counter() - start
+    method = "exact Brandes" if k == n else f"Brandes from {k} random pivots"
+    return {
+        "max": MetricEstimate(float(centrality[top]), float(max_error), seconds, method),
+        "avg": MetricEstimate(
+            float(centrality.mean()), float(avg_error), seconds, method
+        ),
+    }
+
+
+def estimate_diameter_radius(
+    graph: CSRGraph, config: StatisticsConfig
+) -> Dict[str, MetricEstimate]:
+    """iFUB diameter bounds (seeded by a double sweep) on a connected graph.
+
+    The estimate is the best proven lower bound for the diameter and the
+    smallest eccentricity seen for the radius; error_bound is the remaining
+    gap to the corresponding proven upper/lower bound (0 means exact).
+    """
+    start = time.perf_counter()
+    n = graph.node_count
+    if n <= 1:
+        zero = MetricEstimate(0.0, 0.0, 0.0, "trivial")
+        return {"diameter": zero, "radius": zero}
+
+    adjacency = graph.adjacency
+    workers = config.workers
+    bfs_runs = 0
+
+    def bfs(source: int) -> np.ndarray:
+        nonlocal bfs_runs
+        bfs_runs += 1
+        return csgraph.shortest_path(
+            adjacency, directed=False, unweighted=True, indices=source
+        )
+
+    # Double sweep from the highest-degree node gives a first lower bound
+    u = int(np.argmax(graph.degrees()))
+    dist_u = bfs(u)
+    far = int(np.argmax(dist_u))
+    lower = int(bfs(far).max())
+    ecc_u = int(dist_u.max())
+    lower = max(lower, ecc_u)
+    min_ecc = ecc_u
+    upper = 2 * ecc_u
+
+    # iFUB: examine fringes of u from the outermost level inwards
+    level = ecc_u
+    while upper > lower and level > 0:
+        fringe = np.flatnonzero(dist_u == level)
+        if bfs_runs + len(fringe) > config.diameter_bfs_budget:
+            break
+        eccs = np.concatenate(_run_sharded(_eccentricities, adjacency, fringe, workers))
+        bfs_runs += len(fringe)
+        lower = max(lower, int(eccs.max()))
+        min_ecc = min(min_ecc, int(eccs.min()))
+        if lower > 2 * (level - 1):
+            upper = lower
+            break
+        upper = 2 * (level - 1)
+        level -= 1
+    upper = max(upper, lower)
+
+    seconds = time.perf_counter() - start
+    method = f"iFUB with {bfs_runs} BFS runs"
+    radius_lower = math.ceil(lower / 2)
+    return {
+        "diameter": MetricEstimate(float(lower), float(upper - lower), seconds, method),
+        "radius": MetricEstimate(
+            float(min_ecc), float(min_ecc - radius_lower), seconds, method
+        ),
+    }
+
+
+def compute_graph_statistics(
+    graph: CSRGraph, config: Optional[StatisticsConfig] = None
+) -> Dict:
+    """Graph statistics with explicit error bounds and timings.
+
+    Returns the same keys as calculate_final_graph_statistics (filled with the
+    estimates) plus a "metric_estimates" entry with estimate, error bound,
+    wall time and method for each metric.
+    """
+    config = config or StatisticsConfig()
+    rng = np.random.default_rng(config.seed)
+    print("Calculating sampled graph statistics...")
+    start_time = time.time()
+
+    n = graph.node_count
+    stats: Dict = {
+        "node_count": n,
+        "edge_count": graph.edge_count,
+    }
+    estimates: Dict[str, MetricEstimate] = {}
+
+    degrees = graph.degrees()
+    stats["average_node_degree"] = float(degrees.mean()) if n > 0 else 0
+    stats["density"] = 2 * graph.edge_count / (n * (n - 1)) if n > 1 else 0
+
+    t = time.perf_counter()
+    component_count, labels = csgraph.connected_components(
+        graph.adjacency, directed=False
+    )
+    component_sizes = np.bincount(labels) if n > 0 else np.zeros(0, dtype=np.int64)
+    stats["connected_components_count"] = int(component_count)
+    stats["largest_component_size"] = int(component_sizes.max()) if n > 0 else 0
+    stats["component_size_distribution"] = sorted(
+        component_sizes.tolist(), reverse=True
+    )
+    estimates["connected_components_count"] = MetricEstimate(
+        float(component_count), 0.0, time.perf_counter() - t, "exact"
+    )
+
+    estimates["average_clustering_coefficient"] = estimate_clustering(graph, config, rng)
+
+    t = time.perf_counter()
+    degree_centrality = degrees / (n - 1) if n > 1 else np.zeros(n)
+    seconds = time.perf_counter() - t
+    estimates["max_degree_centrality"] = MetricEstimate(
+        float(degree_centrality.max()) if n > 0 else 0.0, 0.0, seconds, "exact"
+    )
+    estimates["avg_degree_centrality"] = MetricEstimate(
+        float(degree_centrality.mean()) if n > 0 else 0.0, 0.0, seconds, "exact"
+    )
+
+    betweenness = estimate_betweenness(graph, config, rng)
+    estimates["max_betweenness_centrality"] = betweenness["max"]
+    estimates["avg_betweenness_centrality"] = betweenness["avg"]
+
+    if n > 0:
+        largest = np.flatnonzero(labels == int(np.argmax(component_sizes)))
+        bounds = estimate_diameter_radius(graph.subgraph(largest), config)
+    else:
+        bounds = estimate_diameter_radius(graph, config)
+    estimates["diameter"] = bounds["diameter"]
+    estimates["radius"] = bounds["radius"]
+
+    for name in (
+        "average_clustering_coefficient",
+        "max_degree_centrality",
+        "avg_degree_centrality",
+        "max_betweenness_centrality",
+        "avg_betweenness_centrality",
+    ):
+        stats[name] = estimates[name].estimate
+    stats["diameter"] = int(estimates["diameter"].estimate)
+    stats["radius"] = int(estimates["radius"].estimate)
+    stats["metric_estimates"] = {k: v.to_dict() for k, v in estimates.items()}
+
+    end_time = time.time()
+    print(f"Sampled statistics calculated in {end_time - start_time:.2f} seconds")
+    return stats
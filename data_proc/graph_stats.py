@@ -1,20 +1,159 @@
+import argparse
 import pandas as pd
 import networkx as nx
 import json
-from collections import defaultdict, Counter
+from collections import defaultdict
+from dataclasses import dataclass
 import numpy as np
-from typing import Dict, List, Tuple
-import time
+import scipy.sparse as sp
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
+from graph_incremental import IncrementalGraphState, update_state
+from graph_metrics import CSRGraph, StatisticsConfig, compute_graph_statistics
+from ingredient_normalizer import IngredientNormalizer
+from instrumentation import add_arguments as add_instrumentation_arguments
+from instrumentation import stage, start_run
+from recipe_similarity import build_similarity_csr_graph
 
-def load_recipes(file_path: str) -> pd.DataFrame:
+
+RECIPE_COLUMNS = ["Unnamed: 0", "title", "NER_Simple"]
+DEFAULT_CHUNK_SIZE = 50_000
+
+
+def load_recipes(file_path: str, nrows: Optional[int] = None) -> pd.DataFrame:
     """Load recipes from CSV file"""
     return pd.read_csv(
         file_path,
-        nrows=1000,
+        nrows=nrows,
+    )
+
+
+@dataclass
+class RecipeCorpus:
+    """Recipes parsed once into integer ingredient IDs.
+
+    Ingredient IDs of recipe `i` are `ingredient_ids[indptr[i]:indptr[i + 1]]`
+    and index into the shared `vocabulary` list.
+    """
+
+    recipe_ids: List[str]
+    titles: List[str]
+    indptr: np.ndarray
+    ingredient_ids: np.ndarray
+    vocabulary: List[str]
+
+    def __len__(self) -> int:
+        return len(self.recipe_ids)
+
+
+class _CorpusBuilder:
+    """Accumulates parsed recipes chunk by chunk into a RecipeCorpus"""
+
+    def __init__(
+        self,
+        keep_titles: bool = True,
+        normalizer: Optional[IngredientNormalizer] = None,
+    ):
+        self.keep_titles = keep_titles
+        self.normalizer = normalizer
+        self.vocabulary: Dict[str, int] = {}
+        self.recipe_ids: List[str] = []
+        self.titles: List[str] = []
+        self.counts: List[np.ndarray] = []
+        self.id_chunks: List[np.ndarray] = []
+
+    def add_chunk(self, chunk: pd.DataFrame) -> None:
+        vocabulary = self.vocabulary
+        ids: List[int] = []
+        counts = np.zeros(len(chunk), dtype=np.int32)
+        for row_idx, ner_simple in enumerate(chunk["NER_Simple"]):
+            ingredients = parse_ingredients(ner_simple)
+            if self.normalizer is not None:
+                ingredients = self.normalizer.canonical_list(ingredients)
+            counts[row_idx] = len(ingredients)
+            for ingredient in ingredients:
+                ids.append(vocabulary.setdefault(ingredient, len(vocabulary)))
+
+        self.recipe_ids.extend(chunk["Unnamed: 0"].astype(str))
+        if self.keep_titles:
+            self.titles.extend(chunk["title"].fillna("").astype(str))
+        self.counts.append(counts)
+        self.id_chunks.append(np.asarray(ids, dtype=np.int32))
+
+    def build(self) -> RecipeCorpus:
+        counts = np.concatenate(self.counts) if self.counts else np.zeros(0, np.int32)
+        indptr = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        return RecipeCorpus(
+            recipe_ids=self.recipe_ids,
+            titles=self.titles,
+            indptr=indptr,
+            ingredient_ids=(
+                np.concatenate(self.id_chunks)
+                if self.id_chunks
+                else np.zeros(0, np.int32)
+            ),
+            vocabulary=list(self.vocabulary),
+        )
+
+
+def iter_recipe_chunks(
+    file_path: str,
+    chunksize: int = DEFAULT_CHUNK_SIZE,
+    nrows: Optional[int] = None,
+    skip: int = 0,
+) -> Iterator[pd.DataFrame]:
+    """Stream the recipe CSV in chunks, reading only the columns we need.
+
+    The first `skip` recipes are passed over (the header row is kept).
+    """
+    yield from pd.read_csv(
+        file_path,
+        usecols=RECIPE_COLUMNS,
+        chunksize=chunksize,
+        nrows=nrows,
+        skiprows=range(1, skip + 1) if skip else None,
     )
 
 
+def ingest_recipes(
+    file_path: str,
+    chunksize: int = DEFAULT_CHUNK_SIZE,
+    nrows: Optional[int] = None,
+    keep_titles: bool = True,
+    normalizer: Optional[IngredientNormalizer] = None,
+    skip: int = 0,
+) -> RecipeCorpus:
+    """Read the recipe CSV in chunks, parsing NER_Simple exactly once per row.
+
+    With a normalizer, ingredients are mapped to their canonical names.
+    """
+    print(f"Streaming recipes from {file_path} in chunks of {chunksize}...")
+    with stage("graph.ingest", total=nrows, unit="recipes") as span:
+        builder = _CorpusBuilder(keep_titles=keep_titles, normalizer=normalizer)
+        for chunk in iter_recipe_chunks(
+            file_path, chunksize=chunksize, nrows=nrows, skip=skip
+        ):
+            builder.add_chunk(chunk)
+            span.advance(len(chunk))
+        corpus = builder.build()
+        if normalizer is not None:
+            normalizer.flush()
+        span.note(ingredients=len(corpus.vocabulary))
+
+    print(
+        f"Ingested {len(corpus)} recipes with {len(corpus.vocabulary)} unique ingredients"
+    )
+    return corpus
+
+
+def corpus_from_dataframe(recipes_df: pd.DataFrame) -> RecipeCorpus:
+    """Parse an in-memory recipe DataFrame into a RecipeCorpus"""
+    builder = _CorpusBuilder()
+    builder.add_chunk(recipes_df)
+    return builder.build()
+
+
 def parse_ingredients(ner_simple_str: str) -> List[str]:
     """Parse the NER_Simple string into a list of ingredients"""
     if pd.isna(ner_simple_str) or ner_simple_str == "" or ner_simple_str == "[]":
@@ -50,38 +189,37 @@ def create_symmetric_edge_id(id1: str, id2: str) -> str:
 def build_recipe_graph_final(recipes_df: pd.DataFrame) -> nx.Graph:
     """Build a graph efficiently using symmetric edge IDs to prevent duplicates"""
     print("Building final graph efficiently...")
-    start_time = time.time()
-
     G = nx.Graph()
 
     # Create a mapping from ingredients to recipes for efficient lookup
     ingredient_to_recipes = defaultdict(list)
 
     # Build ingredient to recipe mapping
-    print("Mapping ingredients to recipes...")
-    for idx, recipe in recipes_df.iterrows():
-        if idx % 5000 == 0:
-            print(f"Processed {idx} recipes...")
-
-        ingredients = parse_ingredients(recipe["NER_Simple"])
-        recipe_id = str(recipe["Unnamed: 0"])
-
-        # Add recipe node
-        G.add_node(recipe_id, title=recipe["title"])
+    with stage("graph.final.map", total=len(recipes_df), unit="recipes") as span:
+        for _, recipe in recipes_df.iterrows():
+            ingredients = parse_ingredients(recipe["NER_Simple"])
+            recipe_id = str(recipe["Unnamed: 0"])
 
-        # Map ingredients to this recipe
-        for ingredient in ingredients:
-            ingredient_to_recipes[ingredient].append(recipe_id)
+            # Add recipe node
+            G.add_node(recipe_id, title=recipe["title"])
 
-    print(f"Created ingredient mappings for {len(ingredient_to_recipes)} ingredients")
+            # Map ingredients to this recipe
+            for ingredient in ingredients:
+                ingredient_to_recipes[ingredient].append(recipe_id)
+            span.advance()
+        span.note(ingredients=len(ingredient_to_recipes))
 
     # Create edges based on shared ingredients using symmetric edge IDs to prevent duplicates
-    print("Creating edges from ingredient mappings...")
     edge_count = 0
     seen_edges = set()  # Track edges we've already created
 
-    for ingredient, recipe_list in ingredient_to_recipes.items():
-        if len(recipe_list) > 1:  # Only consider ingredients shared by multiple recipes
+    with stage(
+        "graph.final.edges", total=len(ingredient_to_recipes), unit="ingredients"
+    ) as span:
+        for ingredient, recipe_list in ingredient_to_recipes.items():
+            span.advance()
+            if len(recipe_list) <= 1:  # Only consider ingredients shared by multiple recipes
+                continue
             # Connect all recipes that share this ingredient
             for i in range(len(recipe_list)):
                 for j in range(i + 1, len(recipe_list)):
@@ -96,176 +234,489 @@ def build_recipe_graph_final(recipes_df: pd.DataFrame) -> nx.Graph:
                         G.add_edge(recipe1_id, recipe2_id)
                         seen_edges.add(edge_id)
                         edge_count += 1
+        span.note(edges=edge_count)
 
-                    if edge_count % 5000 == 0:
-                        print(f"Added {edge_count} unique edges...")
-
-    end_time = time.time()
     print(
-        f"Final graph built with {G.number_of_nodes()} nodes and {G.number_of_edges()} unique edges in {end_time - start_time:.2f} seconds"
+        f"Final graph built with {G.number_of_nodes()} nodes and {G.number_of_edges()} unique edges"
     )
     return G
 
 
-def calculate_final_graph_statistics(G: nx.Graph) -> Dict:
-    """Calculate final graph statistics efficiently"""
-    print("Calculating final graph statistics...")
-    start_time = time.time()
+def build_ingredient_incidence(
+    corpus: RecipeCorpus, max_ingredient_fraction: Optional[float] = None
+) -> Tuple[sp.csr_matrix, List[str]]:
+    """Build a binary recipe x ingredient CSR incidence matrix.
+
+    Ingredients that appear in more than `max_ingredient_fraction` of all
+    recipes (e.g. "salt", "sugar") are dropped as stop-ingredients.
+    Returns the matrix and the ingredient vocabulary (column order); rows
+    follow `corpus.recipe_ids`.
+    """
+    ingredients = corpus.vocabulary
+    incidence = sp.csr_matrix(
+        (
+            np.ones(len(corpus.ingredient_ids), dtype=np.int32),
+            corpus.ingredient_ids,
+            corpus.indptr,
+        ),
+        shape=(len(corpus), len(ingredients)),
+        # sum_duplicates below works in place; keep the corpus arrays intact
+        copy=True,
+    )
+    # Collapse ingredients repeated within a recipe
+    incidence.sum_duplicates()
+    incidence.data[:] = 1
+
+    if max_ingredient_fraction is not None and len(corpus) > 0:
+        document_frequency = np.bincount(incidence.indices, minlength=len(ingredients))
+        keep = document_frequency <= max_ingredient_fraction * len(corpus)
+        dropped = len(ingredients) - int(keep.sum())
+        if dropped:
+            print(f"Dropping {dropped} stop-ingredients above {max_ingredient_fraction:.0%} frequency")
+        incidence = incidence[:, np.flatnonzero(keep)].tocsr()
+        ingredients = [ing for ing, k in zip(ingredients, keep) if k]
+
+    return incidence, ingredients
+
+
+def build_recipe_adjacency(
+    incidence: sp.csr_matrix, weighted: bool = False
+) -> sp.csr_matrix:
+    """Recipe-recipe adjacency (upper triangle) from one sparse product.
+
+    Entry (i, j) holds the number of shared ingredients when `weighted`,
+    otherwise 1 for every pair sharing at least one ingredient.
+    """
+    shared = sp.triu(incidence @ incidence.T, k=1, format="csr")
+    shared.eliminate_zeros()
+    if not weighted:
+        shared.data[:] = 1
+    return shared
+
+
+def build_recipe_graph_sparse(
+    recipes: Union[pd.DataFrame, RecipeCorpus],
+    weighted: bool = False,
+    max_ingredient_fraction: Optional[float] = None,
+) -> nx.Graph:
+    """Build the recipe graph through a sparse incidence product instead of pair loops"""
+    print("Building graph from sparse incidence matrix...")
+    corpus = (
+        recipes
+        if isinstance(recipes, RecipeCorpus)
+        else corpus_from_dataframe(recipes)
+    )
+    recipe_ids = corpus.recipe_ids
+    with stage("graph.sparse.adjacency", unit="recipes") as span:
+        incidence, ingredients = build_ingredient_incidence(
+            corpus, max_ingredient_fraction
+        )
+        print(
+            f"Incidence matrix: {incidence.shape[0]} recipes x {len(ingredients)} ingredients, "
+            f"{incidence.nnz} entries"
+        )
+        adjacency = build_recipe_adjacency(incidence, weighted=weighted)
+        span.advance(len(corpus))
+
+    with stage("graph.sparse.networkx", unit="edges") as span:
+        G = nx.Graph()
+        if corpus.titles:
+            G.add_nodes_from(
+                (recipe_id, {"title": title})
+                for recipe_id, title in zip(recipe_ids, corpus.titles)
+            )
+        else:
+            G.add_nodes_from(recipe_ids)
+        coo = adjacency.tocoo()
+        if weighted:
+            G.add_weighted_edges_from(
+                (recipe_ids[i], recipe_ids[j], int(w))
+                for i, j, w in zip(coo.row, coo.col, coo.data)
+            )
+        else:
+            G.add_edges_from(
+                (recipe_ids[i], recipe_ids[j]) for i, j in zip(coo.row, coo.col)
+            )
+        span.advance(G.number_of_edges())
 
-    stats = {}
+    print(
+        f"Sparse graph built with {G.number_of_nodes()} nodes and {G.number_of_edges()} unique edges"
+    )
+    return G
 
-    # Basic statistics
-    stats["node_count"] = G.number_of_nodes()
-    stats["edge_count"] = G.number_of_edges()
 
-    # Average degree
-    if G.number_of_nodes() > 0:
-        stats["average_node_degree"] = (
-            sum(dict(G.degree()).values()) / G.number_of_nodes()
+def build_recipe_csr_graph(
+    corpus: RecipeCorpus, max_ingredient_fraction: Optional[float] = None
+) -> CSRGraph:
+    """Build the recipe graph straight into CSR form, skipping networkx"""
+    print("Building CSR recipe graph...")
+    with stage("graph.csr", unit="recipes") as span:
+        incidence, _ = build_ingredient_incidence(corpus, max_ingredient_fraction)
+        graph = CSRGraph.from_adjacency(
+            build_recipe_adjacency(incidence), corpus.recipe_ids
         )
-    else:
-        stats["average_node_degree"] = 0
+        span.advance(len(corpus))
+        span.note(edges=graph.edge_count)
 
-    # Density
-    if G.number_of_nodes() > 1:
-        stats["density"] = nx.density(G)
-    else:
-        stats["density"] = 0
-
-    # Connected components
-    connected_components = list(nx.connected_components(G))
-    stats["connected_components_count"] = len(connected_components)
-    if connected_components:
-        stats["largest_component_size"] = max(
-            len(comp) for comp in connected_components
-        )
-        # Calculate the size distribution of components
-        component_sizes = [len(comp) for comp in connected_components]
-        stats["component_size_distribution"] = sorted(component_sizes, reverse=True)
-    else:
-        stats["largest_component_size"] = 0
-        stats["component_size_distribution"] = []
+    print(
+        f"CSR graph built with {graph.node_count} nodes and {graph.edge_count} unique edges"
+    )
+    return graph
 
-    # Clustering coefficient (calculate for a sample of nodes to save time)
-    try:
-        if G.number_of_nodes() > 0:
-            # Sample 1000 nodes or all nodes if less than 1000
-            sample_size = min(1000, G.number_of_nodes())
-            sample_nodes = list(G.nodes())[:sample_size]
-            clustering_coeffs = nx.clustering(G, sample_nodes)
-            stats["average_clustering_coefficient"] = np.mean(
-                list(clustering_coeffs.values())
-            )
-        else:
-            stats["average_clustering_coefficient"] = 0
-    except Exception as e:
-        print(f"Error calculating clustering coefficient: {e}")
-        stats["average_clustering_coefficient"] = 0
 
-    # Centrality measures (calculate for a sample to save time)
-    try:
-        # Degree centrality (sample of 1000 nodes max)
+def calculate_final_graph_statistics(G: nx.Graph) -> Dict:
+    """Calculate final graph statistics efficiently"""
+    print("Calculating final graph statistics...")
+    with stage("graph.stats.exact", unit="nodes") as span:
+        stats = {}
+
+        # Basic statistics
+        stats["node_count"] = G.number_of_nodes()
+        stats["edge_count"] = G.number_of_edges()
+
+        # Average degree
         if G.number_of_nodes() > 0:
-            sample_size = min(1000, G.number_of_nodes())
-            sample_nodes = list(G.nodes())[:sample_size]
-            degree_centrality = nx.degree_centrality(G)
-            stats["max_degree_centrality"] = (
-                max(degree_centrality.values()) if degree_centrality else 0
-            )
-            stats["avg_degree_centrality"] = (
-                np.mean(list(degree_centrality.values())) if degree_centrality else 0
+            stats["average_node_degree"] = (
+                sum(dict(G.degree()).values()) / G.number_of_nodes()
             )
+        else:
+            stats["average_node_degree"] = 0
 
-            # Betweenness centrality (sample to save time)
-            betweenness_centrality = nx.betweenness_centrality(
-                G, k=min(100, G.number_of_nodes())
-            )
-            stats["max_betweenness_centrality"] = (
-                max(betweenness_centrality.values()) if betweenness_centrality else 0
-            )
-            stats["avg_betweenness_centrality"] = (
-                np.mean(list(betweenness_centrality.values()))
-                if betweenness_centrality
-                else 0
+        # Density
+        if G.number_of_nodes() > 1:
+            stats["density"] = nx.density(G)
+        else:
+            stats["density"] = 0
+
+        # Connected components
+        connected_components = list(nx.connected_components(G))
+        stats["connected_components_count"] = len(connected_components)
+        if connected_components:
+            stats["largest_component_size"] = max(
+                len(comp) for comp in connected_components
             )
+            # Calculate the size distribution of components
+            component_sizes = [len(comp) for comp in connected_components]
+            stats["component_size_distribution"] = sorted(component_sizes, reverse=True)
         else:
+            stats["largest_component_size"] = 0
+            stats["component_size_distribution"] = []
+
+        # Clustering coefficient (calculate for a sample of nodes to save time)
+        try:
+            if G.number_of_nodes() > 0:
+                # Sample 1000 nodes or all nodes if less than 1000
+                sample_size = min(1000, G.number_of_nodes())
+                sample_nodes = list(G.nodes())[:sample_size]
+                clustering_coeffs = nx.clustering(G, sample_nodes)
+                stats["average_clustering_coefficient"] = np.mean(
+                    list(clustering_coeffs.values())
+                )
+            else:
+                stats["average_clustering_coefficient"] = 0
+        except Exception as e:
+            print(f"Error calculating clustering coefficient: {e}")
+            stats["average_clustering_coefficient"] = 0
+
+        # Centrality measures (calculate for a sample to save time)
+        try:
+            # Degree centrality (sample of 1000 nodes max)
+            if G.number_of_nodes() > 0:
+                sample_size = min(1000, G.number_of_nodes())
+                sample_nodes = list(G.nodes())[:sample_size]
+                degree_centrality = nx.degree_centrality(G)
+                stats["max_degree_centrality"] = (
+                    max(degree_centrality.values()) if degree_centrality else 0
+                )
+                stats["avg_degree_centrality"] = (
+                    np.mean(list(degree_centrality.values())) if degree_centrality else 0
+                )
+
+                # Betweenness centrality (sample to save time)
+                betweenness_centrality = nx.betweenness_centrality(
+                    G, k=min(100, G.number_of_nodes())
+                )
+                stats["max_betweenness_centrality"] = (
+                    max(betweenness_centrality.values()) if betweenness_centrality else 0
+                )
+                stats["avg_betweenness_centrality"] = (
+                    np.mean(list(betweenness_centrality.values()))
+                    if betweenness_centrality
+                    else 0
+                )
+            else:
+                stats["max_degree_centrality"] = 0
+                stats["avg_degree_centrality"] = 0
+                stats["max_betweenness_centrality"] = 0
+                stats["avg_betweenness_centrality"] = 0
+
+        except Exception as e:
+            print(f"Error calculating centrality measures: {e}")
             stats["max_degree_centrality"] = 0
             stats["avg_degree_centrality"] = 0
             stats["max_betweenness_centrality"] = 0
             stats["avg_betweenness_centrality"] = 0
 
-    except Exception as e:
-        print(f"Error calculating centrality measures: {e}")
-        stats["max_degree_centrality"] = 0
-        stats["avg_degree_centrality"] = 0
-        stats["max_betweenness_centrality"] = 0
-        stats["avg_betweenness_centrality"] = 0
-
-    # Diameter and radius (only for the largest component to save time)
-    try:
-        if nx.is_connected(G):
-            stats["diameter"] = nx.diameter(G)
-            stats["radius"] = nx.radius(G)
-        else:
-            # For disconnected graphs, calculate for largest component
-            largest_component = max(nx.connected_components(G), key=len)
-            if len(largest_component) > 1:
-                subgraph = G.subgraph(largest_component)
-                stats["diameter"] = nx.diameter(subgraph)
-                stats["radius"] = nx.radius(subgraph)
+        # Diameter and radius (only for the largest component to save time)
+        try:
+            if nx.is_connected(G):
+                stats["diameter"] = nx.diameter(G)
+                stats["radius"] = nx.radius(G)
             else:
-                stats["diameter"] = 0
-                stats["radius"] = 0
-    except Exception as e:
-        print(f"Error calculating diameter/radius: {e}")
-        stats["diameter"] = 0
-        stats["radius"] = 0
+                # For disconnected graphs, calculate for largest component
+                largest_component = max(nx.connected_components(G), key=len)
+                if len(largest_component) > 1:
+                    subgraph = G.subgraph(largest_component)
+                    stats["diameter"] = nx.diameter(subgraph)
+                    stats["radius"] = nx.radius(subgraph)
+                else:
+                    stats["diameter"] = 0
+                    stats["radius"] = 0
+        except Exception as e:
+            print(f"Error calculating diameter/radius: {e}")
+            stats["diameter"] = 0
+            stats["radius"] = 0
+        span.advance(G.number_of_nodes())
 
-    end_time = time.time()
-    print(f"Final statistics calculated in {end_time - start_time:.2f} seconds")
     return stats
 
 
-def calculate_ingredient_statistics(recipes_df: pd.DataFrame) -> Dict:
+def calculate_ingredient_statistics(
+    recipes: Union[pd.DataFrame, RecipeCorpus],
+) -> Dict:
     """Calculate ingredient-related statistics"""
     print("Calculating ingredient statistics...")
-    start_time = time.time()
-
-    all_ingredients = []
-
-    for _, recipe in recipes_df.iterrows():
-        ingredients = parse_ingredients(recipe["NER_Simple"])
-        all_ingredients.extend(ingredients)
+    with stage("graph.stats.ingredients", unit="recipes") as span:
+        corpus = (
+            recipes
+            if isinstance(recipes, RecipeCorpus)
+            else corpus_from_dataframe(recipes)
+        )
+        counts = np.bincount(corpus.ingredient_ids, minlength=len(corpus.vocabulary))
+        stats = ingredient_statistics_from_counts(corpus.vocabulary, counts)
+        span.advance(len(corpus))
 
-    ingredient_counts = Counter(all_ingredients)
+    return stats
 
-    end_time = time.time()
-    print(f"Ingredient statistics calculated in {end_time - start_time:.2f} seconds")
 
+def frequency_histogram(counts: np.ndarray) -> List[Dict]:
+    """Number of ingredients per power-of-two frequency bucket [2^i, 2^(i+1))"""
+    counts = np.asarray(counts)
+    counts = counts[counts > 0]
+    if not len(counts):
+        return []
+    buckets = np.bincount(np.floor(np.log2(counts)).astype(np.int64))
+    return [
+        {"min": 1 << i, "max": (1 << (i + 1)) - 1, "ingredients": int(c)}
+        for i, c in enumerate(buckets)
+        if c
+    ]
+
+
+def ingredient_statistics_from_counts(vocabulary: List[str], counts: np.ndarray) -> Dict:
+    """Ingredient statistics from per-ingredient occurrence counts: totals, the top-N
+    and a frequency histogram rather than the full distribution"""
+    # Stable sort keeps first-seen order among ties, matching Counter.most_common
+    order = np.argsort(-counts, kind="stable")
     return {
-        "total_unique_ingredients": len(ingredient_counts),
-        "total_ingredients": len(all_ingredients),
-        "most_common_ingredients": ingredient_counts.most_common(20),
-        "ingredient_frequency_distribution": dict(ingredient_counts),
+        "total_unique_ingredients": int(np.count_nonzero(counts)),
+        "total_ingredients": int(counts.sum()),
+        "most_common_ingredients": [
+            (vocabulary[i], int(counts[i])) for i in order[:20]
+        ],
+        "frequency_histogram": frequency_histogram(counts),
     }
 
 
-def main():
-    """Main function to analyze recipe graph efficiently with symmetric edge IDs"""
-    print("Starting final efficient recipe graph analysis...")
-
-    # Load data
-    recipes_df = load_recipes("simplified_dataset.csv")
-    print(f"Loaded {len(recipes_df)} recipes")
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Recipe graph analysis")
+    parser.add_argument("--input", default="simplified_dataset.csv")
+    parser.add_argument("--output", default="graph_analysis_final_results.json")
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help="Rows read from the CSV per chunk",
+    )
+    parser.add_argument(
+        "--nrows", type=int, default=None, help="Only read the first N recipes"
+    )
+    parser.add_argument(
+        "--exact-stats",
+        action="store_true",
+        help="Use the exact networkx statistics instead of the sampled engine",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--clustering-samples", type=int, default=1000)
+    parser.add_argument("--betweenness-samples", type=int, default=100)
+    parser.add_argument("--diameter-bfs-budget", type=int, default=1000)
+    parser.add_argument(
+        "--raw-ingredients",
+        action="store_true",
+        help="Skip the shared ingredient normalizer and keep NER_Simple as is",
+    )
+    parser.add_argument(
+        "--similarity-threshold",
+        type=float,
+        default=None,
+        help="Link recipes by MinHash/LSH Jaccard similarity >= this value "
+        "instead of linking every pair sharing an ingredient",
+    )
+    parser.add_argument("--num-perm", type=int, default=128, help="MinHash permutations")
+    parser.add_argument(
+        "--max-ingredient-fraction",
+        type=float,
+        default=None,
+        help="Ignore stop-ingredients used by more than this fraction of recipes "
+        "when linking recipes (e.g. 0.05); with --incremental only the sampled "
+        "metrics see the filtered graph",
+    )
+    parser.add_argument(
+        "--incremental",
+        metavar="STATE_DIR",
+        default=None,
+        help="Keep the graph state in STATE_DIR and only ingest recipes beyond "
+        "those already in it",
+    )
+    parser.add_argument(
+        "--staleness",
+        type=float,
+        default=0.1,
+        help="With --incremental, recompute the sampled metrics once the new "
+        "recipes exceed this fraction of those they were computed on",
+    )
+    add_instrumentation_arguments(parser)
+    return parser.parse_args()
+
+
+def analyze(
+    args: argparse.Namespace,
+    normalizer: Optional[IngredientNormalizer],
+    config: StatisticsConfig,
+) -> Tuple[Dict, Dict]:
+    """Graph and ingredient statistics of the whole input, built from scratch"""
+    # Stream data once; graph and ingredient stages share the parsed corpus
+    corpus = ingest_recipes(
+        args.input, chunksize=args.chunksize, nrows=args.nrows, normalizer=normalizer
+    )
+    print(f"Loaded {len(corpus)} recipes")
+
+    similarity_graph = None
+    if args.similarity_threshold is not None:
+        with stage("graph.similarity", unit="recipes") as span:
+            similarity_graph = build_similarity_csr_graph(
+                corpus,
+                threshold=args.similarity_threshold,
+                num_perm=args.num_perm,
+                seed=args.seed,
+                workers=args.workers,
+            )
+            span.advance(len(corpus))
 
-    # Build graph efficiently with symmetric edge IDs
-    G = build_recipe_graph_final(recipes_df)
+    if args.exact_stats:
+        if similarity_graph is not None:
+            G = nx.from_scipy_sparse_array(similarity_graph.adjacency)
+            G = nx.relabel_nodes(G, dict(enumerate(similarity_graph.node_ids)))
+        else:
+            # Build graph from the sparse recipe x ingredient incidence product
+            G = build_recipe_graph_sparse(
+                corpus, max_ingredient_fraction=args.max_ingredient_fraction
+            )
 
-    # Calculate final graph statistics
-    graph_stats = calculate_final_graph_statistics(G)
+        # Calculate final graph statistics
+        graph_stats = calculate_final_graph_statistics(G)
+    else:
+        graph = (
+            similarity_graph
+            if similarity_graph is not None
+            else build_recipe_csr_graph(corpus, args.max_ingredient_fraction)
+        )
+        with stage("graph.stats.sampled", unit="nodes") as span:
+            graph_stats = compute_graph_statistics(graph, config)
+            span.advance(graph.node_count)
 
     # Calculate ingredient statistics
-    ingredient_stats = calculate_ingredient_statistics(recipes_df)
+    ingredient_stats = calculate_ingredient_statistics(corpus)
+    return graph_stats, ingredient_stats
+
+
+def analyze_incremental(
+    args: argparse.Namespace,
+    normalizer: Optional[IngredientNormalizer],
+    config: StatisticsConfig,
+) -> Tuple[Dict, Dict]:
+    """Append the recipes not yet in the --incremental state and report from it"""
+    state = IncrementalGraphState.load(args.incremental)
+    print(f"Loaded graph state with {len(state)} recipes from {args.incremental}")
+    nrows = None if args.nrows is None else max(args.nrows - len(state), 0)
+    batch = ingest_recipes(
+        args.input,
+        chunksize=args.chunksize,
+        nrows=nrows,
+        keep_titles=False,
+        normalizer=normalizer,
+        skip=len(state),
+    )
+
+    def recompute(state: IncrementalGraphState) -> Dict:
+        corpus = RecipeCorpus(
+            recipe_ids=state.recipe_ids,
+            titles=[],
+            indptr=state.indptr,
+            ingredient_ids=state.ingredient_ids,
+            vocabulary=state.vocabulary,
+        )
+        graph = build_recipe_csr_graph(corpus, args.max_ingredient_fraction)
+        with stage("graph.stats.sampled", unit="nodes") as span:
+            span.advance(graph.node_count)
+            stats = compute_graph_statistics(graph, config)
+        stats["max_ingredient_fraction"] = args.max_ingredient_fraction
+        return stats
+
+    # sampled metrics of another stop-ingredient threshold are not reusable
+    if state.sampled and state.sampled.get("max_ingredient_fraction") != args.max_ingredient_fraction:
+        state.sampled = {}
+    with stage("graph.incremental.update", unit="recipes") as span:
+        graph_stats = update_state(state, batch, args.staleness, recompute)
+        span.advance(len(batch))
+    print(f"Graph state updated to {len(state)} recipes")
+    ingredient_stats = ingredient_statistics_from_counts(
+        state.vocabulary, state.ingredient_counts[: len(state.vocabulary)]
+    )
+    return graph_stats, ingredient_stats
+
+
+def main():
+    """Stream the CSV into a recipe corpus, build the recipe graph from the sparse
+    recipe x ingredient incidence product (stop-ingredients above
+    --max-ingredient-fraction dropped) as a CSR graph with sampled statistics,
+    or as networkx with --exact-stats, or a MinHash similarity graph with
+    --similarity-threshold; --incremental updates persisted state instead."""
+    args = parse_args()
+    start_run("graph_stats", args)
+    print("Starting final efficient recipe graph analysis...")
+
+    normalizer = None if args.raw_ingredients else IngredientNormalizer()
+    config = StatisticsConfig(
+        seed=args.seed,
+        workers=args.workers,
+        clustering_samples=args.clustering_samples,
+        betweenness_samples=args.betweenness_samples,
+        diameter_bfs_budget=args.diameter_bfs_budget,
+    )
+    if args.max_ingredient_fraction is not None and not 0 < args.max_ingredient_fraction <= 1:
+        raise SystemExit("--max-ingredient-fraction must be in (0, 1]")
+    if args.incremental:
+        if args.exact_stats or args.similarity_threshold is not None:
+            raise SystemExit(
+                "--incremental supports neither --exact-stats nor --similarity-threshold"
+            )
+        graph_stats, ingredient_stats = analyze_incremental(args, normalizer, config)
+    else:
+        graph_stats, ingredient_stats = analyze(args, normalizer, config)
+
+    graph_stats["max_ingredient_fraction"] = args.max_ingredient_fraction
 
     # Combine all statistics
     all_stats = {
@@ -274,7 +725,7 @@ def main():
     }
 
     # Save to JSON file
-    with open("graph_analysis_final_results.json", "w") as f:
+    with open(args.output, "w") as f:
         json.dump(all_stats, f, indent=2)
 
     # Print summary
@@ -311,7 +762,7 @@ def main():
     ]:  # Show top 10
         print(f"  {ingredient}: {count}")
 
-    print("\nResults saved to data_proc/graph_analysis_final_results.json")
+    print(f"\nResults saved to {args.output}")
 
 
 if __name__ == "__main__":
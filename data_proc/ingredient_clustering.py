@@ -0,0 +1,206 @@
+"""DBSCAN parameter sweeps over one shared neighbour graph.
+
+Instead of refitting DBSCAN for every (eps, min_samples) combination, the
+neighbour graph is built once up to the largest eps (exact ball tree) or for
+the k nearest neighbours (ball tree or an HNSW index; hnswlib comes with
+the optional `hnsw` extra). Edges are sorted by distance, so each grid point only takes a
+prefix of the edge list and runs a connected-components pass over the core
+points.
+
+With the radius graph the cluster count, noise count and core clusters
+match sklearn.cluster.DBSCAN exactly; border points that touch several
+clusters go to their nearest core point. The k-NN graph is an approximation
+that caps every neighbourhood at k points.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+
+
+@dataclass
+class NeighborGraph:
+    """Undirected neighbour edges (both directions), sorted by distance"""
+
+    n: int
+    rows: np.ndarray
+    cols: np.ndarray
+    distances: np.ndarray
+    # Largest eps the graph answers exactly (-inf for k-NN graphs)
+    exact_up_to: float
+
+    def prefix(self, eps: float) -> int:
+        """Number of edges with distance <= eps"""
+        return int(np.searchsorted(self.distances, eps, side="right"))
+
+
+def normalize_rows(X: np.ndarray) -> np.ndarray:
+    X = np.asarray(X, dtype=np.float32)
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    return X / np.maximum(norms, 1e-12)
+
+
+def _sorted_graph(n, rows, cols, distances, exact_up_to) -> NeighborGraph:
+    keep = rows != cols
+    rows, cols, distances = rows[keep], cols[keep], distances[keep]
+    order = np.argsort(distances, kind="stable")
+    return NeighborGraph(
+        n=n,
+        rows=rows[order].astype(np.int32),
+        cols=cols[order].astype(np.int32),
+        distances=distances[order].astype(np.float64),
+        exact_up_to=exact_up_to,
+    )
+
+
+def _symmetrize(n, rows, cols, distances):
+    """Add reverse edges to a directed k-NN list and drop duplicates"""
+    rows, cols = np.concatenate([rows, cols]), np.concatenate([cols, rows])
+    distances = np.concatenate([distances, distances])
+    _, unique = np.unique(rows.astype(np.int64) * n + cols, return_index=True)
+    return rows[unique], cols[unique], distances[unique]
+
+
+def build_radius_graph(X: np.ndarray, max_eps: float) -> NeighborGraph:
+    """All pairs within max_eps, found with a ball tree"""
+    from sklearn.neighbors import NearestNeighbors
+
+    nn = NearestNeighbors(radius=max_eps, algorithm="ball_tree").fit(X)
+    dist, ind = nn.radius_neighbors(X, return_distance=True)
+    counts = np.fromiter((len(i) for i in ind), dtype=np.int64, count=len(ind))
+    rows = np.repeat(np.arange(len(X)), counts)
+    cols = np.concatenate(ind) if len(ind) else np.zeros(0, dtype=np.int64)
+    distances = np.concatenate(dist) if len(dist) else np.zeros(0)
+    return _sorted_graph(len(X), rows, cols, distances, exact_up_to=max_eps)
+
+
+def build_knn_graph(X: np.ndarray, k: int, method: str = "exact") -> NeighborGraph:
+    """k nearest neighbours per point, exact (ball tree) or approximate (HNSW)"""
+    n = len(X)
+    k = min(k + 1, n)  # every point is its own first neighbour
+    if method == "hnsw":
+        import hnswlib
+
+        index = hnswlib.Index(space="l2", dim=X.shape[1])
+        index.init_index(max_elements=n, ef_construction=200, M=16)
+        index.add_items(X, np.arange(n))
+        index.set_ef(max(k * 2, 50))
+        ind, sq_dist = index.knn_query(X, k=k)
+        dist = np.sqrt(np.maximum(sq_dist, 0))
+    elif method == "exact":
+        from sklearn.neighbors import NearestNeighbors
+
+        nn = NearestNeighbors(n_neighbors=k, algorithm="ball_tree").fit(X)
+        dist, ind = nn.kneighbors(X)
+    else:
+        raise ValueError(f"Unknown neighbour search method: {method}")
+
+    rows = np.repeat(np.arange(n), k)
+    rows, cols, distances = _symmetrize(n, rows, ind.ravel(), dist.ravel())
+    return _sorted_graph(n, rows, cols, distances, exact_up_to=-np.inf)
+
+
+def build_neighbor_graph(
+    X: np.ndarray,
+    max_eps: Optional[float] = None,
+    k: Optional[int] = None,
+    method: str = "exact",
+    normalize: bool = True,
+) -> NeighborGraph:
+    """Radius graph when max_eps is given, otherwise a k-NN graph"""
+    if normalize:
+        X = normalize_rows(X)
+    if max_eps is not None:
+        return build_radius_graph(X, max_eps)
+    if k is None:
+        raise ValueError("Either max_eps or k is required")
+    return build_knn_graph(X, k, method=method)
+
+
+def dbscan_labels(graph: NeighborGraph, eps: float, min_samples: int) -> np.ndarray:
+    """DBSCAN labels (-1 = noise) for one grid point, from the shared graph"""
+    m = graph.prefix(eps)
+    rows, cols = graph.rows[:m], graph.cols[:m]
+
+    # Neighbourhood size includes the point itself, as in sklearn
+    core = np.bincount(rows, minlength=graph.n) + 1 >= min_samples
+    labels = np.full(graph.n, -1, dtype=np.int32)
+    core_ids = np.flatnonzero(core)
+    if len(core_ids) == 0:
+        return labels
+
+    both_core = core[rows] & core[cols]
+    adjacency = sp.csr_matrix(
+        (np.ones(int(both_core.sum()), dtype=np.int8), (rows[both_core], cols[both_core])),
+        shape=(graph.n, graph.n),
+    )
+    _, components = csgraph.connected_components(
+        adjacency[core_ids][:, core_ids], directed=False
+    )
+    # Number clusters by their lowest core point, like sklearn's expansion order
+    _, first = np.unique(components, return_index=True)
+    rank = np.empty(len(first), dtype=np.int32)
+    rank[np.argsort(first)] = np.arange(len(first))
+    labels[core_ids] = rank[components]
+
+    # Border points: nearest core neighbour within eps (edges are distance-sorted)
+    to_border = core[cols] & ~core[rows]
+    border, nearest = rows[to_border], cols[to_border]
+    _, first_edge = np.unique(border, return_index=True)
+    labels[border[first_edge]] = labels[nearest[first_edge]]
+    return labels
+
+
+def sweep(
+    graph: NeighborGraph,
+    eps_values: Sequence[float],
+    min_samples_values: Sequence[int],
+) -> Iterator[Tuple[Dict, np.ndarray]]:
+    """Yield (summary row, labels) for every grid point, reusing the graph"""
+    for eps in eps_values:
+        if eps > graph.exact_up_to and np.isfinite(graph.exact_up_to):
+            raise ValueError(f"eps={eps} exceeds the graph radius {graph.exact_up_to}")
+        for min_samples in min_samples_values:
+            labels = dbscan_labels(graph, eps, min_samples)
+            yield {
+                "eps": float(eps),
+                "min_samples": int(min_samples),
+                "n_clusters": int(labels.max()) + 1,
+                "n_noise": int(np.count_nonzero(labels == -1)),
+            }, labels
+
+
+def run_sweep(
+    X: np.ndarray,
+    eps_values: Sequence[float],
+    min_samples_values: Sequence[int],
+    k: Optional[int] = None,
+    method: str = "exact",
+    normalize: bool = True,
+) -> Tuple[pd.DataFrame, np.ndarray]:
+    """Summary table plus a (grid points x n) int32 label matrix.
+
+    Without k, an exact radius graph up to max(eps_values) is used.
+    """
+    if k is None:
+        graph = build_neighbor_graph(
+            X, max_eps=float(max(eps_values)), normalize=normalize
+        )
+    else:
+        graph = build_neighbor_graph(X, k=k, method=method, normalize=normalize)
+
+    grid_size = len(eps_values) * len(min_samples_values)
+    labels = np.empty((grid_size, graph.n), dtype=np.int32)
+    summary = []
+    for i, (row, point_labels) in enumerate(sweep(graph, eps_values, min_samples_values)):
+        labels[i] = point_labels
+        summary.append(row)
+        print(
+            f"eps={row['eps']:.2f}, min_samples={row['min_samples']}: "
+            f"clusters={row['n_clusters']}, noise={row['n_noise']}"
+        )
+    return pd.DataFrame(summary), labels
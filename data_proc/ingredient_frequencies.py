@@ -0,0 +1,361 @@
+"""Ingredient frequencies over the full recipe CSV, exact or in bounded memory.
+
+Every CSV chunk is first counted exactly and vectorised: its ingredient
+strings are factorised into categorical codes and counted with one bincount.
+The per-chunk counts then feed one of two mergeable summaries:
+
+    ExactFrequencies        name -> count for every ingredient; memory grows
+                            with the vocabulary
+    ApproximateFrequencies  Count-Min sketch + Space-Saving top-k + a linear
+                            counting bitmap for the distinct count; memory is
+                            fixed by (width, depth, capacity, bitmap_bits)
+
+Both merge with `merge()`, so chunks can be counted in worker processes and
+combined in any order. Results are a compact top-N list plus a log2
+histogram of the frequencies instead of the full name -> count dict. The
+approximate histogram covers only the (at most `capacity`) tracked
+ingredients and is reported as tracked_frequency_histogram, next to the
+estimated number of untracked ingredients.
+
+Approximate counts are upper bounds: a top-k estimate is the smaller of its
+Space-Saving and Count-Min values, and true count >= estimate - error.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from graph_stats import frequency_histogram, parse_ingredients
+from ingredient_normalizer import IngredientNormalizer
+
+DEFAULT_CHUNK_SIZE = 50_000
+DEFAULT_TOP = 100
+
+# Count-Min: error <= total / width * e with probability 1 - exp(-depth)
+SKETCH_WIDTH = 1 << 16
+SKETCH_DEPTH = 4
+# Space-Saving counters
+SKETCH_CAPACITY = 4096
+# linear counting bitmap for the distinct ingredient estimate
+BITMAP_BITS = 1 << 22
+
+
+def count_chunk(
+    ner_simple: Iterable[str], normalizer: Optional[IngredientNormalizer] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(distinct ingredient names, occurrence counts) of one chunk of NER_Simple"""
+    names: List[str] = []
+    for raw in ner_simple:
+        ingredients = parse_ingredients(raw)
+        if normalizer is not None:
+            ingredients = normalizer.canonical_list(ingredients)
+        names.extend(ingredients)
+    codes, uniques = pd.factorize(pd.Series(names, dtype=object), sort=False)
+    counts = np.bincount(codes, minlength=len(uniques)).astype(np.int64)
+    return np.asarray(uniques, dtype=object), counts
+
+
+class ExactFrequencies:
+    """Exact counts of every ingredient"""
+
+    mode = "exact"
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def update(self, names: np.ndarray, counts: np.ndarray) -> None:
+        index = self.index
+        codes = np.empty(len(names), dtype=np.int64)
+        for i, name in enumerate(names):
+            code = index.get(name)
+            if code is None:
+                code = index[name] = len(self.names)
+                self.names.append(name)
+            codes[i] = code
+        if len(self.names) > len(self.counts):
+            grown = np.zeros(max(len(self.names), 2 * len(self.counts)), dtype=np.int64)
+            grown[: len(self.counts)] = self.counts
+            self.counts = grown
+        np.add.at(self.counts, codes, counts)
+
+    def merge(self, other: "ExactFrequencies") -> "ExactFrequencies":
+        self.update(np.asarray(other.names, dtype=object), other.counts[: len(other.names)])
+        return self
+
+    def summary(self, top: int = DEFAULT_TOP) -> Dict:
+        counts = self.counts[: len(self.names)]
+        # Stable sort keeps first-seen order among ties, matching Counter.most_common
+        order = np.argsort(-counts, kind="stable")[:top]
+        return {
+            "mode": self.mode,
+            "total_unique_ingredients": int(np.count_nonzero(counts)),
+            "total_ingredients": int(counts.sum()),
+            "most_common_ingredients": [(self.names[i], int(counts[i])) for i in order],
+            "frequency_histogram": frequency_histogram(counts),
+        }
+
+
+class ApproximateFrequencies:
+    """Count-Min sketch, Space-Saving heavy hitters and a distinct-count bitmap.
+
+    Summaries merge only with others built with the same parameters.
+    """
+
+    mode = "approximate"
+
+    def __init__(
+        self,
+        width: int = SKETCH_WIDTH,
+        depth: int = SKETCH_DEPTH,
+        capacity: int = SKETCH_CAPACITY,
+        bitmap_bits: int = BITMAP_BITS,
+        seed: int = 0,
+    ):
+        self.width = width
+        self.depth = depth
+        self.capacity = capacity
+        self.seed = seed
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.bitmap = np.zeros(bitmap_bits, dtype=bool)
+        self.total = 0
+        # Space-Saving: tracked name -> (count, error); untracked names have
+        # count <= floor
+        self.heavy: Dict[str, Tuple[int, int]] = {}
+        self.floor = 0
+
+    def _hashes(self, names: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(len(names), depth) sketch columns and bitmap positions"""
+        key = self.seed.to_bytes(8, "little")
+        digests = b"".join(
+            hashlib.blake2b(name.encode("utf-8"), digest_size=4 * (self.depth + 1), key=key).digest()
+            for name in names
+        )
+        words = np.frombuffer(digests, dtype="<u4").reshape(len(names), self.depth + 1)
+        return words[:, : self.depth] % self.width, words[:, self.depth] % len(self.bitmap)
+
+    def _estimate(self, columns: np.ndarray) -> np.ndarray:
+        return self.table[np.arange(self.depth), columns].min(axis=1)
+
+    def _merge_heavy(self, heavy: Dict[str, Tuple[int, int]], floor: int) -> None:
+        """Combine two Space-Saving summaries and keep the top `capacity`"""
+        merged = {}
+        for name in self.heavy.keys() | heavy.keys():
+            a, a_err = self.heavy.get(name, (self.floor, self.floor))
+            b, b_err = heavy.get(name, (floor, floor))
+            merged[name] = (a + b, a_err + b_err)
+        floor += self.floor
+        if len(merged) > self.capacity:
+            ranked = sorted(merged.items(), key=lambda item: -item[1][0])
+            floor = max(floor, ranked[self.capacity][1][0])
+            merged = dict(ranked[: self.capacity])
+        self.heavy, self.floor = merged, floor
+
+    def update(self, names: np.ndarray, counts: np.ndarray) -> None:
+        if not len(names):
+            return
+        columns, positions = self._hashes(names)
+        for row in range(self.depth):
+            np.add.at(self.table[row], columns[:, row], counts)
+        self.bitmap[positions] = True
+        self.total += int(counts.sum())
+
+        # the chunk's exact counts form a Space-Saving summary of their own
+        order = np.argsort(-counts, kind="stable")
+        kept = order[: self.capacity]
+        floor = int(counts[order[self.capacity]]) if len(order) > self.capacity else 0
+        self._merge_heavy({names[i]: (int(counts[i]), 0) for i in kept}, floor)
+
+    def merge(self, other: "ApproximateFrequencies") -> "ApproximateFrequencies":
+        if (self.width, self.depth, self.seed, len(self.bitmap)) != (
+            other.width,
+            other.depth,
+            other.seed,
+            len(other.bitmap),
+        ):
+            raise ValueError("Cannot merge sketches built with different parameters")
+        self.table += other.table
+        self.bitmap |= other.bitmap
+        self.total += other.total
+        self._merge_heavy(other.heavy, other.floor)
+        return self
+
+    def distinct(self) -> int:
+        """Linear counting estimate of the number of distinct ingredients"""
+        m = len(self.bitmap)
+        empty = m - int(np.count_nonzero(self.bitmap))
+        if empty == 0:
+            return m  # saturated; a larger bitmap is needed
+        return int(round(-m * math.log(empty / m)))
+
+    def summary(self, top: int = DEFAULT_TOP) -> Dict:
+        names = np.array(list(self.heavy), dtype=object)
+        if len(names):
+            sketched = self._estimate(self._hashes(names)[0])
+            tracked = np.array([self.heavy[n] for n in names], dtype=np.int64)
+            estimates = np.minimum(tracked[:, 0], sketched)
+            errors = np.minimum(tracked[:, 1], estimates)
+        else:
+            estimates = errors = np.zeros(0, dtype=np.int64)
+        order = np.argsort(-estimates, kind="stable")[:top]
+        distinct = self.distinct()
+        return {
+            "mode": self.mode,
+            "total_unique_ingredients": distinct,
+            "total_ingredients": self.total,
+            "most_common_ingredients": [(names[i], int(estimates[i])) for i in order],
+            "most_common_errors": [int(errors[i]) for i in order],
+            # untracked ingredients occur at most this often
+            "untracked_max_count": self.floor,
+            "count_min_error_bound": math.ceil(math.e * self.total / self.width),
+            # only the Space-Saving entries; the rest have no count of their own
+            "tracked_frequency_histogram": frequency_histogram(estimates),
+            "untracked_ingredients": max(distinct - len(names), 0),
+        }
+
+
+# ----------------------------
+# Chunked, parallel counting
+# ----------------------------
+
+_worker_normalizer: Optional[IngredientNormalizer] = None
+_worker_factory = None
+
+
+def _init_worker(normalizer: Optional[IngredientNormalizer], factory) -> None:
+    global _worker_normalizer, _worker_factory
+    _worker_normalizer = normalizer
+    _worker_factory = factory
+
+
+def _count_task(ner_simple: List[str]):
+    summary = _worker_factory()
+    summary.update(*count_chunk(ner_simple, _worker_normalizer))
+    # workers never flush; the parent persists what they resolved
+    normalizer = _worker_normalizer
+    return summary, normalizer.take_new() if normalizer is not None else []
+
+
+class _SketchFactory:
+    """Picklable ApproximateFrequencies constructor for the worker pool"""
+
+    def __init__(self, **sketch_args):
+        self.sketch_args = sketch_args
+
+    def __call__(self) -> ApproximateFrequencies:
+        return ApproximateFrequencies(**self.sketch_args)
+
+
+def count_frequencies(
+    file_path,
+    mode: str = "exact",
+    chunksize: int = DEFAULT_CHUNK_SIZE,
+    nrows: Optional[int] = None,
+    workers: int = 1,
+    normalizer: Optional[IngredientNormalizer] = None,
+    **sketch_args,
+):
+    """Stream the CSV and count ingredients chunk by chunk, merging the
+    per-chunk summaries (counted in a process pool when workers > 1). New
+    normalizer resolutions, also those made in workers, are flushed at the end."""
+    if mode == "exact":
+        factory = ExactFrequencies
+    elif mode == "approximate":
+        factory = _SketchFactory(**sketch_args)
+    else:
+        raise ValueError(f"Unknown frequency mode {mode!r}")
+    print(f"Counting ingredients in {file_path} ({mode}, chunks of {chunksize})...")
+    start_time = time.time()
+
+    chunks = (
+        chunk["NER_Simple"].tolist()
+        for chunk in pd.read_csv(
+            file_path, usecols=["NER_Simple"], chunksize=chunksize, nrows=nrows
+        )
+    )
+    total = factory()
+
+    def merge(result) -> None:
+        summary, resolutions = result
+        total.merge(summary)
+        if normalizer is not None:
+            normalizer.adopt(resolutions)
+
+    if workers <= 1:
+        for ner_simple in chunks:
+            summary = factory()
+            summary.update(*count_chunk(ner_simple, normalizer))
+            total.merge(summary)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(normalizer, factory)
+        ) as pool:
+            # pool.map consumes the chunk generator eagerly; bound the backlog
+            pending = []
+            for ner_simple in chunks:
+                pending.append(pool.submit(_count_task, ner_simple))
+                if len(pending) >= 2 * workers:
+                    merge(pending.pop(0).result())
+            for future in pending:
+                merge(future.result())
+    if normalizer is not None:
+        normalizer.flush()
+
+    end_time = time.time()
+    print(f"Ingredient frequencies counted in {end_time - start_time:.2f} seconds")
+    return total
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Ingredient frequencies, exact or sketched")
+    parser.add_argument("--input", default="simplified_dataset.csv")
+    parser.add_argument("--output", default="ingredient_frequency_summary.json")
+    parser.add_argument("--mode", choices=["exact", "approximate"], default="exact")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="Most common ingredients to report")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--nrows", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--width", type=int, default=SKETCH_WIDTH, help="Count-Min columns")
+    parser.add_argument("--depth", type=int, default=SKETCH_DEPTH, help="Count-Min rows")
+    parser.add_argument("--capacity", type=int, default=SKETCH_CAPACITY, help="Space-Saving counters")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--raw-ingredients",
+        action="store_true",
+        help="Skip the shared ingredient normalizer and keep NER_Simple as is",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    normalizer = None if args.raw_ingredients else IngredientNormalizer()
+    frequencies = count_frequencies(
+        args.input,
+        mode=args.mode,
+        chunksize=args.chunksize,
+        nrows=args.nrows,
+        workers=args.workers,
+        normalizer=normalizer,
+        width=args.width,
+        depth=args.depth,
+        capacity=args.capacity,
+        seed=args.seed,
+    )
+    summary = frequencies.summary(top=args.top)
+    with open(args.output, "w") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    print(f"Total unique ingredients: {summary['total_unique_ingredients']}")
+    print(f"Total ingredient occurrences: {summary['total_ingredients']}")
+    for ingredient, count in summary["most_common_ingredients"][:10]:
+        print(f"  {ingredient}: {count}")
+    print(f"Results saved to {args.output}")
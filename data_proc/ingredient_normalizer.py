@@ -0,0 +1,258 @@
+"""Shared raw ingredient string -> canonical ingredient ID resolution.
+
+Every pipeline (DBSCAN notebooks, graph statistics, recipe rating) cleans
+ingredients through this module, so a raw string is resolved once and later
+runs only do dictionary lookups.
+
+Resolution order for a raw string:
+    1. in-process LRU cache
+    2. persistent cache of earlier resolutions (resolved.jsonl)
+    3. fast path: clean_text(), then the alias table (exact cleaned text, alias
+       targets map to themselves, then the order-insensitive stopword-free
+       token key), else the cleaned text itself is the canonical name
+
+Layout under <root>/:
+    vocabulary.txt   canonical names, one per line; line number = ingredient ID
+                     (append-only, so IDs stay stable)
+    aliases.tsv      cleaned alias <TAB> canonical name, e.g. from DBSCAN clusters
+    resolved.jsonl   ["raw string", id] per line, appended by flush()
+"""
+
+import json
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_ROOT = Path(__file__).parent / "normalizer"
+
+STOPWORDS = frozenset({
+    "fresh", "chopped", "optional", "ground",
+    "large", "small", "or", "and"
+})
+
+# resolve() result for strings that are not ingredients at all
+EMPTY = -1
+
+# Distinct raw strings remembered by the in-process LRU
+RESOLVE_CACHE_SIZE = 1 << 18
+
+_non_alpha = re.compile(r"[^a-z\s]")
+_multi_space = re.compile(r"\s+")
+
+
+def clean_text(raw: str) -> str:
+    """Lowercase, letters only, single spaces ("Black-Pepper " -> "black pepper")"""
+    text = _non_alpha.sub(" ", str(raw).lower())
+    return _multi_space.sub(" ", text).strip()
+
+
+def tokens(raw: str) -> frozenset:
+    """Stopword-free token set of a raw string"""
+    return frozenset(t for t in clean_text(raw).split() if t not in STOPWORDS)
+
+
+def token_key(raw: str) -> str:
+    return " ".join(sorted(tokens(raw)))
+
+
+def aliases_from_clusters(clusters: Mapping[int, Sequence[str]]) -> Dict[str, str]:
+    """Map every member of a DBSCAN cluster to its simplest (fewest words) member.
+
+    Noise (label -1) maps to itself, so it needs no alias.
+    """
+    aliases = {}
+    for label, members in clusters.items():
+        if label == -1 or not members:
+            continue
+        simplest = min(members, key=lambda x: len(x.split()))
+        for member in members:
+            if member != simplest:
+                aliases[member] = simplest
+    return aliases
+
+
+class IngredientNormalizer:
+    """Raw string -> canonical ingredient ID, cached in memory and on disk"""
+
+    def __init__(self, root=DEFAULT_ROOT, persist: bool = True):
+        self.root = Path(root)
+        self.persist = persist
+        self.names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._saved_names = 0
+        self.aliases: Dict[str, str] = {}
+        self._targets: set = set()
+        self._token_aliases: Dict[str, str] = {}
+        self._resolved: Dict[str, int] = {}
+        self._pending: List[tuple] = []
+        if persist:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._load()
+        self.resolve = lru_cache(maxsize=RESOLVE_CACHE_SIZE)(self._resolve)
+
+    def __getstate__(self):
+        # the LRU wrapper is per process and cannot be pickled
+        state = self.__dict__.copy()
+        del state["resolve"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.resolve = lru_cache(maxsize=RESOLVE_CACHE_SIZE)(self._resolve)
+
+    # ----------------------------
+    # Persistence
+    # ----------------------------
+
+    @property
+    def _vocabulary_file(self) -> Path:
+        return self.root / "vocabulary.txt"
+
+    @property
+    def _aliases_file(self) -> Path:
+        return self.root / "aliases.tsv"
+
+    @property
+    def _resolved_file(self) -> Path:
+        return self.root / "resolved.jsonl"
+
+    def _load(self) -> None:
+        if self._vocabulary_file.exists():
+            with self._vocabulary_file.open(encoding="utf-8") as f:
+                self.names = [line.rstrip("\n") for line in f]
+            self._ids = {name: i for i, name in enumerate(self.names)}
+            self._saved_names = len(self.names)
+
+        if self._aliases_file.exists():
+            with self._aliases_file.open(encoding="utf-8") as f:
+                pairs = [line.rstrip("\n").split("\t") for line in f if line.strip()]
+            # a hand edit or torn write must not break every pipeline
+            bad = sum(len(p) != 2 for p in pairs)
+            if bad:
+                print(f"Warning: skipped {bad} malformed line(s) in {self._aliases_file}")
+            self._set_alias_table(dict(p for p in pairs if len(p) == 2))
+
+        if self._resolved_file.exists():
+            with self._resolved_file.open(encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        raw, i = json.loads(line)
+                    except ValueError:
+                        break  # torn last line of an interrupted flush
+                    if i < len(self.names):
+                        self._resolved[raw] = i
+
+    def flush(self) -> None:
+        """Append new canonical names and resolutions to disk"""
+        if not self.persist:
+            return
+        if self._saved_names < len(self.names):
+            with self._vocabulary_file.open("a", encoding="utf-8") as f:
+                f.writelines(name + "\n" for name in self.names[self._saved_names:])
+            self._saved_names = len(self.names)
+        if self._pending:
+            with self._resolved_file.open("a", encoding="utf-8") as f:
+                f.writelines(
+                    json.dumps([raw, i], ensure_ascii=False) + "\n" for raw, i in self._pending
+                )
+            self._pending = []
+
+    def take_new(self) -> List[Tuple[str, str]]:
+        """(raw, canonical name) of the resolutions not yet flushed, which are
+        then forgotten here; worker processes hand these to the parent"""
+        new = [(raw, self.names[i]) for raw, i in self._pending]
+        self._pending = []
+        return new
+
+    def adopt(self, resolutions: Iterable[Tuple[str, str]]) -> None:
+        """Record (raw, canonical name) resolutions made by another process"""
+        for raw, canonical in resolutions:
+            if raw not in self._resolved:
+                i = self._resolved[raw] = self._id(canonical)
+                self._pending.append((raw, i))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    # ----------------------------
+    # Aliases
+    # ----------------------------
+
+    def _set_alias_table(self, aliases: Dict[str, str]) -> None:
+        self.aliases = aliases
+        self._targets = set(aliases.values())
+        self._token_aliases = {}
+        for canonical in self._targets:
+            self._token_aliases[token_key(canonical)] = canonical
+        for alias, canonical in aliases.items():
+            self._token_aliases.setdefault(token_key(alias), canonical)
+
+    def set_aliases(self, aliases: Mapping[str, str]) -> None:
+        """Replace the alias table; earlier resolutions are forgotten"""
+        table = {}
+        for alias, canonical in aliases.items():
+            alias, canonical = clean_text(alias), clean_text(canonical)
+            if alias and canonical and alias != canonical:
+                table[alias] = canonical
+        self._set_alias_table(table)
+
+        self._resolved = {}
+        self._pending = []
+        self.resolve.cache_clear()
+        if self.persist:
+            tmp = self._aliases_file.with_suffix(".tmp")
+            tmp.write_text(
+                "".join(f"{a}\t{c}\n" for a, c in sorted(table.items())), encoding="utf-8"
+            )
+            os.replace(tmp, self._aliases_file)
+            self._resolved_file.unlink(missing_ok=True)
+
+    # ----------------------------
+    # Resolution
+    # ----------------------------
+
+    def _id(self, canonical: str) -> int:
+        i = self._ids.get(canonical)
+        if i is None:
+            i = self._ids[canonical] = len(self.names)
+            self.names.append(canonical)
+        return i
+
+    def _resolve(self, raw: str) -> int:
+        hit = self._resolved.get(raw)
+        if hit is not None:
+            return hit
+        clean = clean_text(raw)
+        if not clean:
+            return EMPTY
+        canonical = self.aliases.get(clean)
+        if canonical is None and clean not in self._targets:
+            canonical = self._token_aliases.get(token_key(clean))
+        canonical = canonical or clean
+        i = self._id(canonical)
+        self._resolved[raw] = i
+        self._pending.append((raw, i))
+        return i
+
+    def canonical(self, raw: str) -> str:
+        """Canonical name of raw ("" for strings with no letters)"""
+        i = self.resolve(raw)
+        return self.names[i] if i != EMPTY else ""
+
+    def canonical_list(self, ingredients: Iterable[str]) -> List[str]:
+        """Canonical names of a recipe's ingredients, empties and repeats dropped"""
+        names = (self.canonical(x) for x in ingredients)
+        return list(dict.fromkeys(n for n in names if n))
+
+    def resolve_many(self, raws: Sequence[str]) -> np.ndarray:
+        """IDs for many raw strings, resolving each distinct string once"""
+        uniques, inverse = np.unique(np.asarray(raws, dtype=object).astype(str), return_inverse=True)
+        ids = np.fromiter((self.resolve(u) for u in uniques), dtype=np.int64, count=len(uniques))
+        return ids[inverse]
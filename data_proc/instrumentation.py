@@ -0,0 +1,338 @@
+"""Stage spans, rate-limited progress and JSON run reports for the pipelines.
+
+A stage records wall and CPU time (including reaped worker processes), RSS
+at its start and end, how far it raised the process peak RSS, and items per
+second. Library code opens stages unconditionally:
+
+    with stage("graph.ingest", total=n, unit="recipes") as s:
+        for chunk in chunks:
+            ...
+            s.advance(len(chunk))
+
+Without start_run the spans go to a default run that is never written, so a
+stage costs a few clock reads and advance() one time check. A CLI wires the
+shared flags in with add_arguments and calls start_run after parsing; the
+report is written when the process exits, also after an error:
+
+    --report run.json             JSON run report with every stage
+    --profile 'graph.*'           cProfile the matching stages (.prof files
+                                  next to the report, top functions inline)
+    --trace-memory graph.csr      tracemalloc peak and the largest allocation
+                                  sites still live when the stage ends
+    --progress-interval 5         seconds between progress lines (0: off)
+
+Stage patterns are fnmatch globs over stage names. Neither capture nests: a
+stage asking for one while an enclosing stage holds it runs without.
+"""
+
+import argparse
+import atexit
+import cProfile
+import fnmatch
+import json
+import os
+import platform
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPORT_FORMAT = "run-report-v1"
+PROGRESS_INTERVAL = 5.0
+# functions / allocation sites kept inline in the report per capture
+PROFILE_TOP = 25
+TRACE_TOP = 10
+
+
+def _rss_bytes() -> Optional[int]:
+    """Current resident set size (Linux only)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _peak_rss_bytes(who: int = 0) -> Optional[int]:
+    """High-water RSS of this process (or its largest reaped child)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(who or resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _children_cpu() -> float:
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+def _profile_top(profiler: cProfile.Profile) -> List[Dict]:
+    rows = []
+    for (file, line, func), (_, calls, total, cumulative, _) in pstats.Stats(profiler).stats.items():
+        rows.append(
+            {
+                "function": f"{file}:{line}({func})",
+                "calls": calls,
+                "total_s": round(total, 6),
+                "cumulative_s": round(cumulative, 6),
+            }
+        )
+    rows.sort(key=lambda r: r["cumulative_s"], reverse=True)
+    return rows[:PROFILE_TOP]
+
+
+class Stage:
+    """One timed span; advance() counts items and prints rate-limited progress"""
+
+    def __init__(
+        self,
+        run: "Run",
+        name: str,
+        total: Optional[int] = None,
+        unit: str = "items",
+        parent: Optional[str] = None,
+    ):
+        self.run = run
+        self.name = name
+        self.total = total
+        self.unit = unit
+        self.parent = parent
+        self.items = 0
+        self.fields: Dict = {}
+        self._start = time.perf_counter()
+        self._next_progress = self._start + run.progress_interval
+
+    def advance(self, n: int = 1) -> None:
+        self.items += n
+        if self.run.progress_interval:
+            now = time.perf_counter()
+            if now >= self._next_progress:
+                self._next_progress = now + self.run.progress_interval
+                print(f"[{self.name}] {self._progress(now - self._start)}", flush=True)
+
+    def note(self, **fields) -> None:
+        """Extra values stored with the stage in the report"""
+        self.fields.update(fields)
+
+    def _progress(self, elapsed: float) -> str:
+        done = f"{self.items:,}" if self.total is None else f"{self.items:,} / {self.total:,}"
+        rate = self.items / elapsed if elapsed > 0 else 0.0
+        line = f"{done} {self.unit} ({rate:,.0f} {self.unit}/s"
+        if self.total and rate > 0 and self.items < self.total:
+            line += f", ~{(self.total - self.items) / rate:,.0f}s left"
+        return line + ")"
+
+
+class Run:
+    """Stages of one pipeline run and the JSON report built from them"""
+
+    def __init__(
+        self,
+        name: str,
+        report_path: Optional[Path] = None,
+        profile: Sequence[str] = (),
+        trace_memory: Sequence[str] = (),
+        progress_interval: float = PROGRESS_INTERVAL,
+    ):
+        self.name = name
+        self.report_path = Path(report_path) if report_path else None
+        self.profile = list(profile)
+        self.trace_memory = list(trace_memory)
+        self.progress_interval = progress_interval
+        self.records: List[Dict] = []
+        self.started = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        self._start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._children_cpu_start = _children_cpu()
+        self._open: List[Stage] = []
+        self._profiling = False
+        self._tracing = False
+        self._finished = False
+
+    @contextmanager
+    def stage(
+        self, name: str, total: Optional[int] = None, unit: str = "items"
+    ) -> Iterator[Stage]:
+        span = Stage(self, name, total, unit, parent=self._open[-1].name if self._open else None)
+        record = {"name": name, "parent": span.parent}
+        # records are kept in start order; filled in when the stage ends
+        self.records.append(record)
+        profiler = self._start_profile(name)
+        traced = self._start_trace(name)
+        self._open.append(span)
+        rss_start = _rss_bytes()
+        peak_start = _peak_rss_bytes()
+        cpu_start = time.process_time()
+        children_cpu_start = _children_cpu()
+        status = "ok"
+        try:
+            yield span
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            wall = time.perf_counter() - span._start
+            peak_end = _peak_rss_bytes()
+            self._open.pop()
+            record.update(
+                status=status,
+                wall_s=round(wall, 6),
+                cpu_s=round(time.process_time() - cpu_start, 6),
+                children_cpu_s=round(_children_cpu() - children_cpu_start, 6),
+                items=span.items,
+                unit=span.unit,
+                items_per_s=round(span.items / wall, 3) if wall > 0 and span.items else None,
+                rss_start_bytes=rss_start,
+                rss_end_bytes=_rss_bytes(),
+                # ru_maxrss is per process: the stage's own peak is only
+                # visible as growth of the process high-water mark
+                process_peak_rss_bytes=peak_end,
+                peak_rss_growth_bytes=peak_end - peak_start if peak_end is not None else None,
+                **span.fields,
+            )
+            if profiler is not None:
+                record["profile"] = self._stop_profile(name, profiler)
+            if traced:
+                record["tracemalloc"] = self._stop_trace()
+            if self.progress_interval:
+                done = f", {span._progress(wall)}" if span.items else ""
+                print(f"[{name}] {status} in {wall:.2f}s{done}", flush=True)
+
+    def _matches(self, patterns: Sequence[str], name: str) -> bool:
+        return any(fnmatch.fnmatchcase(name, p) for p in patterns)
+
+    def _start_profile(self, name: str) -> Optional[cProfile.Profile]:
+        if self._profiling or not self._matches(self.profile, name):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler is already active
+            return None
+        self._profiling = True
+        return profiler
+
+    def _stop_profile(self, name: str, profiler: cProfile.Profile) -> Dict:
+        profiler.disable()
+        self._profiling = False
+        capture = {"top": _profile_top(profiler)}
+        if self.report_path is not None:
+            path = self.report_path.with_name(
+                f"{self.report_path.stem}.{name.replace('/', '_')}.prof"
+            )
+            path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(path)
+            capture["file"] = str(path)
+        return capture
+
+    def _start_trace(self, name: str) -> bool:
+        if self._tracing or tracemalloc.is_tracing() or not self._matches(self.trace_memory, name):
+            return False
+        tracemalloc.start()
+        self._tracing = True
+        return True
+
+    def _stop_trace(self) -> Dict:
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        self._tracing = False
+        return {
+            "peak_bytes": peak,
+            "top": [
+                {"site": str(stat.traceback[0]), "bytes": stat.size, "blocks": stat.count}
+                for stat in snapshot.statistics("lineno")[:TRACE_TOP]
+            ],
+        }
+
+    def report(self) -> Dict:
+        return {
+            "format": REPORT_FORMAT,
+            "run": self.name,
+            "argv": sys.argv,
+            "started": self.started,
+            "wall_s": round(time.perf_counter() - self._start, 6),
+            "cpu_s": round(time.process_time() - self._cpu_start, 6),
+            "children_cpu_s": round(_children_cpu() - self._children_cpu_start, 6),
+            "peak_rss_bytes": _peak_rss_bytes(),
+            "children_peak_rss_bytes": _peak_rss_bytes(resource.RUSAGE_CHILDREN) if resource else None,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "stages": self.records,
+        }
+
+    def finish(self) -> Optional[Dict]:
+        """Write the report (once); returns it, or None without a report path"""
+        if self._finished or self.report_path is None:
+            return None
+        self._finished = True
+        report = self.report()
+        self.report_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.report_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Run report saved to {self.report_path}")
+        return report
+
+
+_current = Run("default")
+
+
+def current_run() -> Run:
+    return _current
+
+
+def stage(name: str, total: Optional[int] = None, unit: str = "items"):
+    """Stage of the current run (see Run.stage)"""
+    return _current.stage(name, total=total, unit=unit)
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """The shared --report / --profile / --trace-memory / --progress-interval flags"""
+    group = parser.add_argument_group("instrumentation")
+    group.add_argument(
+        "--report", type=Path, default=None, help="Write a JSON run report with per-stage metrics"
+    )
+    group.add_argument(
+        "--profile",
+        action="append",
+        default=[],
+        metavar="STAGE",
+        help="cProfile stages matching this glob (repeatable; '*' for all)",
+    )
+    group.add_argument(
+        "--trace-memory",
+        action="append",
+        default=[],
+        metavar="STAGE",
+        help="tracemalloc stages matching this glob (repeatable)",
+    )
+    group.add_argument(
+        "--progress-interval",
+        type=float,
+        default=PROGRESS_INTERVAL,
+        help="Seconds between progress lines (0 disables progress output)",
+    )
+
+
+def start_run(name: str, args: Optional[argparse.Namespace] = None) -> Run:
+    """Make a fresh run current, configured from add_arguments flags"""
+    global _current
+    _current = Run(
+        name,
+        report_path=getattr(args, "report", None),
+        profile=getattr(args, "profile", ()),
+        trace_memory=getattr(args, "trace_memory", ()),
+        progress_interval=getattr(args, "progress_interval", PROGRESS_INTERVAL),
+    )
+    atexit.register(_current.finish)
+    return _current
@@ -0,0 +1,394 @@
+"""Concurrent, cached client for an Ollama-compatible HTTP endpoint.
+
+Cleanup prompts (/api/generate) and embeddings (/api/embed) go through one
+asyncio client that keeps a small pool of keep-alive connections, runs at most
+`concurrency` requests at a time, splits embedding inputs into batches and
+retries transient failures. Every (model, request) result is stored in a
+content-addressed cache, so a rerun only asks the server for what is new.
+
+Cache layout under <root>/:
+    <2 hex>/<30 hex>.json   one result per file, named by the blake2b hash of
+                            the canonical JSON request ({"api", "model", ...});
+                            written to a temp file and renamed into place
+
+Embedding requests are cached per input string, so changing the batch size
+or adding ingredients reuses everything already embedded.
+
+Usage from a notebook (top-level await):
+    async with OllamaClient("http://localhost:11435") as client:
+        X = await client.embed("phi3:3.8b", sorted(ings))
+
+`python llm_client.py bench` runs the same requests against a local fake
+server with simulated latency and prints throughput per concurrency limit.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_HOST = "http://localhost:11435"
+DEFAULT_ROOT = Path(__file__).parent / "llm_cache"
+
+CONCURRENCY = 8
+EMBED_BATCH_SIZE = 64
+RETRIES = 3
+TIMEOUT = 120.0
+
+# statuses worth retrying: the server is busy or restarting
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class OllamaError(RuntimeError):
+    def __init__(self, status: int, body: str):
+        super().__init__(f"HTTP {status}: {body[:200]}")
+        self.status = status
+
+
+# ----------------------------
+# Result cache
+# ----------------------------
+
+
+class ResultCache:
+    """Content-addressed JSON results on disk"""
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(request: dict) -> str:
+        canonical = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key[2:]}.json"
+
+    def get(self, request: dict):
+        path = self._path(self.key(request))
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put(self, request: dict, result) -> None:
+        path = self._path(self.key(request))
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(result, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+
+# ----------------------------
+# Keep-alive HTTP/1.1 connections
+# ----------------------------
+
+
+class _ConnectionPool:
+    """Idle keep-alive connections to one host, reused across requests"""
+
+    def __init__(self, host: str, port: int, size: int):
+        self.host = host
+        self.port = port
+        self.idle: asyncio.LifoQueue = asyncio.LifoQueue(maxsize=size)
+
+    async def acquire(self):
+        while not self.idle.empty():
+            reader, writer = self.idle.get_nowait()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer
+            writer.close()
+        return await asyncio.open_connection(self.host, self.port)
+
+    def release(self, conn, reusable: bool) -> None:
+        if reusable and not self.idle.full():
+            self.idle.put_nowait(conn)
+        else:
+            conn[1].close()
+
+    async def close(self) -> None:
+        while not self.idle.empty():
+            _, writer = self.idle.get_nowait()
+            writer.close()
+
+
+async def _read_response(reader) -> Tuple[int, Dict[str, str], bytes]:
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("connection closed by server")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        body = b"".join(chunks)
+    elif "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+    else:
+        body = await reader.read()
+        headers["connection"] = "close"
+    return status, headers, body
+
+
+# ----------------------------
+# Client
+# ----------------------------
+
+
+class OllamaClient:
+    """Bounded-concurrency Ollama client with retries and a result cache"""
+
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,
+        concurrency: int = CONCURRENCY,
+        batch_size: int = EMBED_BATCH_SIZE,
+        retries: int = RETRIES,
+        timeout: float = TIMEOUT,
+        cache: Optional[ResultCache] = None,
+    ):
+        url = urlsplit(host if "://" in host else f"http://{host}")
+        self.host = url.hostname or "localhost"
+        self.port = url.port or 80
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.retries = retries
+        self.timeout = timeout
+        self.cache = cache if cache is not None else ResultCache()
+        self.requests = 0  # HTTP requests actually sent, for reporting
+        self._limit: Optional[asyncio.Semaphore] = None
+        self._pool: Optional[_ConnectionPool] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+
+    def _ensure_loop_state(self) -> None:
+        # created lazily so the client can be built outside a running loop
+        if self._limit is None:
+            self._limit = asyncio.Semaphore(self.concurrency)
+            self._pool = _ConnectionPool(self.host, self.port, self.concurrency)
+
+    async def _send(self, path: str, payload: dict) -> dict:
+        body = json.dumps(payload).encode("utf-8")
+        head = (
+            f"POST {path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        ).encode("latin-1")
+
+        conn = await self._pool.acquire()
+        reusable = False
+        try:
+            conn[1].write(head + body)
+            await conn[1].drain()
+            status, headers, data = await _read_response(conn[0])
+            reusable = headers.get("connection", "").lower() != "close"
+        finally:
+            self._pool.release(conn, reusable)
+        if status != 200:
+            raise OllamaError(status, data.decode("utf-8", "replace"))
+        return json.loads(data)
+
+    async def post(self, path: str, payload: dict) -> dict:
+        """POST payload, retrying timeouts, dropped connections and busy servers"""
+        self._ensure_loop_state()
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._limit:
+                    self.requests += 1
+                    return await asyncio.wait_for(self._send(path, payload), self.timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                error = e
+            except OllamaError as e:
+                if e.status not in RETRY_STATUSES:
+                    raise
+                error = e
+            if attempt < self.retries:
+                await asyncio.sleep(0.5 * 2 ** attempt + random.random() * 0.1)
+        raise error
+
+    # ----------------------------
+    # Endpoints
+    # ----------------------------
+
+    async def embed(self, model: str, inputs: Sequence[str]) -> List[List[float]]:
+        """Embedding of every input string, in input order"""
+        vectors: Dict[str, List[float]] = {}
+        missing = []
+        for text in dict.fromkeys(inputs):
+            hit = self.cache.get({"api": "embed", "model": model, "input": text})
+            if hit is None:
+                missing.append(text)
+            else:
+                vectors[text] = hit
+
+        async def run(batch):
+            out = await self.post("/api/embed", {"model": model, "input": batch})
+            for text, vector in zip(batch, out["embeddings"]):
+                self.cache.put({"api": "embed", "model": model, "input": text}, vector)
+                vectors[text] = vector
+
+        batches = [missing[i : i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        await asyncio.gather(*(run(b) for b in batches))
+        return [vectors[text] for text in inputs]
+
+    async def generate(
+        self,
+        model: str,
+        prompt: str,
+        system: Optional[str] = None,
+        format: Optional[str] = None,
+        options: Optional[dict] = None,
+    ) -> str:
+        """Full (non-streamed) response text for one prompt"""
+        payload = {"model": model, "prompt": prompt, "stream": False}
+        if system is not None:
+            payload["system"] = system
+        if format is not None:
+            payload["format"] = format
+        if options:
+            payload["options"] = options
+        request = {"api": "generate", **payload}
+        hit = self.cache.get(request)
+        if hit is not None:
+            return hit
+        out = await self.post("/api/generate", payload)
+        self.cache.put(request, out["response"])
+        return out["response"]
+
+    async def generate_many(self, model: str, prompts: Sequence[str], **kwargs) -> List[str]:
+        """generate() over many prompts; the semaphore bounds what is in flight"""
+        unique = list(dict.fromkeys(prompts))
+        results = await asyncio.gather(*(self.generate(model, p, **kwargs) for p in unique))
+        answers = dict(zip(unique, results))
+        return [answers[p] for p in prompts]
+
+
+# ----------------------------
+# Local stand-in server
+# ----------------------------
+
+
+async def start_fake_server(host="127.0.0.1", port=0, latency=0.05, dim=8, fail_every=0):
+    """Minimal Ollama lookalike for tests and benchmarks.
+
+    Every request sleeps `latency` seconds; embeddings are deterministic
+    pseudo-random vectors of the input text. With fail_every=n, every n-th
+    request answers 503 so retries get exercised. Returns (server, url).
+    """
+    count = 0
+
+    def vector(text):
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=2 * dim).digest()
+        return [b / 255 for b in digest[:dim]]
+
+    async def handle(reader, writer):
+        nonlocal count
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                path = line.split()[1].decode()
+                length = 0
+                while (header := await reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = header.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value)
+                payload = json.loads(await reader.readexactly(length))
+                await asyncio.sleep(latency)
+
+                count += 1
+                status = 200
+                if fail_every and count % fail_every == 0:
+                    status, out = 503, {"error": "busy"}
+                elif path == "/api/embed":
+                    out = {"model": payload["model"], "embeddings": [vector(t) for t in payload["input"]]}
+                elif path == "/api/generate":
+                    out = {"model": payload["model"], "response": json.dumps({"echo": payload["prompt"]})}
+                else:
+                    status, out = 404, {"error": f"unknown path {path}"}
+
+                body = json.dumps(out).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} X\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"http://{host}:{port}"
+
+
+async def _bench(ingredients, concurrency_values, latency, batch_size):
+    server, url = await start_fake_server(latency=latency)
+    cache_root = tempfile.mkdtemp(prefix="llm_cache_bench_")
+    async with server:
+        for concurrency in concurrency_values:
+            cache = ResultCache(Path(cache_root) / f"c{concurrency}")
+            async with OllamaClient(url, concurrency=concurrency, batch_size=batch_size,
+                                    cache=cache) as client:
+                start = time.time()
+                await client.embed("fake", ingredients)
+                await client.generate_many("fake", ingredients[:256], format="json")
+                cold = time.time() - start
+                sent = client.requests
+
+                start = time.time()
+                await client.embed("fake", ingredients)
+                warm = time.time() - start
+            print(f"concurrency {concurrency:>3}: {sent:>5} requests in {cold:6.2f}s "
+                  f"({sent / cold:7.1f} req/s), cached rerun {warm:.2f}s")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Ollama client throughput against a local fake server")
+    parser.add_argument("command", choices=["bench"])
+    parser.add_argument("--ingredients", type=Path, default=Path(__file__).parent / "ingredient_frequencies.json",
+                        help="JSON object whose keys are the ingredient strings")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds per fake request")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    ingredients = list(json.loads(args.ingredients.read_text(encoding="utf-8")))
+    print(f"{len(ingredients)} ingredients, {args.latency * 1000:.0f} ms per request")
+    asyncio.run(_bench(ingredients, args.concurrency, args.latency, args.batch_size))
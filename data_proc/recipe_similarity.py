@@ -0,0 +1,416 @@
+"""MinHash / LSH index of recipe ingredient sets.
+
+The all-pairs recipe graph links any two recipes sharing one ingredient and
+ends up nearly complete. This index keeps only recipe pairs whose ingredient
+sets have Jaccard similarity >= threshold:
+
+    1. every ingredient name is hashed to a stable 31-bit value, then through
+       num_perm random permutations h(x) = (a * x + b) mod (2^31 - 1); a
+       recipe's signature is the per-permutation minimum over its ingredients
+       (one np.minimum.reduceat per shard of recipes, sharded over processes)
+    2. signatures are cut into `bands` bands of `rows` values; recipes whose
+       band values collide in any band become candidate pairs
+    3. candidates are verified with their exact Jaccard similarity
+
+Building is linear in the number of (recipe, ingredient) entries plus the
+number of candidate pairs. A top-k query hashes the query's bands, looks
+each up in the sorted band keys (binary search) and ranks only the colliding
+recipes, so it never scans the corpus.
+
+Works on anything shaped like graph_stats.RecipeCorpus (recipe_ids, indptr,
+ingredient_ids, vocabulary).
+"""
+
+import hashlib
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from graph_metrics import CSRGraph
+
+MERSENNE_PRIME = (1 << 31) - 1
+EMPTY_HASH = np.uint32(MERSENNE_PRIME)  # larger than any permuted value
+
+DEFAULT_NUM_PERM = 128
+DEFAULT_THRESHOLD = 0.5
+# Recipes per signature shard; bounds the (entries x num_perm) hash block
+SHARD_RECIPES = 20_000
+# Colliding recipes paired per bucket; larger buckets are paired in chunks
+# (see _bucket_pairs for the pairs this misses)
+MAX_BUCKET = 1000
+# Candidates are verified exactly, so a false positive only costs time while
+# a false negative loses an edge; band selection weighs misses this much
+RECALL_WEIGHT = 0.9
+# Candidate pairs verified per batch
+VERIFY_BATCH = 1 << 20
+
+# odd 64-bit multiplier used to fold a band's values into one key
+_BAND_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def ingredient_hash(name: str) -> int:
+    """Stable 31-bit value of an ingredient name, independent of vocabulary order"""
+    digest = hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % MERSENNE_PRIME
+
+
+def optimal_bands(
+    threshold: float, num_perm: int, recall_weight: float = RECALL_WEIGHT
+) -> Tuple[int, int]:
+    """(bands, rows) with bands * rows <= num_perm minimising the weighted
+    false positive and false negative probability mass around threshold."""
+    s = np.linspace(0, 1, 1001)
+    best, best_error = (1, num_perm), math.inf
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        collide = 1 - (1 - s**rows) ** bands
+        below = s < threshold
+        error = (1 - recall_weight) * collide[below].sum() + recall_weight * (
+            1 - collide[~below]
+        ).sum()
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+# ----------------------------
+# Process pool plumbing
+# ----------------------------
+
+_worker_hashes: Optional[np.ndarray] = None
+
+
+def _init_worker(hashes: np.ndarray) -> None:
+    global _worker_hashes
+    _worker_hashes = hashes
+
+
+def _signature_shard(task) -> np.ndarray:
+    """Signatures of one contiguous shard of recipes.
+
+    Folds the k-th ingredient of every recipe longer than k into a running
+    minimum; row gathers stay contiguous, unlike a reduceat over entries.
+    """
+    ingredient_ids, indptr = task
+    counts = np.diff(indptr)
+    out = np.full((len(counts), _worker_hashes.shape[1]), EMPTY_HASH, dtype=np.uint32)
+    rows = np.flatnonzero(counts > 0)
+    k = 0
+    while len(rows):
+        hashes = _worker_hashes[ingredient_ids[indptr[rows] + k]]
+        out[rows] = np.minimum(out[rows], hashes)
+        k += 1
+        rows = rows[counts[rows] > k]
+    return out
+
+
+def _permuted_hashes(values: np.ndarray, num_perm: int, seed: int) -> np.ndarray:
+    """(len(values), num_perm) uint32 permutation hashes"""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+    values = np.asarray(values, dtype=np.uint64)
+    return ((values[:, None] * a[None, :] + b[None, :]) % np.uint64(MERSENNE_PRIME)).astype(
+        np.uint32
+    )
+
+
+def compute_signatures(
+    indptr: np.ndarray, ingredient_ids: np.ndarray, hashes: np.ndarray, workers: int = 1
+) -> np.ndarray:
+    """MinHash signature of every recipe, sharded over a process pool"""
+    n = len(indptr) - 1
+    tasks = []
+    for start in range(0, n, SHARD_RECIPES):
+        end = min(start + SHARD_RECIPES, n)
+        lo, hi = indptr[start], indptr[end]
+        tasks.append((ingredient_ids[lo:hi], indptr[start : end + 1] - lo))
+
+    if workers <= 1 or len(tasks) < 2:
+        _init_worker(hashes)
+        shards = [_signature_shard(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(hashes,)
+        ) as pool:
+            shards = list(pool.map(_signature_shard, tasks))
+    if not shards:
+        return np.zeros((0, hashes.shape[1]), dtype=np.uint32)
+    return np.concatenate(shards)
+
+
+def band_keys(signatures: np.ndarray, bands: int, rows: int) -> np.ndarray:
+    """(bands, n) uint64 key of every recipe's band"""
+    keys = np.zeros((bands, len(signatures)), dtype=np.uint64)
+    for band in range(bands):
+        block = signatures[:, band * rows : (band + 1) * rows].astype(np.uint64)
+        key = np.zeros(len(signatures), dtype=np.uint64)
+        for j in range(rows):
+            key = key * _BAND_MULTIPLIER + block[:, j]
+        keys[band] = key
+    return keys
+
+
+def _bucket_pairs(sorted_keys: np.ndarray, order: np.ndarray, max_bucket: int) -> np.ndarray:
+    """All (i, j) pairs, i < j, of recipes sharing a key in one band.
+
+    Buckets above max_bucket recipes are paired in consecutive chunks, which
+    keeps degenerate buckets (thousands of identical sets) from going quadratic.
+    Each band orders a bucket by its own seeded shuffle, so two recipes of a
+    bucket of m share a chunk with probability about (max_bucket - 1) / (m - 1)
+    per band, independently across bands. A pair colliding in b bands is missed
+    with probability about (1 - (max_bucket - 1) / (m - 1)) ** b: for identical
+    recipes in a bucket of 5,000 under the default 32 bands that is 0.08%, in
+    a bucket of 20,000 about 19%.
+    """
+    n = len(sorted_keys)
+    if n < 2:
+        return np.zeros((0, 2), dtype=np.int64)
+    positions = np.arange(n)
+    new_key = np.empty(n, dtype=bool)
+    new_key[0] = True
+    new_key[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    run_start = np.maximum.accumulate(np.where(new_key, positions, 0))
+    starts = np.flatnonzero(new_key | ((positions - run_start) % max_bucket == 0))
+    group_end = np.repeat(np.r_[starts[1:], n], np.diff(np.r_[starts, n]))
+
+    # position p pairs with every later position of its group
+    partners = group_end - positions - 1
+    total = int(partners.sum())
+    if total == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+    left = np.repeat(positions, partners)
+    first = np.cumsum(partners) - partners
+    right = left + 1 + np.arange(total) - np.repeat(first, partners)
+    pairs = np.stack([order[left], order[right]], axis=1).astype(np.int64)
+    pairs.sort(axis=1)
+    return pairs
+
+
+@dataclass
+class SimilarityEdges:
+    """Verified recipe pairs (rows i < j of the index) and their Jaccard similarity"""
+
+    i: np.ndarray
+    j: np.ndarray
+    jaccard: np.ndarray
+    candidates: int
+
+    def __len__(self) -> int:
+        return len(self.jaccard)
+
+
+class RecipeSimilarityIndex:
+    """MinHash signatures plus per-band sorted keys of a recipe corpus"""
+
+    def __init__(
+        self,
+        recipe_ids: Sequence[str],
+        incidence: sp.csr_matrix,
+        vocabulary: Sequence[str],
+        signatures: np.ndarray,
+        threshold: float,
+        bands: int,
+        rows: int,
+        seed: int,
+    ):
+        self.recipe_ids = list(recipe_ids)
+        self.incidence = incidence
+        self.vocabulary = {name: i for i, name in enumerate(vocabulary)}
+        self.signatures = signatures
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.seed = seed
+        self.sizes = np.diff(incidence.indptr)
+
+        keys = band_keys(signatures, bands, rows)
+        # recipes sharing a key are shuffled differently in every band, so
+        # oversized buckets are chunked differently (see _bucket_pairs).
+        # Empty recipes all share EMPTY_HASH keys and never qualify; leaving
+        # them out keeps them from forming one huge bucket per band
+        rng = np.random.default_rng(seed)
+        nonempty = np.flatnonzero(self.sizes > 0)
+        self.order = np.empty((bands, len(nonempty)), dtype=np.int64)
+        for band in range(bands):
+            shuffled = nonempty[rng.permutation(len(nonempty))]
+            self.order[band] = shuffled[np.argsort(keys[band, shuffled], kind="stable")]
+        self.sorted_keys = np.take_along_axis(keys, self.order, axis=1)
+
+    @classmethod
+    def build(
+        cls,
+        corpus,
+        threshold: float = DEFAULT_THRESHOLD,
+        num_perm: int = DEFAULT_NUM_PERM,
+        seed: int = 0,
+        workers: int = 1,
+    ) -> "RecipeSimilarityIndex":
+        incidence = sp.csr_matrix(
+            (
+                np.ones(len(corpus.ingredient_ids), dtype=np.int32),
+                corpus.ingredient_ids,
+                corpus.indptr,
+            ),
+            shape=(len(corpus.recipe_ids), len(corpus.vocabulary)),
+        )
+        # Collapse ingredients repeated within a recipe
+        incidence.sum_duplicates()
+        incidence.data[:] = 1
+
+        values = np.fromiter(
+            (ingredient_hash(name) for name in corpus.vocabulary),
+            dtype=np.uint64,
+            count=len(corpus.vocabulary),
+        )
+        hashes = _permuted_hashes(values, num_perm, seed)
+        signatures = compute_signatures(
+            incidence.indptr, incidence.indices, hashes, workers=workers
+        )
+        bands, rows = optimal_bands(threshold, num_perm)
+        return cls(corpus.recipe_ids, incidence, corpus.vocabulary, signatures,
+                   threshold, bands, rows, seed)
+
+    def __len__(self) -> int:
+        return len(self.recipe_ids)
+
+    # ----------------------------
+    # All pairs above the threshold
+    # ----------------------------
+
+    def jaccard(self, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+        """Exact Jaccard similarity of recipe pairs (i[k], j[k])"""
+        shared = np.asarray(
+            self.incidence[i].multiply(self.incidence[j]).sum(axis=1)
+        ).ravel()
+        union = self.sizes[i] + self.sizes[j] - shared
+        return np.divide(shared, union, out=np.zeros(len(i)), where=union > 0)
+
+    def _band_candidates(self, band: int, max_bucket: int) -> np.ndarray:
+        """Pair keys i * n + j colliding in one band, minus pairs whose set sizes
+        alone rule out reaching the threshold. Every recipe sits in exactly one
+        bucket per band, so the keys are already distinct."""
+        n = len(self)
+        pairs = _bucket_pairs(self.sorted_keys[band], self.order[band], max_bucket)
+        small = np.minimum(self.sizes[pairs[:, 0]], self.sizes[pairs[:, 1]])
+        large = np.maximum(self.sizes[pairs[:, 0]], self.sizes[pairs[:, 1]])
+        # Jaccard <= |smaller| / |larger|
+        keep = small >= self.threshold * large
+        return pairs[keep, 0] * n + pairs[keep, 1]
+
+    def candidate_pairs(self, max_bucket: int = MAX_BUCKET) -> np.ndarray:
+        """Distinct (i, j) pairs colliding in at least one band"""
+        n = len(self)
+        keys = np.zeros(0, dtype=np.int64)
+        for band in range(self.bands):
+            keys = np.union1d(keys, self._band_candidates(band, max_bucket))
+        return np.stack([keys // n, keys % n], axis=1)
+
+    def similar_pairs(self, max_bucket: int = MAX_BUCKET) -> SimilarityEdges:
+        """Every recipe pair with Jaccard similarity >= threshold found by LSH.
+
+        Candidates are verified band by band. Every verified pair key, accepted
+        or not, is kept in one sorted array with its similarity, so a pair
+        colliding in several bands is verified once; each band's new keys are
+        merged in linearly. Memory is 16 bytes per distinct candidate pair.
+        """
+        n = len(self)
+        verified = np.zeros(0, dtype=np.int64)
+        similarity = np.zeros(0, dtype=np.float64)
+        for band in range(self.bands):
+            keys = np.sort(self._band_candidates(band, max_bucket))
+            pos = np.searchsorted(verified, keys)
+            seen = pos < len(verified)
+            seen[seen] = verified[pos[seen]] == keys[seen]
+            keys, pos = keys[~seen], pos[~seen]
+            sim = np.empty(len(keys), dtype=np.float64)
+            for start in range(0, len(keys), VERIFY_BATCH):
+                batch = keys[start : start + VERIFY_BATCH]
+                sim[start : start + VERIFY_BATCH] = self.jaccard(batch // n, batch % n)
+            # positions are ascending, so np.insert is one linear merge
+            verified = np.insert(verified, pos, keys)
+            similarity = np.insert(similarity, pos, sim)
+
+        keep = similarity >= self.threshold
+        keys = verified[keep]
+        return SimilarityEdges(keys // n, keys % n, similarity[keep], len(verified))
+
+    def similarity_matrix(self, edges: Optional[SimilarityEdges] = None) -> sp.csr_matrix:
+        """Upper-triangular sparse matrix of Jaccard similarities above threshold"""
+        edges = edges if edges is not None else self.similar_pairs()
+        n = len(self)
+        return sp.csr_matrix((edges.jaccard, (edges.i, edges.j)), shape=(n, n))
+
+    # ----------------------------
+    # Top-k queries
+    # ----------------------------
+
+    def _candidates(self, signature: np.ndarray) -> np.ndarray:
+        keys = band_keys(signature[None, :], self.bands, self.rows)[:, 0]
+        found = []
+        for band in range(self.bands):
+            row = self.sorted_keys[band]
+            lo = np.searchsorted(row, keys[band], side="left")
+            hi = np.searchsorted(row, keys[band], side="right")
+            found.append(self.order[band, lo:hi])
+        return np.unique(np.concatenate(found)) if found else np.zeros(0, dtype=np.int64)
+
+    def _top_k(self, candidates, shared, query_size, k) -> List[Tuple[str, float]]:
+        union = self.sizes[candidates] + query_size - shared
+        sim = np.divide(shared, union, out=np.zeros(len(candidates)), where=union > 0)
+        best = np.argsort(-sim, kind="stable")[:k]
+        return [(self.recipe_ids[candidates[b]], float(sim[b])) for b in best if sim[b] > 0]
+
+    def query(self, ingredients: Sequence[str], k: int = 10) -> List[Tuple[str, float]]:
+        """Top-k (recipe_id, Jaccard) for an ingredient list, best first"""
+        names = list(dict.fromkeys(ingredients))
+        if not names:
+            return []
+        values = np.fromiter((ingredient_hash(x) for x in names), dtype=np.uint64, count=len(names))
+        signature = _permuted_hashes(values, self.signatures.shape[1], self.seed).min(axis=0)
+        candidates = self._candidates(signature)
+        known = [self.vocabulary[x] for x in names if x in self.vocabulary]
+        shared = np.asarray(self.incidence[candidates][:, known].sum(axis=1)).ravel()
+        return self._top_k(candidates, shared, len(names), k)
+
+    def similar_to(self, row: int, k: int = 10) -> List[Tuple[str, float]]:
+        """Top-k recipes most similar to recipe `row` of the index (itself excluded)"""
+        if self.sizes[row] == 0:
+            return []
+        candidates = self._candidates(self.signatures[row])
+        candidates = candidates[(candidates != row) & (self.sizes[candidates] > 0)]
+        shared = np.asarray(
+            (self.incidence[candidates] @ self.incidence[row].T).todense()
+        ).ravel()
+        return self._top_k(candidates, shared, self.sizes[row], k)
+
+
+def build_similarity_csr_graph(
+    corpus,
+    threshold: float = DEFAULT_THRESHOLD,
+    num_perm: int = DEFAULT_NUM_PERM,
+    seed: int = 0,
+    workers: int = 1,
+) -> CSRGraph:
+    """Recipe graph with an edge per pair at or above `threshold` Jaccard similarity"""
+    print(f"Building MinHash/LSH similarity graph (Jaccard >= {threshold})...")
+    start_time = time.time()
+
+    index = RecipeSimilarityIndex.build(
+        corpus, threshold=threshold, num_perm=num_perm, seed=seed, workers=workers
+    )
+    edges = index.similar_pairs()
+    graph = CSRGraph.from_adjacency(index.similarity_matrix(edges), corpus.recipe_ids)
+
+    end_time = time.time()
+    print(
+        f"Similarity graph built with {graph.node_count} nodes and {graph.edge_count} edges "
+        f"({edges.candidates} candidate pairs, {index.bands} bands x {index.rows} rows) "
+        f"in {end_time - start_time:.2f} seconds"
+    )
+    return graph
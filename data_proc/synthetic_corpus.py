@@ -0,0 +1,167 @@
+"""Seeded synthetic inputs for benchmarks: flavor-edge and recipe CSVs.
+
+Ingredient popularity follows a Zipf law (rank r drawn with weight
+1 / r^s), like real recipe corpora where a few staples (salt, sugar, egg)
+dominate. The same seed always yields byte-identical files.
+
+Formats written:
+    flavor edges    ingredient_1,ingredient_2,score rows, as data/flavor_edges.csv
+                    of recipe_flavors; names use "_" between words
+    recipes         Unnamed: 0,title,directions,link,NER_Simple rows, as
+                    simplified_dataset.csv; NER_Simple is a Python list literal
+    cuisine recipes cuisine,ingredient,... rows, as data/recipes.csv of
+                    recipe_flavors
+"""
+
+import argparse
+import csv
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_INGREDIENTS = 2000
+ZIPF_EXPONENT = 1.1
+MIN_INGREDIENTS = 3
+MAX_INGREDIENTS = 15
+CUISINES = ["american", "chinese", "french", "indian", "italian", "japanese", "mexican", "thai"]
+
+_ONSETS = ["b", "c", "ch", "d", "f", "g", "k", "l", "m", "n", "p", "r", "s", "t", "v", "z"]
+_VOWELS = ["a", "e", "i", "o", "u", "ai", "ou"]
+
+# sampled recipes per block in recipe_ingredients (bounds the key matrix)
+SAMPLE_BLOCK = 2048
+
+
+def ingredient_names(count: int, seed: int = 0) -> List[str]:
+    """`count` distinct pronounceable names; about a third have two words"""
+    rng = np.random.default_rng(seed)
+    names: List[str] = []
+    seen = set()
+    while len(names) < count:
+        words = []
+        for _ in range(2 if rng.random() < 0.35 else 1):
+            syllables = rng.integers(2, 4)
+            words.append(
+                "".join(rng.choice(_ONSETS) + rng.choice(_VOWELS) for _ in range(syllables))
+            )
+        name = " ".join(words)
+        if name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names
+
+
+def zipf_weights(count: int, exponent: float = ZIPF_EXPONENT) -> np.ndarray:
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return weights / weights.sum()
+
+
+def recipe_ingredients(
+    recipes: int, ingredients: int, seed: int = 0, exponent: float = ZIPF_EXPONENT
+) -> List[np.ndarray]:
+    """Ingredient IDs of every recipe: Zipf-weighted draws without replacement"""
+    rng = np.random.default_rng(seed)
+    sizes = np.clip(
+        rng.poisson(8, size=recipes), MIN_INGREDIENTS, min(MAX_INGREDIENTS, ingredients)
+    )
+    log_weights = np.log(zipf_weights(ingredients, exponent))
+    out: List[np.ndarray] = []
+    for start in range(0, recipes, SAMPLE_BLOCK):
+        block = sizes[start : start + SAMPLE_BLOCK]
+        # Gumbel top-k: the k largest of log w + Gumbel noise are a weighted
+        # sample of k items without replacement
+        keys = log_weights + rng.gumbel(size=(len(block), ingredients))
+        top = np.argpartition(-keys, MAX_INGREDIENTS, axis=1)[:, :MAX_INGREDIENTS]
+        top_keys = np.take_along_axis(keys, top, axis=1)
+        ranked = np.take_along_axis(top, np.argsort(-top_keys, axis=1), axis=1)
+        out.extend(ranked[r, :k] for r, k in enumerate(block))
+    return out
+
+
+def flavor_edges(
+    names: List[str], edges: int, seed: int = 0, exponent: float = ZIPF_EXPONENT
+) -> pd.DataFrame:
+    """Distinct weighted ingredient pairs; popular ingredients get more pairs"""
+    rng = np.random.default_rng(seed)
+    n = len(names)
+    edges = min(edges, n * (n - 1) // 2)
+    p = zipf_weights(n, exponent / 2)
+    pairs = np.zeros(0, dtype=np.int64)
+    while len(pairs) < edges:
+        a = rng.choice(n, size=2 * edges, p=p)
+        b = rng.choice(n, size=2 * edges, p=p)
+        lo, hi = np.minimum(a, b), np.maximum(a, b)
+        keys = np.concatenate([pairs, (lo * n + hi)[lo != hi]])
+        # keep first occurrences, in draw order
+        _, first = np.unique(keys, return_index=True)
+        pairs = keys[np.sort(first)]
+    pairs = pairs[:edges]
+    underscored = np.array([x.replace(" ", "_") for x in names], dtype=object)
+    return pd.DataFrame(
+        {
+            "ingredient_1": underscored[pairs // n],
+            "ingredient_2": underscored[pairs % n],
+            "score": rng.geometric(0.08, size=len(pairs)),
+        }
+    )
+
+
+def write_flavor_edges(path, names: List[str], edges: int, seed: int = 0) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    flavor_edges(names, edges, seed=seed).to_csv(path, index=False)
+    return path
+
+
+def write_recipes(path, names: List[str], recipes: int, seed: int = 0) -> Path:
+    """simplified_dataset.csv lookalike"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lists = recipe_ingredients(recipes, len(names), seed=seed)
+    ner = [repr([names[i] for i in ids]) for ids in lists]
+    pd.DataFrame(
+        {
+            "Unnamed: 0": np.arange(recipes),
+            "title": [f"{names[ids[0]].title()} {i}" for i, ids in enumerate(lists)],
+            "directions": ['["Mix.", "Cook."]'] * recipes,
+            "link": [f"example.com/recipe/{i}" for i in range(recipes)],
+            "NER_Simple": ner,
+        }
+    ).to_csv(path, index=False)
+    return path
+
+
+def write_cuisine_recipes(path, names: List[str], recipes: int, seed: int = 0) -> Path:
+    """recipe_flavors data/recipes.csv lookalike (no header)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed + 1)
+    cuisines = rng.choice(CUISINES, size=recipes)
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        for cuisine, ids in zip(cuisines, recipe_ingredients(recipes, len(names), seed=seed)):
+            writer.writerow([cuisine] + [names[i].replace(" ", "_") for i in ids])
+    return path
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Seeded synthetic benchmark inputs")
+    parser.add_argument("--out", type=Path, default=Path("synthetic"))
+    parser.add_argument("--recipes", type=int, default=10_000)
+    parser.add_argument("--ingredients", type=int, default=DEFAULT_INGREDIENTS)
+    parser.add_argument("--edges", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    names = ingredient_names(args.ingredients, seed=args.seed)
+    for path in (
+        write_flavor_edges(args.out / "flavor_edges.csv", names, args.edges, seed=args.seed),
+        write_recipes(args.out / "recipes_ner.csv", names, args.recipes, seed=args.seed),
+        write_cuisine_recipes(args.out / "recipes_cuisine.csv", names, args.recipes, seed=args.seed),
+    ):
+        print(f"Wrote {path}")
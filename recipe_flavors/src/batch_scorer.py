@@ -0,0 +1,134 @@
+import numpy as np
+
+# ----------------------------
+# Flavor network as a weight matrix
+# ----------------------------
+
+
+class FlavorMatrix:
+    """
+    Dense ingredient x ingredient weight matrix built from a FlavorNetwork.
+
+    Ingredients missing from the network all map to one extra "unknown" ID
+    whose row and column are zero, so they score like a missing pair lookup.
+    """
+
+    def __init__(self, network):
+        self.names = network.names
+        self.index = network.index
+        self.unknown_id = len(network.names)
+        self.weights = network.dense(extra=1)
+
+    def ids(self, ingredients):
+        unknown = self.unknown_id
+        return [self.index.get(x, unknown) for x in ingredients]
+
+    def encode(self, recipes_ingredients, max_len=None):
+        """
+        Pack ingredient lists into a padded (recipes x max_len) ID array
+        plus the true length of each row.
+        """
+        lengths = np.array([len(ings) for ings in recipes_ingredients], dtype=np.int64)
+        if max_len is None:
+            max_len = int(lengths.max()) if len(lengths) else 0
+        lengths = np.minimum(lengths, max_len)
+
+        ids = np.full((len(recipes_ingredients), max_len), self.unknown_id, dtype=np.int64)
+        for r, ings in enumerate(recipes_ingredients):
+            row = self.ids(ings[:max_len])
+            ids[r, :len(row)] = row
+        return ids, lengths
+
+
+# ----------------------------
+# Batch scoring
+# ----------------------------
+
+
+class BatchScores:
+    """
+    Scores for a batch of recipes.
+
+    blocks[r, i, j] is the pair weight between ingredient i and j of recipe r
+    (0 on the diagonal and in padding); contributions[r, i] is the mean weight
+    of ingredient i with the other ingredients of recipe r. ids and lengths
+    are the encoded batch the scores were computed from.
+    """
+
+    def __init__(self, score_avg, pair_coverage, contributions, blocks, lengths, ids):
+        self.score_avg = score_avg
+        self.pair_coverage = pair_coverage
+        self.contributions = contributions
+        self.blocks = blocks
+        self.lengths = lengths
+        self.ids = ids
+
+
+def score_batch(matrix, ids, lengths):
+    """
+    Score, coverage, per-ingredient contribution and heatmap block for every
+    recipe in one fancy-indexing pass over the weight matrix.
+    """
+    n_recipes, max_len = ids.shape
+    positions = np.arange(max_len)
+    valid = positions[None, :] < lengths[:, None]
+    pair_mask = valid[:, :, None] & valid[:, None, :] & ~np.eye(max_len, dtype=bool)[None]
+
+    blocks = matrix.weights[ids[:, :, None], ids[:, None, :]]
+    blocks = np.where(pair_mask, blocks, 0)
+
+    n_pairs = lengths * (lengths - 1) // 2
+    # every unordered pair appears twice in the symmetric block
+    pair_sum = blocks.sum(axis=(1, 2), dtype=np.int64) // 2
+    pair_found = np.count_nonzero(blocks > 0, axis=(1, 2)) // 2
+
+    safe_pairs = np.maximum(n_pairs, 1)
+    score_avg = np.where(n_pairs > 0, pair_sum / safe_pairs, 0.0)
+    pair_coverage = np.where(n_pairs > 0, pair_found / safe_pairs, 0.0)
+
+    others = np.maximum(lengths - 1, 1)[:, None]
+    contributions = np.where(
+        valid & (lengths[:, None] > 1),
+        blocks.sum(axis=2, dtype=np.int64) / others,
+        0.0,
+    )
+
+    return BatchScores(score_avg, pair_coverage, contributions, blocks, lengths, ids)
+
+
+def score_recipes(matrix, recipes_ingredients, max_len=None, batch_size=10000):
+    """
+    Yield (start_index, BatchScores) over a list of ingredient lists,
+    batch_size recipes at a time to bound the size of the heatmap blocks.
+    """
+    for start in range(0, len(recipes_ingredients), batch_size):
+        chunk = recipes_ingredients[start:start + batch_size]
+        ids, lengths = matrix.encode(chunk, max_len=max_len)
+        yield start, score_batch(matrix, ids, lengths)
+
+
+# ----------------------------
+# JSON helpers (same shapes as export_many_recipes)
+# ----------------------------
+
+
+def heatmap_long_from_block(ingredients, block):
+    """
+    Long format for Vega-Lite heatmap from a precomputed weight block.
+    """
+    n = len(ingredients)
+    values = block[:n, :n].tolist()
+    return [
+        {"x": x, "y": y, "value": values[i][j]}
+        for i, x in enumerate(ingredients)
+        for j, y in enumerate(ingredients)
+    ]
+
+
+def contributions_from_row(ingredients, means):
+    rows = [
+        {"ingredient": a, "mean": float(m)}
+        for a, m in zip(ingredients, means[:len(ingredients)].tolist())
+    ]
+    rows.sort(key=lambda r: r["mean"], reverse=True)
+    return rows
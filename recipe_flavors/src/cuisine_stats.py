@@ -0,0 +1,271 @@
+import argparse
+import itertools
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+
+from batch_scorer import FlavorMatrix, score_recipes
+from export_many_recipes import FLAVOR_FILE, RECIPE_FILE, WEB_DATA_DIR, iter_recipes
+from flavor_network import load_flavor_network
+from repo_paths import use_data_proc
+
+use_data_proc()
+from instrumentation import add_arguments as add_instrumentation_arguments  # noqa: E402
+from instrumentation import stage, start_run  # noqa: E402
+
+# ----------------------------
+# Streaming per-cuisine aggregates
+# ----------------------------
+#
+# One pass over recipes.csv in fixed-size batches. Per cuisine we keep:
+#   - running count / mean / variance / min / max of score_avg and
+#     pair_coverage (Chan et al. parallel update, one merge per batch)
+#   - a log-bucket quantile sketch of both (relative error ACCURACY)
+#   - ingredient-pair usage counts as sorted (key, count) arrays
+# Memory depends on the number of cuisines and distinct pairs, not on the
+# number of recipes. Recipes are scored on their first MAX_INGREDIENTS
+# ingredients, like the exported recipe files.
+
+OUT_SUMMARY = WEB_DATA_DIR / "cuisine_summary.json"
+SUMMARY_FORMAT = "cuisine-summary-v1"
+
+MAX_INGREDIENTS = 12
+ACCURACY = 0.01
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch over non-negative values: log-spaced buckets
+    give every quantile within ACCURACY relative error, in O(log range)
+    memory. Values <= 0 share one zero bucket.
+    """
+
+    def __init__(self, accuracy=ACCURACY):
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        positive = values[values > 0]
+        self.zeros += len(values) - len(positive)
+        self.count += len(values)
+        if len(positive):
+            keys, counts = np.unique(
+                np.ceil(np.log(positive) / self.log_gamma).astype(np.int64),
+                return_counts=True,
+            )
+            for k, c in zip(keys.tolist(), counts.tolist()):
+                self.buckets[k] = self.buckets.get(k, 0) + c
+
+    def quantile(self, q):
+        if self.count == 0:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for k in sorted(self.buckets):
+            seen += self.buckets[k]
+            if rank < seen:
+                # midpoint (in relative terms) of bucket (gamma^(k-1), gamma^k]
+                return 2 * self.gamma ** k / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class RunningStats:
+    """Count, mean, variance, min, max and quantiles of a value stream."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sketch = QuantileSketch()
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        if n == 0:
+            return
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += batch_m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.sketch.add(values)
+
+    def summary(self):
+        if self.count == 0:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "std": math.sqrt(self.m2 / self.count),
+            "min": self.min,
+            "max": self.max,
+            "quantiles": {f"p{round(q * 100)}": self.sketch.quantile(q) for q in QUANTILES},
+        }
+
+
+class PairCounter:
+    """
+    Sparse pair -> count accumulator. Keys are a * 2**32 + b (a < b) kept as
+    a sorted array; a batch is deduplicated on its own, then merged in
+    linearly, so the accumulator is never re-sorted.
+    """
+
+    def __init__(self):
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def add(self, a, b):
+        lo, hi = np.minimum(a, b), np.maximum(a, b)
+        keys, counts = np.unique((lo.astype(np.int64) << 32) | hi, return_counts=True)
+        pos = np.searchsorted(self.keys, keys)
+        known = pos < len(self.keys)
+        known[known] = self.keys[pos[known]] == keys[known]
+        self.counts[pos[known]] += counts[known]
+        # positions are ascending, so np.insert is one linear merge
+        new = ~known
+        self.keys = np.insert(self.keys, pos[new], keys[new])
+        self.counts = np.insert(self.counts, pos[new], counts[new])
+
+    def top(self, k):
+        order = np.argsort(-self.counts, kind="stable")[:k]
+        keys = self.keys[order]
+        return list(zip((keys >> 32).tolist(), (keys & 0xFFFFFFFF).tolist(),
+                        self.counts[order].tolist()))
+
+
+class CuisineAggregator:
+    def __init__(self, matrix, max_len=MAX_INGREDIENTS):
+        self.matrix = matrix
+        self.max_len = max_len
+        self.vocab = {}
+        self.names = []
+        self.cuisines = {}  # cuisine -> {"score", "coverage", "pairs"}
+        self.recipes = 0
+
+    def _cuisine(self, name):
+        entry = self.cuisines.get(name)
+        if entry is None:
+            entry = {"score": RunningStats(), "coverage": RunningStats(), "pairs": PairCounter()}
+            self.cuisines[name] = entry
+        return entry
+
+    def _ids(self, ingredients):
+        ids = []
+        for x in ingredients:
+            i = self.vocab.get(x)
+            if i is None:
+                i = self.vocab[x] = len(self.names)
+                self.names.append(x)
+            ids.append(i)
+        return ids
+
+    def add_batch(self, recipes):
+        ingredients = [r["ingredients"][:self.max_len] for r in recipes]
+        _, scores = next(score_recipes(self.matrix, ingredients, max_len=self.max_len,
+                                       batch_size=len(ingredients)))
+        labels = np.array([r["cuisine"] for r in recipes])
+
+        ids = np.full((len(recipes), self.max_len), -1, dtype=np.int64)
+        for k, ings in enumerate(ingredients):
+            ids[k, :len(ings)] = self._ids(ings)
+        rows, cols = np.triu_indices(self.max_len, k=1)
+        a, b = ids[:, rows], ids[:, cols]
+
+        for cuisine in np.unique(labels).tolist():
+            mask = labels == cuisine
+            entry = self._cuisine(cuisine)
+            entry["score"].add(scores.score_avg[mask])
+            entry["coverage"].add(scores.pair_coverage[mask])
+            pa, pb = a[mask].ravel(), b[mask].ravel()
+            real = (pa >= 0) & (pb >= 0)
+            entry["pairs"].add(pa[real], pb[real])
+        self.recipes += len(recipes)
+
+    def summary(self, top_pairs=50):
+        weight = self.matrix.weights
+        index = self.matrix.index
+        unknown = self.matrix.unknown_id
+
+        def pair_row(a, b, count):
+            x, y = self.names[a], self.names[b]
+            return {"a": x, "b": y, "count": count,
+                    "weight": int(weight[index.get(x, unknown), index.get(y, unknown)])}
+
+        cuisines = []
+        for name in sorted(self.cuisines):
+            entry = self.cuisines[name]
+            cuisines.append({
+                "cuisine": name,
+                "count": entry["score"].count,
+                "score": entry["score"].summary(),
+                "coverage": entry["coverage"].summary(),
+                "distinct_pairs": len(entry["pairs"].keys),
+                "top_pairs": [pair_row(*p) for p in entry["pairs"].top(top_pairs)],
+            })
+        return {
+            "format": SUMMARY_FORMAT,
+            "recipes": self.recipes,
+            "max_ingredients": self.max_len,
+            "cuisines": cuisines,
+        }
+
+
+def aggregate(recipe_file, matrix, batch_size=10000, max_len=MAX_INGREDIENTS):
+    """
+    Stream recipe_file once and return the filled CuisineAggregator.
+    """
+    agg = CuisineAggregator(matrix, max_len=max_len)
+    recipes = iter_recipes(recipe_file)
+    with stage("cuisine_stats.aggregate", unit="recipes") as span:
+        while True:
+            batch = list(itertools.islice(recipes, batch_size))
+            if not batch:
+                break
+            agg.add_batch(batch)
+            span.advance(len(batch))
+        span.note(cuisines=len(agg.cuisines))
+    return agg
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Per-cuisine score / coverage / pair-usage summary")
+    parser.add_argument("--recipes", type=Path, default=RECIPE_FILE)
+    parser.add_argument("--flavors", type=Path, default=FLAVOR_FILE)
+    parser.add_argument("--out", type=Path, default=OUT_SUMMARY)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--top-pairs", type=int, default=50,
+                        help="Most used ingredient pairs listed per cuisine")
+    add_instrumentation_arguments(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    start_run("cuisine_stats", args)
+    with stage("cuisine_stats.load"):
+        matrix = FlavorMatrix(load_flavor_network(args.flavors))
+    agg = aggregate(args.recipes, matrix, batch_size=args.batch_size)
+
+    with stage("cuisine_stats.write"):
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(
+            json.dumps(agg.summary(top_pairs=args.top_pairs), separators=(",", ":")),
+            encoding="utf-8",
+        )
+    print(f"Wrote {args.out} ({len(agg.cuisines)} cuisines, {agg.recipes:,} recipes)")
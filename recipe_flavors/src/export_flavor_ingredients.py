@@ -1,6 +1,14 @@
-import csv, json
+import argparse
+import json
 from pathlib import Path
 
+from flavor_network import load_flavor_network
+from repo_paths import use_data_proc
+
+use_data_proc()
+from instrumentation import add_arguments as add_instrumentation_arguments  # noqa: E402
+from instrumentation import stage, start_run  # noqa: E402
+
 PROJECT_DIR = Path(__file__).parent.parent
 DATA_DIR = PROJECT_DIR / "data"
 WEB_DATA_DIR = PROJECT_DIR / "web" / "data"
@@ -8,18 +16,24 @@ WEB_DATA_DIR = PROJECT_DIR / "web" / "data"
 FLAVOR_FILE = DATA_DIR / "flavor_edges.csv"
 OUT_INGS = WEB_DATA_DIR / "flavor_ingredients.json"
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export the flavor ingredient list for the web app")
+    add_instrumentation_arguments(parser)
+    return parser.parse_args()
+
 def main():
+    start_run("export_flavor_ingredients", parse_args())
     WEB_DATA_DIR.mkdir(parents=True, exist_ok=True)
-    ings = set()
-    with FLAVOR_FILE.open("r", newline="", encoding="utf-8") as f:
-        r = csv.reader(f)
-        for row in r:
-            if not row or row[0].lstrip().startswith("#") or len(row) < 3:
-                continue
-            a, b = row[0].strip(), row[1].strip()
-            if a: ings.add(a)
-            if b: ings.add(b)
-    OUT_INGS.write_text(json.dumps(sorted(ings)), encoding="utf-8")
+
+    with stage("flavor_ingredients.load", unit="pairs") as span:
+        network = load_flavor_network(FLAVOR_FILE)
+        span.advance(network.edge_count)
+
+    with stage("flavor_ingredients.write", unit="ingredients") as span:
+        ings = network.names
+        OUT_INGS.write_text(json.dumps(ings), encoding="utf-8")
+        span.advance(len(ings))
+
     print(f"Wrote {OUT_INGS} ({len(ings):,} ingredients)")
 
 if __name__ == "__main__":
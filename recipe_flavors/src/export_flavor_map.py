@@ -1,7 +1,16 @@
-import csv
+import argparse
 import json
 from pathlib import Path
 
+import numpy as np
+
+from flavor_network import load_flavor_network
+from repo_paths import use_data_proc
+
+use_data_proc()
+from instrumentation import add_arguments as add_instrumentation_arguments  # noqa: E402
+from instrumentation import stage, start_run  # noqa: E402
+
 PROJECT_DIR = Path(__file__).parent.parent
 DATA_DIR = PROJECT_DIR / "data"
 WEB_DATA_DIR = PROJECT_DIR / "web" / "data"
@@ -9,46 +18,81 @@ WEB_DATA_DIR = PROJECT_DIR / "web" / "data"
 FLAVOR_FILE = DATA_DIR / "flavor_edges.csv"
 OUT_MAP = WEB_DATA_DIR / "flavor_map.json"
 OUT_INGS = WEB_DATA_DIR / "flavor_ingredients.json"
+OUT_NET = WEB_DATA_DIR / "flavor_net"
+
+# ----------------------------
+# Compact web encoding
+# ----------------------------
+#
+# flavor_net/manifest.json
+#   {"format", "names": [ingredient, ...], "indptr": [...], "dtype", "rows"}
+#
+# flavor_net/rows.bin
+#   little-endian typed arrays, one block per ingredient i: its neighbour
+#   IDs followed by the matching weights, both `dtype`. Row i spans bytes
+#   2 * width * indptr[i] .. 2 * width * indptr[i + 1], so the client can
+#   fetch just the rows of the ingredients in play with range requests.
+
+NET_FORMAT = "flavor-net-v1"
+
+
+def write_flavor_net(network, out_dir: Path):
+    out_dir.mkdir(parents=True, exist_ok=True)
+    indices = np.asarray(network.indices)
+    weights = np.asarray(network.weights)
+
+    largest = max(len(network), int(weights.max()) if len(weights) else 0)
+    dtype = np.dtype("<u2") if largest <= np.iinfo(np.uint16).max else np.dtype("<u4")
+
+    blocks = []
+    for i in range(len(network)):
+        lo, hi = network.indptr[i], network.indptr[i + 1]
+        blocks.append(indices[lo:hi].astype(dtype).tobytes())
+        blocks.append(weights[lo:hi].astype(dtype).tobytes())
+    (out_dir / "rows.bin").write_bytes(b"".join(blocks))
+
+    manifest = {
+        "format": NET_FORMAT,
+        "names": network.names,
+        "indptr": np.asarray(network.indptr).tolist(),
+        "dtype": "uint16" if dtype.itemsize == 2 else "uint32",
+        "rows": "rows.bin",
+    }
+    (out_dir / "manifest.json").write_text(
+        json.dumps(manifest, separators=(",", ":")), encoding="utf-8"
+    )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export the flavor network for the web app")
+    add_instrumentation_arguments(parser)
+    return parser.parse_args()
 
 
 def main():
+    start_run("export_flavor_map", parse_args())
     WEB_DATA_DIR.mkdir(parents=True, exist_ok=True)
 
-    m = {}
-    ingredients = set()
-
-    with FLAVOR_FILE.open("r", newline="", encoding="utf-8") as f:
-        r = csv.reader(f)
-        for row in r:
-            if not row or row[0].lstrip().startswith("#"):
-                continue
-            if len(row) < 3:
-                continue
-            a = row[0].strip()
-            b = row[1].strip()
-            try:
-                w = int(float(row[2]))
-            except ValueError:
-                continue
-
-            if not a or not b or a == b:
-                continue
-
-            # store as "a|b" with a<b for canonical key
-            if a < b:
-                key = f"{a}|{b}"
-            else:
-                key = f"{b}|{a}"
-
-            m[key] = w
-            ingredients.add(a)
-            ingredients.add(b)
-
-    OUT_MAP.write_text(json.dumps(m), encoding="utf-8")
-    OUT_INGS.write_text(json.dumps(sorted(ingredients)), encoding="utf-8")
+    with stage("flavor_map.load", unit="pairs") as span:
+        network = load_flavor_network(FLAVOR_FILE)
+        span.advance(network.edge_count)
+
+    with stage("flavor_map.pair_map", unit="pairs") as span:
+        # store as "a|b" with a<b for canonical key
+        m = {f"{a}|{b}": w for a, b, w in network.pairs()}
+
+        OUT_MAP.write_text(json.dumps(m), encoding="utf-8")
+        OUT_INGS.write_text(json.dumps(network.names), encoding="utf-8")
+        span.advance(len(m))
+
+    with stage("flavor_map.flavor_net", unit="ingredients") as span:
+        write_flavor_net(network, OUT_NET)
+        span.advance(len(network))
 
     print(f"Wrote flavor map: {OUT_MAP} ({len(m):,} pairs)")
-    print(f"Wrote ingredient list: {OUT_INGS} ({len(ingredients):,} ingredients)")
+    print(f"Wrote ingredient list: {OUT_INGS} ({len(network):,} ingredients)")
+    print(f"Wrote compact flavor network: {OUT_NET} "
+          f"({(OUT_NET / 'rows.bin').stat().st_size:,} bytes of rows)")
 
 
 if __name__ == "__main__":
@@ -1,8 +1,32 @@
+import argparse
 import csv
 import json
 import itertools
 from pathlib import Path
 
+from batch_scorer import (
+    FlavorMatrix,
+    contributions_from_row,
+    heatmap_long_from_block,
+    score_recipes,
+)
+from flavor_network import load_flavor_network
+from incremental_export import (
+    affected_recipes,
+    ingredient_hashes,
+    load_state,
+    recipe_hashes,
+    save_state,
+)
+from recipe_shards import SHARD_DIR_NAME, export_shards
+from recommend import suggest_batch, suggestions_from_row
+from repo_paths import use_data_proc
+from search_index import SEARCH_DIR_NAME, export_search_index
+
+use_data_proc()
+from instrumentation import add_arguments as add_instrumentation_arguments  # noqa: E402
+from instrumentation import stage, start_run  # noqa: E402
+
 # ----------------------------
 # Paths
 # ----------------------------
@@ -15,6 +39,7 @@ FLAVOR_FILE = DATA_DIR / "flavor_edges.csv"
 RECIPE_FILE = DATA_DIR / "recipes.csv"
 
 INDEX_FILE = WEB_DATA_DIR / "index.json"
+STATE_FILE = DATA_DIR / "export_state.json"
 
 
 # ----------------------------
@@ -23,42 +48,17 @@ INDEX_FILE = WEB_DATA_DIR / "index.json"
 
 def load_flavor_edges(path: Path):
     """
-    Load flavor network:
-    (ingredient_a, ingredient_b) -> shared_compounds
+    Load flavor network (the compiled FlavorNetwork; weight(a, b) gives
+    the shared compounds of a pair).
     """
-    pair2w = {}
-    with path.open("r", newline="", encoding="utf-8") as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if not row:
-                continue
-            if row[0].lstrip().startswith("#"):
-                continue
-            if len(row) < 3:
-                continue
+    return load_flavor_network(path)
 
-            a = row[0].strip()
-            b = row[1].strip()
-            try:
-                w = int(float(row[2]))
-            except ValueError:
-                continue
-
-            if not a or not b or a == b:
-                continue
-
-            key = tuple(sorted((a, b)))
-            pair2w[key] = w
-
-    return pair2w
 
-
-def load_recipes(path: Path, max_recipes=None):
+def iter_recipes(path: Path):
     """
-    Load recipes:
+    Stream recipes:
     each row = cuisine, ingredient1, ingredient2, ...
     """
-    recipes = []
     with path.open("r", newline="", encoding="utf-8") as f:
         reader = csv.reader(f)
         for row in reader:
@@ -79,62 +79,64 @@ def load_recipes(path: Path, max_recipes=None):
                     seen.add(x)
 
             if cuisine and len(ing_unique) >= 2:
-                recipes.append({
+                yield {
                     "cuisine": cuisine,
                     "ingredients": ing_unique
-                })
+                }
 
-            if max_recipes and len(recipes) >= max_recipes:
-                break
 
-    return recipes
+def load_recipes(path: Path, max_recipes=None):
+    """
+    Load recipes into a list (at most max_recipes of them).
+    """
+    return list(itertools.islice(iter_recipes(path), max_recipes or None))
 
 
 # ----------------------------
 # Scoring helpers
 # ----------------------------
 
-def pair_weight(pair2w, a, b):
-    if a == b:
-        return 0
-    return pair2w.get(tuple(sorted((a, b))), 0)
+def pair_weight(network, a, b):
+    # 0 for a == b, unknown ingredients and unknown pairs
+    return network.weight(a, b)
 
 
-def compute_score_avg(pair2w, ingredients):
-    pairs = list(itertools.combinations(ingredients, 2))
-    if not pairs:
+def compute_score_avg(network, ingredients):
+    k = len(ingredients)
+    if k < 2:
         return 0.0
-    weights = [pair_weight(pair2w, a, b) for a, b in pairs]
-    return sum(weights) / len(weights)
+    # the block is symmetric with a zero diagonal: every pair counted twice
+    return int(network.block(ingredients).sum()) / (k * (k - 1))
 
 
-def heatmap_long(pair2w, ingredients):
+def heatmap_long(network, ingredients):
     """
     Long format for Vega-Lite heatmap:
     [{x, y, value}, ...]
     """
+    block = network.block(ingredients).tolist()
     data = []
-    for x in ingredients:
-        for y in ingredients:
+    for x, row in zip(ingredients, block):
+        for y, w in zip(ingredients, row):
             data.append({
                 "x": x,
                 "y": y,
-                "value": 0 if x == y else pair_weight(pair2w, x, y)
+                "value": 0 if x == y else w
             })
     return data
 
 
-def ingredient_contributions(pair2w, ingredients):
+def ingredient_contributions(network, ingredients):
     """
     Mean compatibility of each ingredient with all others.
     """
+    block = network.block(ingredients).tolist()
     rows = []
-    for a in ingredients:
-        others = [b for b in ingredients if b != a]
-        if not others:
+    for a, row in zip(ingredients, block):
+        ws = [w for b, w in zip(ingredients, row) if b != a]
+        if not ws:
             rows.append({"ingredient": a, "mean": 0.0})
         else:
-            ws = [pair_weight(pair2w, a, b) for b in others]
             rows.append({"ingredient": a, "mean": sum(ws) / len(ws)})
 
     rows.sort(key=lambda r: r["mean"], reverse=True)
@@ -145,46 +147,154 @@ def ingredient_contributions(pair2w, ingredients):
 # Main export
 # ----------------------------
 
-if __name__ == "__main__":
-    WEB_DATA_DIR.mkdir(parents=True, exist_ok=True)
-
-    pair2w = load_flavor_edges(FLAVOR_FILE)
-    recipes = load_recipes(RECIPE_FILE, max_recipes=50000)  # adjust the number if needed
-
-    index = []
-
-    for ridx, r in enumerate(recipes):
-        cuisine = r["cuisine"]
-        ingredients = r["ingredients"][:12]
-
-        score = compute_score_avg(pair2w, ingredients)
-
-        pairs = list(itertools.combinations(ingredients, 2))
-        found = sum(1 for a, b in pairs if pair_weight(pair2w, a, b) > 0)
-        coverage = found / len(pairs) if pairs else 0.0
-
-        recipe_json = {
+def export_recipe_jsons(recipes, all_ingredients, matrix, only=None, suggestions=0,
+                        out_dir=WEB_DATA_DIR):
+    """
+    One indented recipe_XXXX.json per recipe (legacy format).
+    only: optional list of recipe indices to (re)write.
+    suggestions: if > 0, include that many top additions / removals.
+    """
+    ids = list(range(len(recipes))) if only is None else list(only)
+    subset = [all_ingredients[i] for i in ids]
+    with stage("export.recipe_jsons", total=len(ids), unit="recipes") as span:
+        for start, scores in score_recipes(matrix, subset, max_len=12):
+            sugg = suggest_batch(matrix, scores, k=suggestions) if suggestions else None
+            for offset in range(len(scores.lengths)):
+                ridx = ids[start + offset]
+                ingredients = all_ingredients[ridx]
+
+                recipe_json = {
+                    "id": ridx,
+                    "cuisine": recipes[ridx]["cuisine"],
+                    "ingredients": ingredients,
+                    "score_avg": float(scores.score_avg[offset]),
+                    "pair_coverage": float(scores.pair_coverage[offset]),
+                    "heatmap": heatmap_long_from_block(ingredients, scores.blocks[offset]),
+                    "contributions": contributions_from_row(ingredients, scores.contributions[offset]),
+                }
+                if sugg is not None:
+                    recipe_json["suggestions"] = suggestions_from_row(
+                        matrix, ingredients, recipe_json["score_avg"], sugg, offset
+                    )
+
+                out_path = Path(out_dir) / f"recipe_{ridx:04d}.json"
+                out_path.write_text(json.dumps(recipe_json, indent=2), encoding="utf-8")
+            span.advance(len(scores.lengths))
+
+
+def build_index(recipes, all_ingredients):
+    # lightweight index entries for browser
+    return [
+        {
             "id": ridx,
-            "cuisine": cuisine,
-            "ingredients": ingredients,
-            "score_avg": score,
-            "pair_coverage": coverage,
-            "heatmap": heatmap_long(pair2w, ingredients),
-            "contributions": ingredient_contributions(pair2w, ingredients),
+            "cuisine": r["cuisine"],
+            "label": f"{r['cuisine']} — {', '.join(ingredients[:5])}..."
         }
+        for ridx, (r, ingredients) in enumerate(zip(recipes, all_ingredients))
+    ]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export scored recipes for the web app")
+    parser.add_argument("--max-recipes", type=int, default=50000)
+    parser.add_argument(
+        "--format", choices=["json", "shards"], default="json",
+        help="json: one recipe_XXXX.json per recipe; shards: packed NDJSON bundles",
+    )
+    parser.add_argument("--shard-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Serialisation processes for --format shards")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Only rewrite recipes whose row or flavor edges changed since the last export",
+    )
+    parser.add_argument("--suggestions", type=int, default=0,
+                        help="Precompute this many best additions / removals per recipe")
+    add_instrumentation_arguments(parser)
+    return parser.parse_args()
+
+
+def plan_incremental(state, settings, rec_hashes, ing_hashes, all_ingredients):
+    """
+    Recipe indices to rewrite, or None when a full export is needed.
+    """
+    if state is None or state.get("settings") != settings:
+        return None
+    return affected_recipes(state, rec_hashes, ing_hashes, all_ingredients)
 
-        out_path = WEB_DATA_DIR / f"recipe_{ridx:04d}.json"
-        out_path.write_text(json.dumps(recipe_json, indent=2), encoding="utf-8")
-
-        # lightweight index entry for browser
-        index.append({
-            "id": ridx,
-            "cuisine": cuisine,
-            "label": f"{cuisine} — {', '.join(ingredients[:5])}..."
-        })
 
-    INDEX_FILE.write_text(json.dumps(index, indent=2), encoding="utf-8")
+if __name__ == "__main__":
+    args = parse_args()
+    start_run("export_many_recipes", args)
+    WEB_DATA_DIR.mkdir(parents=True, exist_ok=True)
 
-    print(f"Exported {len(index)} recipes")
-    print(f"Recipe JSONs in: {WEB_DATA_DIR}")
-    print(f"Index file: {INDEX_FILE}")
+    with stage("export.load", unit="recipes") as span:
+        network = load_flavor_network(FLAVOR_FILE)
+        recipes = load_recipes(RECIPE_FILE, max_recipes=args.max_recipes)
+
+        matrix = FlavorMatrix(network)
+        all_ingredients = [r["ingredients"][:12] for r in recipes]
+        span.advance(len(recipes))
+
+    settings = {"format": args.format, "shard_size": args.shard_size, "max_len": 12,
+                "suggestions": args.suggestions}
+    with stage("export.hash", unit="recipes") as span:
+        rec_hashes = recipe_hashes(recipes, all_ingredients)
+        ing_hashes = ingredient_hashes(network)
+        span.advance(len(recipes))
+
+    state = load_state(STATE_FILE) if args.incremental else None
+    todo = plan_incremental(state, settings, rec_hashes, ing_hashes, all_ingredients)
+    if todo is None:
+        if args.incremental:
+            print("No usable export state, running a full export")
+    else:
+        print(f"Incremental export: {len(todo)} of {len(recipes)} recipes changed")
+
+    vocabulary = None
+    if args.format == "shards":
+        shard_dir = WEB_DATA_DIR / SHARD_DIR_NAME
+        only_shards = None
+        if todo is not None:
+            vocabulary = state.get("vocabulary")
+            only_shards = {i // args.shard_size for i in todo}
+        with stage("export.shards", unit="recipes") as span:
+            manifest = export_shards(shard_dir, recipes, all_ingredients, matrix,
+                                     shard_size=args.shard_size, workers=args.workers,
+                                     vocabulary=vocabulary, only_shards=only_shards,
+                                     suggestions=args.suggestions)
+            span.advance(len(recipes) if todo is None else len(todo))
+        vocabulary = manifest["vocabulary"]
+        print(f"Recipe shards in: {shard_dir} ({len(manifest['shards'])} shards)")
+    else:
+        export_recipe_jsons(recipes, all_ingredients, matrix, only=todo,
+                            suggestions=args.suggestions)
+        if todo is not None:
+            # recipes that disappeared from the end of the CSV
+            for ridx in range(len(recipes), len(state["recipes"])):
+                (WEB_DATA_DIR / f"recipe_{ridx:04d}.json").unlink(missing_ok=True)
+        print(f"Recipe JSONs in: {WEB_DATA_DIR}")
+
+    # index entries only depend on the recipe rows
+    if todo is None or rec_hashes != state["recipes"]:
+        with stage("export.index", unit="recipes") as span:
+            index = build_index(recipes, all_ingredients)
+            INDEX_FILE.write_text(json.dumps(index, indent=2), encoding="utf-8")
+            span.advance(len(index))
+        print(f"Index file: {INDEX_FILE}")
+        search_dir = WEB_DATA_DIR / SEARCH_DIR_NAME
+        with stage("export.search_index", unit="recipes") as span:
+            search = export_search_index(search_dir, recipes, all_ingredients,
+                                         [entry["label"] for entry in index])
+            span.advance(len(recipes))
+        print(f"Search index in: {search_dir} ({len(search['postings'])} posting shards, "
+              f"{len(search['tries'])} trie shards)")
+
+    save_state(STATE_FILE, {
+        "settings": settings,
+        "recipes": rec_hashes,
+        "ingredients": ing_hashes,
+        "vocabulary": vocabulary,
+    })
+
+    print(f"Exported {len(recipes) if todo is None else len(todo)} recipes")
@@ -0,0 +1,255 @@
+import csv
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+# ----------------------------
+# Compiled flavor network
+# ----------------------------
+#
+# flavor_edges.csv is parsed once into a directory next to it
+# (flavor_edges.network/ for flavor_edges.csv):
+#   names.json    interned ingredient vocabulary, sorted; position = node ID
+#   indptr.npy    CSR row pointers (int64, len(names) + 1)
+#   indices.npy   neighbour IDs per row, ascending (int32)
+#   weights.npy   shared-compound counts, aligned with indices (int32)
+#   meta.json     format version plus size, mtime and hash of the source CSV;
+#                 written last, so it marks a complete artifact
+# The arrays are memory-mapped on load. The CSV is only parsed again when
+# its size/mtime changed and its content hash no longer matches.
+
+NETWORK_FORMAT = "flavor-csr-v1"
+
+PROJECT_DIR = Path(__file__).parent.parent
+FLAVOR_FILE = PROJECT_DIR / "data" / "flavor_edges.csv"
+
+
+def parse_flavor_csv(path: Path):
+    """
+    Canonical edges of the flavor CSV: (a, b) with a < b -> weight.
+    Comment lines, short rows, non-numeric weights and self-pairs are
+    skipped; a repeated pair keeps its last weight.
+    """
+    pair2w = {}
+    with Path(path).open("r", newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if not row or row[0].lstrip().startswith("#") or len(row) < 3:
+                continue
+            a = row[0].strip()
+            b = row[1].strip()
+            try:
+                w = int(float(row[2]))
+            except ValueError:
+                continue
+            if not a or not b or a == b:
+                continue
+            pair2w[(a, b) if a < b else (b, a)] = w
+    return pair2w
+
+
+class FlavorNetwork:
+    """
+    Ingredient vocabulary plus a symmetric CSR adjacency of pair weights.
+    """
+
+    def __init__(self, names, indptr, indices, weights):
+        self.names = names
+        self.index = {name: i for i, name in enumerate(names)}
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self._keys = None
+
+    @classmethod
+    def from_pairs(cls, pair2w):
+        names = sorted({x for pair in pair2w for x in pair})
+        index = {name: i for i, name in enumerate(names)}
+        n, m = len(names), len(pair2w)
+
+        a = np.fromiter((index[p[0]] for p in pair2w), dtype=np.int64, count=m)
+        b = np.fromiter((index[p[1]] for p in pair2w), dtype=np.int64, count=m)
+        w = np.fromiter(pair2w.values(), dtype=np.int32, count=m)
+
+        # both directions, grouped by row and sorted by neighbour
+        rows = np.concatenate([a, b])
+        cols = np.concatenate([b, a])
+        order = np.lexsort((cols, rows))
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        return cls(
+            names,
+            indptr,
+            cols[order].astype(np.int32),
+            np.concatenate([w, w])[order],
+        )
+
+    # ----------------------------
+    # Lookups
+    # ----------------------------
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    @property
+    def edge_count(self):
+        return len(self.indices) // 2
+
+    def _row(self, i):
+        lo, hi = self.indptr[i], self.indptr[i + 1]
+        return self.indices[lo:hi], self.weights[lo:hi]
+
+    def weight(self, a, b):
+        """Shared compounds of a and b; 0 for unknown ingredients or pairs."""
+        i, j = self.index.get(a), self.index.get(b)
+        if i is None or j is None or i == j:
+            return 0
+        cols, ws = self._row(i)
+        k = np.searchsorted(cols, j)
+        return int(ws[k]) if k < len(cols) and cols[k] == j else 0
+
+    def block(self, names):
+        """
+        len(names) x len(names) int32 matrix of pair weights, looked up in
+        one vectorised pass (0 on the diagonal and for unknown names).
+        """
+        n = len(self.names)
+        if self._keys is None:
+            # row * n + column of every entry (ascending, as the CSR is),
+            # plus a sentinel so every search position can be read
+            rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(self.indptr))
+            self._keys = np.append(rows * n + self.indices, -1)
+            self._key_weights = np.append(self.weights, 0).astype(np.int32)
+        k = len(names)
+        ids = np.fromiter((self.index.get(x, -1) for x in names), dtype=np.int64, count=k)
+        query = (ids[:, None] * n + ids).ravel()
+        pos = self._keys[:-1].searchsorted(query)
+        known = ids >= 0
+        found = (self._keys[pos] == query) & (known[:, None] & known).ravel()
+        return np.where(found, self._key_weights[pos], 0).reshape(k, k)
+
+    def neighbours(self, name):
+        """[(neighbour, weight), ...] sorted by neighbour name."""
+        i = self.index.get(name)
+        if i is None:
+            return []
+        cols, ws = self._row(i)
+        return [(self.names[j], int(w)) for j, w in zip(cols.tolist(), ws.tolist())]
+
+    def pairs(self):
+        """Yield every edge once as (a, b, weight) with a < b."""
+        names = self.names
+        for i in range(len(names)):
+            cols, ws = self._row(i)
+            upper = cols > i
+            for j, w in zip(cols[upper].tolist(), ws[upper].tolist()):
+                yield names[i], names[j], w
+
+    def pair2w(self):
+        """(a, b) -> weight dict, as returned by the old CSV loaders."""
+        return {(a, b): w for a, b, w in self.pairs()}
+
+    def dense(self, extra=0):
+        """Dense int32 weight matrix, with `extra` zero rows/columns appended."""
+        n = len(self.names) + extra
+        out = np.zeros((n, n), dtype=np.int32)
+        rows = np.repeat(np.arange(len(self.names)), np.diff(self.indptr))
+        out[rows, self.indices] = self.weights
+        return out
+
+    # ----------------------------
+    # Persistence
+    # ----------------------------
+
+    def save(self, out_dir: Path, source_meta=None):
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        # invalidate first: meta.json only reappears once all arrays are written
+        (out_dir / "meta.json").unlink(missing_ok=True)
+
+        (out_dir / "names.json").write_text(
+            json.dumps(self.names, ensure_ascii=False), encoding="utf-8"
+        )
+        np.save(out_dir / "indptr.npy", np.asarray(self.indptr, dtype=np.int64))
+        np.save(out_dir / "indices.npy", np.asarray(self.indices, dtype=np.int32))
+        np.save(out_dir / "weights.npy", np.asarray(self.weights, dtype=np.int32))
+
+        meta = {"format": NETWORK_FORMAT, "nodes": len(self), "edges": self.edge_count}
+        meta.update(source_meta or {})
+        tmp = out_dir / "meta.json.tmp"
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, out_dir / "meta.json")
+
+    @classmethod
+    def load(cls, out_dir: Path):
+        out_dir = Path(out_dir)
+        names = json.loads((out_dir / "names.json").read_text(encoding="utf-8"))
+        return cls(
+            names,
+            np.load(out_dir / "indptr.npy", mmap_mode="r"),
+            np.load(out_dir / "indices.npy", mmap_mode="r"),
+            np.load(out_dir / "weights.npy", mmap_mode="r"),
+        )
+
+
+# ----------------------------
+# Cached loading
+# ----------------------------
+
+
+def artifact_dir(csv_path: Path):
+    csv_path = Path(csv_path)
+    return csv_path.with_name(csv_path.stem + ".network")
+
+
+def file_hash(path: Path):
+    h = hashlib.blake2b(digest_size=16)
+    with Path(path).open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _read_meta(out_dir: Path):
+    try:
+        meta = json.loads((out_dir / "meta.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("format") == NETWORK_FORMAT else None
+
+
+def load_flavor_network(csv_path: Path = FLAVOR_FILE, out_dir: Path = None):
+    """
+    Flavor network for csv_path, compiled on first use and memory-mapped
+    from the artifact afterwards.
+    """
+    csv_path = Path(csv_path)
+    out_dir = Path(out_dir) if out_dir else artifact_dir(csv_path)
+    stat = csv_path.stat()
+    source = {"source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns}
+
+    meta = _read_meta(out_dir)
+    if meta is not None:
+        if all(meta.get(k) == v for k, v in source.items()):
+            return FlavorNetwork.load(out_dir)
+        # touched but maybe not edited: compare content before reparsing
+        digest = file_hash(csv_path)
+        if meta.get("source_hash") == digest:
+            meta.update(source)
+            tmp = out_dir / "meta.json.tmp"
+            tmp.write_text(json.dumps(meta), encoding="utf-8")
+            os.replace(tmp, out_dir / "meta.json")
+            return FlavorNetwork.load(out_dir)
+    else:
+        digest = file_hash(csv_path)
+
+    network = FlavorNetwork.from_pairs(parse_flavor_csv(csv_path))
+    network.save(out_dir, {**source, "source_hash": digest})
+    print(f"Compiled flavor network: {out_dir} "
+          f"({len(network):,} ingredients, {network.edge_count:,} pairs)")
+    return FlavorNetwork.load(out_dir)
@@ -0,0 +1,76 @@
+import hashlib
+import json
+from collections import defaultdict
+
+# ----------------------------
+# Export state
+# ----------------------------
+#
+# The state file remembers, for the last export:
+#   - a content hash per recipe row (cuisine + exported ingredients)
+#   - a content hash per flavor-network ingredient (its sorted neighbour list)
+#   - the export settings and the shard vocabulary (kept append-only so
+#     IDs inside untouched shards stay valid)
+# A recipe has to be rewritten if its own row changed or if any of its
+# ingredients' edges changed.
+
+STATE_VERSION = 1
+
+
+def _digest(obj):
+    data = json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def recipe_hashes(recipes, all_ingredients):
+    return [
+        _digest([r["cuisine"], ingredients])
+        for r, ingredients in zip(recipes, all_ingredients)
+    ]
+
+
+def ingredient_hashes(network):
+    return {ing: _digest(network.neighbours(ing)) for ing in network.names}
+
+
+def load_state(path):
+    if not path.exists():
+        return None
+    state = json.loads(path.read_text(encoding="utf-8"))
+    if state.get("version") != STATE_VERSION:
+        return None
+    return state
+
+
+def save_state(path, state):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    state = {"version": STATE_VERSION, **state}
+    path.write_text(json.dumps(state, separators=(",", ":")), encoding="utf-8")
+
+
+def changed_ingredients(old_hashes, new_hashes):
+    keys = set(old_hashes) | set(new_hashes)
+    return {k for k in keys if old_hashes.get(k) != new_hashes.get(k)}
+
+
+def affected_recipes(state, rec_hashes, ing_hashes, all_ingredients):
+    """
+    Recipe indices whose output must be rewritten, given the previous state.
+    """
+    old_rec = state["recipes"]
+    affected = {
+        i for i, h in enumerate(rec_hashes)
+        if i >= len(old_rec) or old_rec[i] != h
+    }
+
+    changed = changed_ingredients(state["ingredients"], ing_hashes)
+    if changed:
+        # inverted index: ingredient -> recipes using it
+        by_ingredient = defaultdict(list)
+        for i, ingredients in enumerate(all_ingredients):
+            for x in ingredients:
+                by_ingredient[x].append(i)
+        for x in changed:
+            affected.update(by_ingredient.get(x, ()))
+
+    return sorted(affected)
@@ -0,0 +1,255 @@
+import argparse
+import json
+import math
+import os
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from batch_scorer import FlavorMatrix, score_batch
+from cuisine_stats import MAX_INGREDIENTS, RunningStats
+from export_many_recipes import FLAVOR_FILE, RECIPE_FILE, WEB_DATA_DIR, iter_recipes
+from flavor_network import load_flavor_network
+
+# ----------------------------
+# Food-pairing null models (Ahn et al. 2011)
+# ----------------------------
+#
+# N_s(R) of a recipe is its mean shared-compound count over ingredient
+# pairs, i.e. score_avg. For every cuisine we compare the mean N_s of its
+# real recipes with randomised recipes of the same size distribution, drawn
+# without replacement from the cuisine's ingredients:
+#   uniform    every ingredient of the cuisine is equally likely
+#   frequency  ingredients are drawn in proportion to their use in the cuisine
+# dN_s = <N_s>_real - <N_s>_rand and z = dN_s / (sigma_rand / sqrt(n_real)),
+# sigma_rand being the spread of a single random recipe's N_s.
+#
+# Random recipes are generated and scored in chunks of padded index arrays.
+# Chunk k of (cuisine, model) always uses the seed
+# SeedSequence(seed, spawn_key=(cuisine, model, k)), so results do not
+# depend on the number of workers.
+
+OUT_SUMMARY = WEB_DATA_DIR / "null_model_summary.json"
+SUMMARY_FORMAT = "null-model-v1"
+
+MODELS = ("uniform", "frequency")
+
+# upper bound on the (recipes x candidate ingredients) key matrix per draw
+MAX_DRAW_CELLS = 4_000_000
+
+
+class CuisinePool:
+    """
+    What a null model may draw from for one cuisine: flavor-matrix IDs of its
+    distinct ingredients, how often each is used, and the recipe sizes.
+    """
+
+    def __init__(self, ids, counts, size_values, size_counts):
+        self.ids = ids
+        self.counts = counts
+        self.size_values = size_values
+        self.size_probs = size_counts / size_counts.sum()
+
+
+def collect(recipe_file, matrix, max_len=MAX_INGREDIENTS):
+    """
+    One pass over the recipes: real N_s statistics and a CuisinePool per cuisine.
+    """
+    ingredient_counts = defaultdict(Counter)
+    size_counts = defaultdict(Counter)
+    real = defaultdict(RunningStats)
+
+    batch = defaultdict(list)
+
+    def flush(cuisine):
+        ids, lengths = matrix.encode(batch[cuisine], max_len=max_len)
+        real[cuisine].add(score_batch(matrix, ids, lengths).score_avg)
+        batch[cuisine] = []
+
+    for r in iter_recipes(recipe_file):
+        cuisine = r["cuisine"]
+        ingredients = r["ingredients"][:max_len]
+        ingredient_counts[cuisine].update(ingredients)
+        size_counts[cuisine][len(ingredients)] += 1
+        batch[cuisine].append(ingredients)
+        if len(batch[cuisine]) >= 10000:
+            flush(cuisine)
+    for cuisine in list(batch):
+        if batch[cuisine]:
+            flush(cuisine)
+
+    pools = {}
+    for cuisine, counts in ingredient_counts.items():
+        names = sorted(counts)
+        sizes = sorted(size_counts[cuisine])
+        pools[cuisine] = CuisinePool(
+            np.array(matrix.ids(names), dtype=np.int64),
+            np.array([counts[x] for x in names], dtype=np.float64),
+            np.array(sizes, dtype=np.int64),
+            np.array([size_counts[cuisine][s] for s in sizes], dtype=np.float64),
+        )
+    return real, pools
+
+
+def sample_recipes(rng, pool, model, n, max_len, unknown_id):
+    """
+    n random recipes as a padded (n x max_len) ID array plus their lengths.
+    Sampling without replacement uses the Gumbel top-k trick, so one
+    argpartition draws a whole batch.
+    """
+    k = len(pool.ids)
+    lengths = np.minimum(rng.choice(pool.size_values, size=n, p=pool.size_probs), k)
+    width = min(max_len, k)
+
+    keys = rng.gumbel(size=(n, k))
+    if model == "frequency":
+        keys += np.log(pool.counts)[None, :]
+    elif model != "uniform":
+        raise ValueError(f"Unknown null model: {model}")
+
+    top = np.argpartition(-keys, width - 1, axis=1)[:, :width]
+    order = np.argsort(-np.take_along_axis(keys, top, axis=1), axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+
+    ids = np.full((n, max_len), unknown_id, dtype=np.int64)
+    ids[:, :width] = pool.ids[top]
+    ids[np.arange(max_len)[None, :] >= lengths[:, None]] = unknown_id
+    return ids, lengths
+
+
+# ----------------------------
+# Worker tasks
+# ----------------------------
+
+_worker_matrix = None
+_worker_pools = None
+
+
+def _init_worker(matrix, pools):
+    global _worker_matrix, _worker_pools
+    _worker_matrix = matrix
+    _worker_pools = pools
+
+
+def _score_chunk(task):
+    """(count, sum, sum of squares) of N_s over one chunk of random recipes."""
+    cuisine, cuisine_idx, model, model_idx, chunk_idx, n, seed, max_len = task
+    matrix, pool = _worker_matrix, _worker_pools[cuisine]
+    rng = np.random.default_rng(
+        np.random.SeedSequence(seed, spawn_key=(cuisine_idx, model_idx, chunk_idx))
+    )
+
+    step = max(1, MAX_DRAW_CELLS // max(len(pool.ids), 1))
+    total = total_sq = 0.0
+    for start in range(0, n, step):
+        m = min(step, n - start)
+        ids, lengths = sample_recipes(rng, pool, model, m, max_len, matrix.unknown_id)
+        ns = score_batch(matrix, ids, lengths).score_avg
+        total += float(ns.sum())
+        total_sq += float((ns * ns).sum())
+    return cuisine, model, n, total, total_sq
+
+
+def run_null_models(matrix, pools, samples, models=MODELS, chunk_size=10000,
+                    workers=None, seed=0, max_len=MAX_INGREDIENTS):
+    """
+    Score `samples` random recipes per cuisine and model across a process
+    pool. Returns {cuisine: {model: (count, sum, sum of squares)}}.
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = []
+    for cuisine_idx, cuisine in enumerate(sorted(pools)):
+        for model_idx, model in enumerate(MODELS):
+            if model not in models:
+                continue
+            for chunk_idx, start in enumerate(range(0, samples, chunk_size)):
+                n = min(chunk_size, samples - start)
+                tasks.append((cuisine, cuisine_idx, model, model_idx, chunk_idx, n, seed, max_len))
+
+    sums = defaultdict(lambda: defaultdict(lambda: [0, 0.0, 0.0]))
+    start = time.time()
+    done = 0
+
+    def accumulate(result):
+        nonlocal done
+        cuisine, model, n, total, total_sq = result
+        acc = sums[cuisine][model]
+        acc[0] += n
+        acc[1] += total
+        acc[2] += total_sq
+        done += n
+
+    if workers <= 1:
+        _init_worker(matrix, pools)
+        for task in tasks:
+            accumulate(_score_chunk(task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(matrix, pools)) as pool:
+            for result in pool.map(_score_chunk, tasks):
+                accumulate(result)
+
+    elapsed = time.time() - start
+    print(f"Scored {done:,} random recipes in {elapsed:.1f}s "
+          f"({done / max(elapsed, 1e-9):,.0f} recipes/s, {workers} workers)")
+    return sums
+
+
+def summarize(real, sums):
+    cuisines = []
+    for cuisine in sorted(sums):
+        stats = real[cuisine]
+        entry = {"cuisine": cuisine, "recipes": stats.count, "ns_real": stats.mean, "models": {}}
+        for model, (n, total, total_sq) in sums[cuisine].items():
+            mean = total / n
+            std = math.sqrt(max(total_sq / n - mean * mean, 0.0))
+            delta = stats.mean - mean
+            sigma = std / math.sqrt(stats.count) if stats.count else 0.0
+            entry["models"][model] = {
+                "samples": n,
+                "ns_rand": mean,
+                "ns_rand_std": std,
+                "delta_ns": delta,
+                "z": delta / sigma if sigma > 0 else 0.0,
+            }
+        cuisines.append(entry)
+    return cuisines
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Food-pairing significance against null models")
+    parser.add_argument("--recipes", type=Path, default=RECIPE_FILE)
+    parser.add_argument("--flavors", type=Path, default=FLAVOR_FILE)
+    parser.add_argument("--out", type=Path, default=OUT_SUMMARY)
+    parser.add_argument("--samples", type=int, default=100_000,
+                        help="Random recipes per cuisine and null model")
+    parser.add_argument("--models", nargs="+", choices=MODELS, default=list(MODELS))
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    matrix = FlavorMatrix(load_flavor_network(args.flavors))
+    real, pools = collect(args.recipes, matrix)
+    sums = run_null_models(matrix, pools, args.samples, models=args.models,
+                           chunk_size=args.chunk_size, workers=args.workers,
+                           seed=args.seed)
+
+    summary = {
+        "format": SUMMARY_FORMAT,
+        "seed": args.seed,
+        "max_ingredients": MAX_INGREDIENTS,
+        "cuisines": summarize(real, sums),
+    }
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    for c in summary["cuisines"]:
+        zs = ", ".join(f"{m}: dN_s={v['delta_ns']:+.3f} z={v['z']:+.1f}" for m, v in c["models"].items())
+        print(f"{c['cuisine']:<20} N_s={c['ns_real']:.3f}  {zs}")
+    print(f"Wrote {args.out}")
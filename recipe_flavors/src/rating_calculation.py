@@ -1,7 +1,22 @@
 import pandas as pd
+import numpy as np
+import argparse
 import ast
-import itertools
-import re
+import json
+import multiprocessing
+import os
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+from pathlib import Path
+
+from flavor_network import file_hash
+from repo_paths import use_data_proc
+
+use_data_proc()
+from ingredient_normalizer import IngredientNormalizer, tokens as normalize_to_tokens  # noqa: E402
+from instrumentation import add_arguments as add_instrumentation_arguments  # noqa: E402
+from instrumentation import stage, start_run  # noqa: E402
 
 # -----------------------------
 # File paths
@@ -9,86 +24,351 @@ import re
 
 RECIPES_CSV = "../../data_proc/simplified_dataset.csv"
 SCORES_CSV = "../data/flavor_edges.csv"
+RATINGS_DIR = "../../data_proc/ratings"
 
 # -----------------------------
-# Normalization config
+# Matching config
 # -----------------------------
 
-STOPWORDS = {
-    "fresh", "chopped", "optional", "ground",
-    "large", "small", "or", "and"
-}
+# Minimum Jaccard similarity for a fuzzy (non-subset) match
+MIN_JACCARD = 0.5
+
+# Distinct raw ingredient strings remembered by the resolver
+RESOLVE_CACHE_SIZE = 1 << 18
 
 # -----------------------------
-# Text normalization helpers
+# Rating engine
 # -----------------------------
 
-_non_alpha = re.compile(r"[^a-z\s]")
-_multi_space = re.compile(r"\s+")
+# resolve() results for strings that are not ingredients at all
+EMPTY = -2
+# ... and for ingredients that match no flavor-network node
+UNRESOLVED = -1
 
-def normalize_to_tokens(text):
-    text = text.lower()
-    text = _non_alpha.sub(" ", text)
-    text = _multi_space.sub(" ", text).strip()
-    return frozenset(t for t in text.split() if t not in STOPWORDS)
 
-# -----------------------------
-# Load data
-# -----------------------------
+class RatingEngine:
+    """
+    Flavor-network nodes (token sets) with a dense pair-score matrix and an
+    inverted token -> node index for resolving free-text recipe ingredients.
+    With a normalizer, raw strings go through its alias table first.
+    """
 
-recipes = pd.read_csv(RECIPES_CSV)
-scores = pd.read_csv(SCORES_CSV)
+    def __init__(self, nodes, weights, normalizer=None):
+        self.nodes = nodes
+        self.weights = weights
+        self.normalizer = normalizer
+        self.node_index = {tokens: i for i, tokens in enumerate(nodes)}
 
-recipes["NER_Simple"] = recipes["NER_Simple"].apply(ast.literal_eval)
+        postings = defaultdict(list)
+        for i, tokens in enumerate(nodes):
+            for t in tokens:
+                postings[t].append(i)
+        self.postings = dict(postings)
 
-# -----------------------------
-# Preprocess scores (FAST LOOKUP)
-# -----------------------------
+        self.resolve = lru_cache(maxsize=RESOLVE_CACHE_SIZE)(self._resolve)
 
-score_index = {}
+    def __getstate__(self):
+        # the LRU wrapper is per process and cannot be pickled
+        state = self.__dict__.copy()
+        del state["resolve"]
+        return state
 
-for _, row in scores.iterrows():
-    t1 = normalize_to_tokens(row["ingredient_1"])
-    t2 = normalize_to_tokens(row["ingredient_2"])
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.resolve = lru_cache(maxsize=RESOLVE_CACHE_SIZE)(self._resolve)
 
-    if not t1 or not t2:
-        continue
+    @classmethod
+    def from_scores(cls, scores):
+        """
+        Engine over the raw score table. Ratings keep float scores and sum
+        every row of a pair; the compiled FlavorNetwork truncates to int and
+        keeps the last row, so it is not used here.
+        """
+        # normalise each distinct name once instead of once per row
+        names = pd.unique(pd.concat([scores["ingredient_1"], scores["ingredient_2"]]))
+        tokens = {name: normalize_to_tokens(name) for name in names}
 
-    key = tuple(sorted((t1, t2), key=len))
-    score_index[key] = score_index.get(key, 0) + row["score"]
+        node_of_tokens = {}
+        for t in tokens.values():
+            if t and t not in node_of_tokens:
+                node_of_tokens[t] = len(node_of_tokens)
+        nodes = list(node_of_tokens)
 
-# -----------------------------
-# Rating computation
-# -----------------------------
+        node_of_name = {name: node_of_tokens.get(t, -1) for name, t in tokens.items()}
+        a = scores["ingredient_1"].map(node_of_name).to_numpy()
+        b = scores["ingredient_2"].map(node_of_name).to_numpy()
+        w = scores["score"].to_numpy(dtype=np.float64)
+        keep = (a >= 0) & (b >= 0)
+
+        weights = np.zeros((len(nodes), len(nodes)))
+        np.add.at(weights, (a[keep], b[keep]), w[keep])
+        # symmetric: a pair listed in either order scores the same
+        weights = weights + weights.T
+        np.fill_diagonal(weights, np.diagonal(weights) / 2)
 
-def compute_recipe_rating(ingredients):
-    if not ingredients:
-        return 0.0
+        return cls(nodes, weights)
 
-    tokenized = [normalize_to_tokens(i) for i in ingredients if i]
-    tokenized = [t for t in tokenized if t]
+    def _resolve(self, raw):
+        """
+        Best flavor node for a raw ingredient string:
+        exact token match, else the most specific node whose tokens are all
+        in the ingredient ("fresh chopped basil leaves" -> "basil"), else the
+        best Jaccard match above MIN_JACCARD.
+        """
+        if self.normalizer is not None:
+            raw = self.normalizer.canonical(raw)
+        tokens = normalize_to_tokens(raw)
+        if not tokens:
+            return EMPTY
+        exact = self.node_index.get(tokens)
+        if exact is not None:
+            return exact
 
-    total_score = 0
+        candidates = set()
+        for t in tokens:
+            candidates.update(self.postings.get(t, ()))
 
-    for a, b in itertools.combinations(tokenized, 2):
-        key = tuple(sorted((a, b), key=len))
-        total_score += score_index.get(key, 0)
+        best, best_key = UNRESOLVED, None
+        for i in candidates:
+            node = self.nodes[i]
+            overlap = len(node & tokens)
+            jaccard = overlap / len(node | tokens)
+            is_subset = overlap == len(node)
+            if not is_subset and jaccard < MIN_JACCARD:
+                continue
+            # subset matches first, then larger overlap, then tighter match
+            key = (is_subset, overlap, jaccard, -i)
+            if best_key is None or key > best_key:
+                best, best_key = i, key
+        return best
 
-    score = total_score / len(tokenized) if tokenized else 0.0
+    def rate(self, ingredients):
+        """
+        Rating of one recipe: summed pair scores / number of real ingredients.
+        """
+        ids = [self.resolve(i) for i in ingredients if i]
+        ids = [i for i in ids if i != EMPTY]
+        if not ids:
+            return 0.0
+        known = np.array([i for i in ids if i >= 0], dtype=np.int64)
+        block = self.weights[np.ix_(known, known)]
+        return float(np.triu(block, k=1).sum()) / len(ids)
 
+    def rate_column(self, ner_simple):
+        """
+        Ratings for a whole Series of ingredient lists at once.
+        """
+        lists = ner_simple.map(lambda x: ast.literal_eval(x) if isinstance(x, str) else x)
+        exploded = lists.explode()
+        recipe_of = np.repeat(np.arange(len(lists)), lists.map(lambda x: max(len(x), 1) if isinstance(x, list) else 1))
 
-    print(score)
-    return score
+        raw = exploded.fillna("").astype(str).to_numpy()
+        # resolve each distinct string once
+        uniques, inverse = np.unique(raw, return_inverse=True)
+        resolved = np.array([self.resolve(u) if u else EMPTY for u in uniques], dtype=np.int64)
+        ids = resolved[inverse]
+
+        real = ids != EMPTY
+        recipe_of, ids = recipe_of[real], ids[real]
+        counts = np.bincount(recipe_of, minlength=len(lists))
+
+        # all within-recipe pairs (i, i + d), one vectorised pass per distance d
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        position = np.arange(len(ids)) - starts[recipe_of]
+        remaining = counts[recipe_of] - position - 1
+        totals = np.zeros(len(lists))
+        known = ids >= 0
+        max_len = int(counts.max()) if len(counts) else 0
+        for d in range(1, max_len):
+            left = np.flatnonzero(remaining >= d)
+            right = left + d
+            ok = known[left] & known[right]
+            w = self.weights[ids[left[ok]], ids[right[ok]]]
+            totals += np.bincount(recipe_of[left[ok]], weights=w, minlength=len(lists))
+
+        return pd.Series(
+            np.divide(totals, counts, out=np.zeros(len(lists)), where=counts > 0),
+            index=ner_simple.index,
+        )
 
 # -----------------------------
-# Apply scoring
+# Chunked, multiprocess pipeline
 # -----------------------------
+#
+# Ratings go to a sidecar directory instead of rewriting the source CSV:
+#   meta.json        chunksize, source CSV size / mtime / hash and the
+#                    caller's fingerprint (e.g. the flavor file hash)
+#   chunk_XXXXX.npy  ratings of CSV rows [k * chunksize, (k + 1) * chunksize)
+#   ratings.npy      all chunks concatenated, aligned to CSV row order
+# A chunk file only appears once it is complete (written to a temp file and
+# renamed), so an interrupted run resumes from the first missing chunk.
+# Chunks are only reused while meta.json matches the current run; otherwise
+# they are all dropped and rating starts over.
+
+RATINGS_FORMAT = "ratings-v1"
+
+_worker_engine = None
+
+
+def _init_worker(engine):
+    global _worker_engine
+    # with the fork start method the engine is inherited copy-on-write
+    if engine is not None:
+        _worker_engine = engine
+
+
+def _rate_chunk(task):
+    chunk_idx, ner_simple, out_path = task
+    ratings = _worker_engine.rate_column(ner_simple).to_numpy()
+    tmp_path = out_path.with_suffix(".tmp.npy")
+    np.save(tmp_path, ratings)
+    os.replace(tmp_path, out_path)
+    # workers never flush; the parent persists what they resolved
+    normalizer = _worker_engine.normalizer
+    return chunk_idx, len(ratings), normalizer.take_new() if normalizer is not None else []
 
-recipes["rating"] = recipes["NER_Simple"].apply(compute_recipe_rating)
+
+def chunk_path(out_dir, chunk_idx):
+    return out_dir / f"chunk_{chunk_idx:05d}.npy"
+
+
+def _write_meta(out_dir, meta):
+    tmp = out_dir / "meta.json.tmp"
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(tmp, out_dir / "meta.json")
+
+
+def prepare_chunks(out_dir, recipes_csv, chunksize, fingerprint=None):
+    """
+    Keep the chunks of out_dir only if they were rated from the same CSV
+    content with the same chunksize and fingerprint; drop them otherwise.
+    Returns True when existing chunks may be reused.
+    """
+    stat = Path(recipes_csv).stat()
+    source = {"source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns}
+    settings = {"format": RATINGS_FORMAT, "chunksize": chunksize, "fingerprint": fingerprint}
+    try:
+        meta = json.loads((out_dir / "meta.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        meta = None
+
+    if meta is not None and all(meta.get(k) == v for k, v in settings.items()):
+        if all(meta.get(k) == v for k, v in source.items()):
+            return True
+        # touched but maybe not edited: compare content
+        digest = file_hash(recipes_csv)
+        if meta.get("source_hash") == digest:
+            _write_meta(out_dir, {**meta, **source})
+            return True
+    else:
+        digest = file_hash(recipes_csv)
+
+    stale = sorted(out_dir.glob("chunk_*.npy"))
+    if stale:
+        print(f"Dropping {len(stale)} rating chunks of a different input or chunksize")
+    for path in stale:
+        path.unlink()
+    (out_dir / "ratings.npy").unlink(missing_ok=True)
+    _write_meta(out_dir, {**settings, **source, "source_hash": digest})
+    return False
+
+
+def rate_csv(recipes_csv, engine, out_dir, chunksize=100_000, workers=None, fingerprint=None):
+    """
+    Rate every row of recipes_csv in a process pool, chunk by chunk,
+    skipping chunks already completed by a previous run on the same input.
+    Raw strings the workers resolve are flushed to engine.normalizer's
+    cache after every chunk, so later runs only look them up.
+    fingerprint: JSON-serialisable description of everything else the
+    ratings depend on (e.g. the flavor file hash); a change drops all chunks.
+    """
+    global _worker_engine
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    prepare_chunks(out_dir, recipes_csv, chunksize, fingerprint)
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        _worker_engine = engine
+        ctx, initargs = multiprocessing.get_context("fork"), (None,)
+    else:
+        ctx, initargs = multiprocessing.get_context(), (engine,)
+
+    chunk_count = 0
+    row_count = 0
+    skipped = 0
+    with stage("rating.rate", unit="rows") as span, ProcessPoolExecutor(
+        max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=initargs
+    ) as pool:
+        pending = set()
+        reader = pd.read_csv(recipes_csv, usecols=["NER_Simple"], chunksize=chunksize)
+        for chunk_idx, chunk in enumerate(reader):
+            chunk_count += 1
+            row_count += len(chunk)
+            path = chunk_path(out_dir, chunk_idx)
+            if path.exists():
+                skipped += 1
+                continue
+            pending.add(pool.submit(_rate_chunk, (chunk_idx, chunk["NER_Simple"], path)))
+
+            # keep at most two chunks per worker in flight
+            while len(pending) >= 2 * workers:
+                _drain_one(pending, span, engine.normalizer)
+        while pending:
+            _drain_one(pending, span, engine.normalizer)
+        span.note(chunks=chunk_count, resumed_chunks=skipped, workers=workers)
+
+    if skipped:
+        print(f"Resumed: {skipped} of {chunk_count} chunks were already complete")
+
+    with stage("rating.concatenate", unit="chunks") as span:
+        ratings = np.concatenate(
+            [np.load(chunk_path(out_dir, i)) for i in range(chunk_count)]
+        ) if chunk_count else np.zeros(0)
+        if len(ratings) != row_count:
+            raise RuntimeError(
+                f"{len(ratings):,} ratings for {row_count:,} CSV rows; "
+                f"delete {out_dir} and rate again"
+            )
+        np.save(out_dir / "ratings.npy", ratings)
+        span.advance(chunk_count)
+
+    print(f"{len(ratings):,} ratings in {out_dir / 'ratings.npy'}")
+    return ratings
+
+
+def _drain_one(pending, span, normalizer):
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for fut in done:
+        pending.discard(fut)
+        _, n, resolutions = fut.result()
+        if normalizer is not None:
+            normalizer.adopt(resolutions)
+            normalizer.flush()
+        span.advance(n)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rate recipes against the flavor network")
+    parser.add_argument("--recipes", default=RECIPES_CSV)
+    parser.add_argument("--scores", default=SCORES_CSV)
+    parser.add_argument("--out-dir", default=RATINGS_DIR)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=None)
+    add_instrumentation_arguments(parser)
+    return parser.parse_args()
 
 # -----------------------------
-# Save BACK to recipes.csv
+# Apply scoring
 # -----------------------------
 
-recipes.to_csv(RECIPES_CSV, index=False)
-print("✅ 'rating' column added to recipes.csv")
+if __name__ == "__main__":
+    args = parse_args()
+    start_run("rating_calculation", args)
+    with stage("rating.engine"):
+        engine = RatingEngine.from_scores(pd.read_csv(args.scores))
+        # loaded once here; forked workers read its caches copy-on-write
+        engine.normalizer = IngredientNormalizer()
+    rate_csv(args.recipes, engine, args.out_dir,
+             chunksize=args.chunksize, workers=args.workers,
+             fingerprint={"scores_hash": file_hash(args.scores)})
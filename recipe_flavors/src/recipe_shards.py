@@ -0,0 +1,192 @@
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+
+from batch_scorer import score_recipes
+from recommend import suggest_batch
+
+# ----------------------------
+# Packed shard format
+# ----------------------------
+#
+# shards/manifest.json
+#   {"format", "count", "shard_size", "vocabulary": [name, ...],
+#    "shards": [{"file", "index", "first_id", "count"}, ...]}
+#
+# shards/recipes_XXXX.ndjson
+#   one minified JSON record per line:
+#   {"id", "cuisine", "ingredients": [vocab IDs], "score_avg", "pair_coverage",
+#    "weights": [upper triangle of the heatmap, row-major, i < j],
+#    "contributions": [mean per ingredient, in ingredient order],
+#    "suggestions": {"add": [[vocab ID, gain], ...],
+#                    "remove": [[ingredient position, gain], ...]}}
+#   (suggestions only when exported with suggestions > 0)
+#
+# shards/recipes_XXXX.idx.json
+#   byte offsets: record k of the shard is bytes offsets[k]..offsets[k+1]-1,
+#   so the browser can fetch it with a single HTTP range request.
+
+SHARD_FORMAT = "packed-ndjson-v1"
+SHARD_DIR_NAME = "shards"
+MANIFEST_NAME = "manifest.json"
+
+
+def shard_name(shard_idx):
+    return f"recipes_{shard_idx:04d}"
+
+
+def pack_record(rid, cuisine, ingredient_ids, score, coverage, means, block):
+    n = len(ingredient_ids)
+    rows, cols = np.triu_indices(n, k=1)
+    return {
+        "id": rid,
+        "cuisine": cuisine,
+        "ingredients": ingredient_ids,
+        "score_avg": score,
+        "pair_coverage": coverage,
+        "weights": block[rows, cols].tolist(),
+        "contributions": means[:n].tolist(),
+    }
+
+
+def write_shard(task):
+    """
+    Serialise one shard and its offset index. Runs inside a worker process.
+    """
+    (out_dir, shard_idx, first_id, cuisines, ids, lengths,
+     score_avg, pair_coverage, contributions, blocks, suggestions) = task
+
+    name = shard_name(shard_idx)
+    offsets = [0]
+    chunks = []
+    for k, cuisine in enumerate(cuisines):
+        n = int(lengths[k])
+        record = pack_record(
+            first_id + k,
+            cuisine,
+            ids[k, :n].tolist(),
+            float(score_avg[k]),
+            float(pair_coverage[k]),
+            contributions[k],
+            blocks[k],
+        )
+        if suggestions is not None:
+            add_ids, add_gain, remove_pos, remove_gain = suggestions
+            record["suggestions"] = {
+                "add": [[i, g] for i, g in zip(add_ids[k].tolist(), add_gain[k].tolist()) if i >= 0],
+                "remove": [[p, g] for p, g in zip(remove_pos[k].tolist(), remove_gain[k].tolist()) if p >= 0],
+            }
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        chunks.append(line)
+        offsets.append(offsets[-1] + len(line))
+
+    out_dir = Path(out_dir)
+    (out_dir / f"{name}.ndjson").write_bytes(b"".join(chunks))
+    (out_dir / f"{name}.idx.json").write_text(json.dumps(offsets), encoding="utf-8")
+    return shard_idx
+
+
+def shard_entry(shard_idx, shard_size, total):
+    first_id = shard_idx * shard_size
+    name = shard_name(shard_idx)
+    return {
+        "file": f"{name}.ndjson",
+        "index": f"{name}.idx.json",
+        "first_id": first_id,
+        "count": min(shard_size, total - first_id),
+    }
+
+
+def export_shards(out_dir, recipes, all_ingredients, matrix,
+                  shard_size=1000, workers=None, max_len=12,
+                  vocabulary=None, only_shards=None, suggestions=0):
+    """
+    Score recipes shard by shard and write them as packed shards using a
+    process pool for serialisation. Returns the manifest dict.
+
+    vocabulary seeds the ingredient ID list (new names are appended), and
+    only_shards restricts writing to those shard indices; the manifest
+    still lists every shard. suggestions > 0 adds that many top additions /
+    removals per record; suggested ingredients join the vocabulary.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    vocabulary = list(vocabulary or [])
+    vocab = {x: i for i, x in enumerate(vocabulary)}
+    for ings in all_ingredients:
+        for x in ings:
+            if x not in vocab:
+                vocab[x] = len(vocabulary)
+                vocabulary.append(x)
+
+    total = len(recipes)
+    shard_count = (total + shard_size - 1) // shard_size
+    if only_shards is None:
+        only_shards = range(shard_count)
+
+    def tasks():
+        for shard_idx in sorted(only_shards):
+            start = shard_idx * shard_size
+            chunk = all_ingredients[start:start + shard_size]
+            _, scores = next(score_recipes(matrix, chunk, max_len=max_len,
+                                           batch_size=shard_size))
+            ids = np.zeros((len(chunk), max_len), dtype=np.int32)
+            for k, ings in enumerate(chunk):
+                ids[k, :len(ings)] = [vocab[x] for x in ings]
+
+            packed_suggestions = None
+            if suggestions:
+                sugg = suggest_batch(matrix, scores, k=suggestions)
+                # flavor-matrix IDs -> shard vocabulary IDs
+                add_ids = np.full(sugg.add_ids.shape, -1, dtype=np.int64)
+                for pos, i in zip(*np.nonzero(sugg.add_ids >= 0)):
+                    name = matrix.names[sugg.add_ids[pos, i]]
+                    if name not in vocab:
+                        vocab[name] = len(vocabulary)
+                        vocabulary.append(name)
+                    add_ids[pos, i] = vocab[name]
+                packed_suggestions = (add_ids, sugg.add_gain,
+                                      sugg.remove_pos, sugg.remove_gain)
+            yield (
+                str(out_dir),
+                shard_idx,
+                start,
+                [r["cuisine"] for r in recipes[start:start + shard_size]],
+                ids,
+                scores.lengths,
+                scores.score_avg,
+                scores.pair_coverage,
+                scores.contributions,
+                scores.blocks,
+                packed_suggestions,
+            )
+
+    # pool.map would score every shard up front; keep at most two shards per
+    # worker in flight so memory stays bounded by the shard size
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for task in tasks():
+            pending.add(pool.submit(write_shard, task))
+            while len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    fut.result()
+        for fut in pending:
+            fut.result()
+
+    manifest = {
+        "format": SHARD_FORMAT,
+        "count": total,
+        "shard_size": shard_size,
+        "vocabulary": vocabulary,
+        "shards": [shard_entry(i, shard_size, total) for i in range(shard_count)],
+    }
+    (out_dir / MANIFEST_NAME).write_text(
+        json.dumps(manifest, separators=(",", ":")), encoding="utf-8"
+    )
+    return manifest
@@ -0,0 +1,116 @@
+import numpy as np
+
+from batch_scorer import score_batch
+
+# ----------------------------
+# Add / remove recommendations
+# ----------------------------
+#
+# A recipe with n ingredients and pair-weight sum P scores P / C(n, 2).
+# Adding candidate c gives (P + links[c]) / C(n + 1, 2), where links[c] is
+# the summed weight of c to the recipe's ingredients; removing ingredient i
+# gives (P - row_i) / C(n - 1, 2). links for every candidate of a batch come
+# from summing the recipe ingredients' rows of the weight matrix, so no pair
+# is looked up more than once.
+
+
+class Suggestions:
+    """
+    Top-k recommendations for a batch of recipes.
+
+    add_ids[r, k] is the flavor-matrix ID of the k-th best addition to
+    recipe r (-1 when there are fewer candidates) and add_gain[r, k] the
+    change in score_avg it brings. remove_pos[r, k] is the position (in the
+    recipe's ingredient list) of the k-th best removal, remove_gain its gain.
+    """
+
+    def __init__(self, add_ids, add_gain, remove_pos, remove_gain):
+        self.add_ids = add_ids
+        self.add_gain = add_gain
+        self.remove_pos = remove_pos
+        self.remove_gain = remove_gain
+
+
+def _top_k(gain, k):
+    """Indices and values of the k largest finite gains per row, best first."""
+    k = min(k, gain.shape[1])
+    # stable sort so ties keep the lower index
+    order = np.argsort(-gain, axis=1, kind="stable")[:, :k]
+    top = np.take_along_axis(gain, order, axis=1)
+    missing = ~np.isfinite(top)
+    order[missing] = -1
+    top[missing] = 0.0
+    return order, top
+
+
+def suggest_batch(matrix, scores, k=5):
+    """
+    Best k additions and removals for every recipe of a BatchScores.
+    """
+    ids, lengths = scores.ids, scores.lengths
+    n_recipes, max_len = ids.shape
+    pair_sum = scores.blocks.sum(axis=(1, 2), dtype=np.int64) // 2
+    score_avg = scores.score_avg
+
+    # links[r, c]: summed weight of candidate c to recipe r's ingredients;
+    # padding and unknown ingredients sit on the zero "unknown" row
+    links = np.zeros((n_recipes, matrix.weights.shape[0]), dtype=np.int64)
+    for j in range(max_len):
+        links += matrix.weights[ids[:, j]]
+
+    grown_pairs = (lengths + 1) * lengths // 2
+    add_gain = (pair_sum[:, None] + links) / np.maximum(grown_pairs, 1)[:, None]
+    add_gain -= score_avg[:, None]
+    # never suggest what is already there, or the unknown placeholder
+    np.put_along_axis(add_gain, ids, -np.inf, axis=1)
+    add_gain[:, matrix.unknown_id] = -np.inf
+    add_ids, add_top = _top_k(add_gain, k)
+
+    row_sums = scores.blocks.sum(axis=2, dtype=np.int64)
+    shrunk_pairs = (lengths - 1) * (lengths - 2) // 2
+    remaining = pair_sum[:, None] - row_sums
+    remove_gain = np.divide(
+        remaining,
+        shrunk_pairs[:, None],
+        out=np.zeros(remaining.shape),
+        where=shrunk_pairs[:, None] > 0,
+    )
+    remove_gain -= score_avg[:, None]
+    remove_gain[np.arange(max_len)[None, :] >= lengths[:, None]] = -np.inf
+    remove_pos, remove_top = _top_k(remove_gain, k)
+
+    return Suggestions(add_ids, add_top, remove_pos, remove_top)
+
+
+def suggestions_from_row(matrix, ingredients, score_avg, suggestions, r):
+    """
+    JSON shape for recipe r of a Suggestions batch:
+    {"add": [{ingredient, gain, score_avg}], "remove": [...]}
+    """
+    def rows(names, gains):
+        return [
+            {"ingredient": name, "gain": g, "score_avg": score_avg + g}
+            for name, g in zip(names, gains)
+        ]
+
+    add = [(i, g) for i, g in zip(suggestions.add_ids[r].tolist(),
+                                  suggestions.add_gain[r].tolist()) if i >= 0]
+    remove = [(p, g) for p, g in zip(suggestions.remove_pos[r].tolist(),
+                                     suggestions.remove_gain[r].tolist()) if p >= 0]
+    return {
+        "add": rows([matrix.names[i] for i, _ in add], [g for _, g in add]),
+        "remove": rows([ingredients[p] for p, _ in remove], [g for _, g in remove]),
+    }
+
+
+def recommend(matrix, ingredients, k=5):
+    """
+    Top-k additions and removals for a single ingredient list.
+    """
+    ingredients = list(dict.fromkeys(ingredients))
+    ids, lengths = matrix.encode([ingredients])
+    scores = score_batch(matrix, ids, lengths)
+    suggestions = suggest_batch(matrix, scores, k=k)
+    return suggestions_from_row(
+        matrix, ingredients, float(scores.score_avg[0]), suggestions, 0
+    )
@@ -0,0 +1,21 @@
+import sys
+from pathlib import Path
+
+# ----------------------------
+# Modules shared with data_proc
+# ----------------------------
+#
+# instrumentation and ingredient_normalizer live with the data-processing
+# pipeline. Every module here that imports them calls use_data_proc() first,
+# instead of counting on another import having set up sys.path.
+
+DATA_PROC_DIR = Path(__file__).resolve().parents[2] / "data_proc"
+
+
+def use_data_proc():
+    """
+    Make the data_proc modules importable (idempotent).
+    """
+    path = str(DATA_PROC_DIR)
+    if path not in sys.path:
+        sys.path.insert(0, path)
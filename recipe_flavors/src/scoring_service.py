@@ -0,0 +1,380 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+import traceback
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from batch_scorer import (
+    FlavorMatrix,
+    contributions_from_row,
+    heatmap_long_from_block,
+    score_batch,
+)
+from flavor_network import FLAVOR_FILE, load_flavor_network
+
+# ----------------------------
+# Local scoring service for the what-if editor
+# ----------------------------
+#
+# The browser sends ingredient lists; the service answers with the same
+# score_avg / pair_coverage / heatmap / contributions shapes the exported
+# recipe JSONs use, computed by batch_scorer.score_batch against a resident
+# FlavorMatrix.
+#
+#   POST /score   {"recipes": [{"ingredients": [...]}, ...],
+#                  "heatmap": true, "contributions": true}
+#              -> {"results": [{"ingredients", "score_avg", "pair_coverage",
+#                               "heatmap"?, "contributions"?}, ...]}
+#   GET /stats    request, batch and cache counters
+#
+# Results are memoised per canonical ingredient set (sorted, de-duplicated)
+# in an LRU, and recipe order is restored per request, so reordering or
+# re-adding ingredients never triggers rescoring. Misses from all
+# connections that arrive within one event-loop turn are scored together in
+# one score_batch call. HTTP/1.1 keep-alive and CORS preflight are supported
+# so the web app can call it from its own origin.
+
+DEFAULT_PORT = 8765
+CACHE_SIZE = 16384
+MAX_BATCH = 512
+# bound on ingredients per scored recipe (the heatmap block grows as n^2)
+MAX_INGREDIENTS = 64
+MAX_BODY = 1 << 20
+
+CORS_HEADERS = (
+    "Access-Control-Allow-Origin: *\r\n"
+    "Access-Control-Allow-Methods: GET, POST, OPTIONS\r\n"
+    "Access-Control-Allow-Headers: Content-Type\r\n"
+)
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def canonical_ingredients(ingredients):
+    """
+    Ingredient list with blanks and repeats dropped, order kept.
+    """
+    if not isinstance(ingredients, list):
+        raise BadRequest("ingredients must be a list")
+    seen = set()
+    out = []
+    for x in ingredients:
+        if not isinstance(x, str):
+            raise BadRequest("ingredients must be strings")
+        x = x.strip()
+        if x and x not in seen:
+            seen.add(x)
+            out.append(x)
+    if len(out) > MAX_INGREDIENTS:
+        raise BadRequest(f"at most {MAX_INGREDIENTS} ingredients per recipe")
+    return out
+
+
+class ScoredSet:
+    """
+    Scores of one ingredient set, stored in sorted-name order.
+    """
+
+    __slots__ = ("names", "score_avg", "pair_coverage", "contributions", "block")
+
+    def __init__(self, names, score_avg, pair_coverage, contributions, block):
+        self.names = names
+        self.score_avg = score_avg
+        self.pair_coverage = pair_coverage
+        self.contributions = contributions
+        self.block = block
+
+    def render(self, ingredients, heatmap=True, contributions=True):
+        """
+        Response dict for the ingredients in their requested order.
+        """
+        position = {name: i for i, name in enumerate(self.names)}
+        order = np.array([position[x] for x in ingredients], dtype=np.int64)
+        out = {
+            "ingredients": ingredients,
+            "score_avg": self.score_avg,
+            "pair_coverage": self.pair_coverage,
+        }
+        if heatmap:
+            out["heatmap"] = heatmap_long_from_block(ingredients, self.block[np.ix_(order, order)])
+        if contributions:
+            out["contributions"] = contributions_from_row(ingredients, self.contributions[order])
+        return out
+
+
+class ScoringService:
+    """
+    LRU-memoised, micro-batched scoring against one FlavorMatrix.
+    """
+
+    def __init__(self, matrix, cache_size=CACHE_SIZE, max_batch=MAX_BATCH):
+        self.matrix = matrix
+        self.cache_size = cache_size
+        self.max_batch = max_batch
+        self.cache = OrderedDict()  # sorted names tuple -> ScoredSet
+        self.pending = {}           # sorted names tuple -> Future
+        self.flush_scheduled = False
+        self.stats = {"requests": 0, "recipes": 0, "hits": 0, "misses": 0,
+                      "batches": 0, "batched_recipes": 0}
+
+    def _remember(self, key, scored):
+        self.cache[key] = scored
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def score_now(self, keys):
+        """
+        Score ingredient sets (sorted name tuples) in one batch.
+        """
+        ids, lengths = self.matrix.encode([list(k) for k in keys])
+        scores = score_batch(self.matrix, ids, lengths)
+        self.stats["batches"] += 1
+        self.stats["batched_recipes"] += len(keys)
+        out = []
+        for r, key in enumerate(keys):
+            n = len(key)
+            out.append(ScoredSet(
+                key,
+                float(scores.score_avg[r]),
+                float(scores.pair_coverage[r]),
+                scores.contributions[r, :n].copy(),
+                scores.blocks[r, :n, :n].copy(),
+            ))
+        return out
+
+    def _flush(self):
+        self.flush_scheduled = False
+        pending, self.pending = self.pending, {}
+        keys = list(pending)
+        for start in range(0, len(keys), self.max_batch):
+            chunk = keys[start:start + self.max_batch]
+            try:
+                results = self.score_now(chunk)
+            except Exception as e:
+                for key in chunk:
+                    pending[key].set_exception(e)
+                continue
+            for key, scored in zip(chunk, results):
+                self._remember(key, scored)
+                pending[key].set_result(scored)
+
+    def lookup(self, ingredients):
+        """
+        ScoredSet for an ingredient list, or an awaitable resolving to it.
+        """
+        key = tuple(sorted(ingredients))
+        scored = self.cache.get(key)
+        if scored is not None:
+            self.cache.move_to_end(key)
+            self.stats["hits"] += 1
+            return scored
+
+        self.stats["misses"] += 1
+        future = self.pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self.pending[key] = loop.create_future()
+            if not self.flush_scheduled:
+                # let every connection that is ready this turn add its recipes
+                self.flush_scheduled = True
+                loop.call_soon(self._flush)
+        return future
+
+    async def score(self, payload):
+        if not isinstance(payload, dict) or not isinstance(payload.get("recipes"), list):
+            raise BadRequest('expected {"recipes": [{"ingredients": [...]}, ...]}')
+        heatmap = bool(payload.get("heatmap", True))
+        contributions = bool(payload.get("contributions", True))
+        recipes = []
+        for recipe in payload["recipes"]:
+            if not isinstance(recipe, dict):
+                raise BadRequest("every recipe must be an object")
+            recipes.append(canonical_ingredients(recipe.get("ingredients")))
+
+        self.stats["requests"] += 1
+        self.stats["recipes"] += len(recipes)
+        found = [self.lookup(ings) for ings in recipes]
+        scored = [x if isinstance(x, ScoredSet) else await x for x in found]
+        return {"results": [s.render(ings, heatmap, contributions)
+                            for s, ings in zip(scored, recipes)]}
+
+    # ----------------------------
+    # HTTP
+    # ----------------------------
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                parts = line.decode("latin-1").split()
+                if len(parts) != 3:
+                    break
+                method, path, version = parts
+                headers = {}
+                while (header := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = header.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {"error": "request body too large"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, out = await self._route(method, path.split("?")[0], body)
+                close = (headers.get("connection", "").lower() == "close"
+                         or version == "HTTP/1.0")
+                await self._respond(writer, status, out, close=close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        if method == "OPTIONS":
+            return 204, None
+        if path == "/stats" and method == "GET":
+            return 200, {**self.stats, "cached": len(self.cache)}
+        if path != "/score":
+            return 404, {"error": f"unknown path {path}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        try:
+            return 200, await self.score(json.loads(body))
+        except (BadRequest, ValueError) as e:
+            return 400, {"error": str(e)}
+        except Exception:
+            # keep the connection and the server alive; details go to the log
+            traceback.print_exc()
+            return 500, {"error": "internal error"}
+
+    @staticmethod
+    async def _respond(writer, status, out, close=False):
+        body = b"" if out is None else json.dumps(out, separators=(",", ":")).encode("utf-8")
+        writer.write(
+            (f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n"
+             f"Content-Type: application/json\r\n{CORS_HEADERS}"
+             f"Content-Length: {len(body)}\r\n"
+             f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n").encode("latin-1") + body
+        )
+        await writer.drain()
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        port = server.sockets[0].getsockname()[1]
+        return server, f"http://{host}:{port}"
+
+
+# ----------------------------
+# Load test
+# ----------------------------
+
+
+async def _client(url, edits, latencies):
+    host, port = url.split("//")[1].split(":")
+    reader, writer = await asyncio.open_connection(host, int(port))
+    try:
+        for ingredients in edits:
+            body = json.dumps({"recipes": [{"ingredients": ingredients}]}).encode("utf-8")
+            start = time.perf_counter()
+            writer.write(
+                (f"POST /score HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1") + body
+            )
+            await writer.drain()
+            status = await reader.readline()
+            length = 0
+            while (header := await reader.readline()) not in (b"\r\n", b""):
+                name, _, value = header.decode("latin-1").partition(":")
+                if name.strip().lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            if b" 200 " not in status:
+                raise RuntimeError(status.decode("latin-1").strip())
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+def random_edits(names, sessions, edits_per_session, seed=0):
+    """
+    What-if sessions: start from a random recipe, then add or remove one
+    ingredient per edit (sometimes undoing the previous one).
+    """
+    rng = random.Random(seed)
+    out = []
+    for _ in range(sessions):
+        ings = rng.sample(names, rng.randint(4, 12))
+        edits = []
+        for _ in range(edits_per_session):
+            if len(ings) > 3 and rng.random() < 0.5:
+                ings = [x for x in ings if x != rng.choice(ings)]
+            else:
+                ings = ings + [rng.choice(names)]
+            edits.append(list(dict.fromkeys(ings)))
+        out.append(edits)
+    return out
+
+
+async def _bench(matrix, concurrency, edits_per_session, seed):
+    service = ScoringService(matrix)
+    server, url = await service.start(port=0)
+    sessions = random_edits(matrix.names, concurrency, edits_per_session, seed=seed)
+    latencies = []
+    async with server:
+        start = time.perf_counter()
+        await asyncio.gather(*(_client(url, edits, latencies) for edits in sessions))
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    stats = service.stats
+    print(f"{concurrency} concurrent sessions, {len(latencies)} edits in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:.0f} edits/s)")
+    print(f"latency p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+    print(f"cache hits {stats['hits']}, misses {stats['misses']}, "
+          f"{stats['batches']} batches of {stats['batched_recipes'] / max(stats['batches'], 1):.1f} recipes")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Local scoring service for the what-if editor")
+    parser.add_argument("command", choices=["serve", "bench"])
+    parser.add_argument("--flavors", type=Path, default=FLAVOR_FILE)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE)
+    parser.add_argument("--concurrency", type=int, default=200,
+                        help="bench: concurrent editing sessions")
+    parser.add_argument("--edits", type=int, default=20, help="bench: edits per session")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+async def _serve(matrix, host, port, cache_size):
+    server, url = await ScoringService(matrix, cache_size=cache_size).start(host, port)
+    print(f"Scoring service on {url} (open the web app with ?scorer={url})")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    matrix = FlavorMatrix(load_flavor_network(args.flavors))
+    print(f"Flavor matrix: {len(matrix.names):,} ingredients, "
+          f"{matrix.weights.nbytes / 1e6:.1f} MB resident")
+    if args.command == "serve":
+        try:
+            asyncio.run(_serve(matrix, args.host, args.port, args.cache_size))
+        except KeyboardInterrupt:
+            pass
+    else:
+        asyncio.run(_bench(matrix, args.concurrency, args.edits, args.seed))
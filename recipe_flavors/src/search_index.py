@@ -0,0 +1,225 @@
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+# ----------------------------
+# Sharded search index for the recipe picker
+# ----------------------------
+#
+# search/manifest.json
+#   {"format", "count",
+#    "cuisines": [{"name", "count", "shard", "offset", "length"}, ...],
+#    "tries": {first character: "trie_XX.json", ...},
+#    "postings": ["postings_XXXX.bin", ...],
+#    "label_block", "labels": ["labels_XXXX.json", ...]}
+#
+# search/postings_XXXX.bin
+#   posting lists packed back to back: ascending recipe IDs, stored as
+#   deltas (first ID as is) in LEB128 varints. A list is addressed by
+#   (shard, byte offset, byte length).
+#
+# search/trie_XX.json
+#   prefix trie of the ingredient words starting with one character:
+#   {"trie": node, "terms": {term ID: [name, recipes, shard, offset, length]}}
+#   with node = {"c": {next character: node}, "t": [term IDs]}. An
+#   ingredient is reachable from each of its "_"-separated words, so
+#   "oil" finds olive_oil.
+#
+# search/labels_XXXX.json
+#   picker labels of recipes [k * label_block, (k + 1) * label_block)
+#
+# The client loads the manifest, then the trie shard of each typed word and
+# only the posting lists and label blocks it needs. A query is the
+# intersection of the cuisine's list with one list per word, each word's
+# list being the union over the ingredients matching it as a prefix.
+
+SEARCH_FORMAT = "recipe-search-v1"
+SEARCH_DIR_NAME = "search"
+MANIFEST_NAME = "manifest.json"
+
+POSTING_SHARD_BYTES = 1 << 19
+LABEL_BLOCK = 10000
+
+
+def encode_postings(ids):
+    """
+    Ascending uint32 IDs -> delta-encoded LEB128 varint bytes.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    if not len(ids):
+        return b""
+    deltas = np.diff(ids, prepend=0).astype(np.uint64)
+    sizes = np.ones(len(deltas), dtype=np.int64)
+    for shift in (7, 14, 21, 28):
+        sizes += deltas >= (1 << shift)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    out = np.zeros(int(sizes.sum()), dtype=np.uint8)
+    for k in range(int(sizes.max())):
+        has = sizes > k
+        byte = (deltas[has] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (sizes[has] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[has] + k] = (byte | more).astype(np.uint8)
+    return out.tobytes()
+
+
+def decode_postings(data):
+    """
+    Inverse of encode_postings (used for checks; the browser has its own).
+    """
+    ids = []
+    value = shift = last = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            last += value
+            ids.append(last)
+            value = shift = 0
+    return ids
+
+
+def _postings(keys, recipe_ids, n_keys):
+    """
+    Recipe IDs per key, ascending and de-duplicated.
+    """
+    order = np.lexsort((recipe_ids, keys))
+    keys, recipe_ids = keys[order], recipe_ids[order]
+    keep = np.ones(len(keys), dtype=bool)
+    keep[1:] = (keys[1:] != keys[:-1]) | (recipe_ids[1:] != recipe_ids[:-1])
+    keys, recipe_ids = keys[keep], recipe_ids[keep]
+    bounds = np.searchsorted(keys, np.arange(n_keys + 1))
+    return [recipe_ids[bounds[k]:bounds[k + 1]] for k in range(n_keys)]
+
+
+class _PostingWriter:
+    """
+    Packs encoded lists into shards of about POSTING_SHARD_BYTES.
+    """
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self.files = []
+        self.parts = []
+        self.size = 0
+
+    def add(self, ids):
+        data = encode_postings(ids)
+        if self.size and self.size + len(data) > POSTING_SHARD_BYTES:
+            self.close_shard()
+        location = [len(self.files), self.size, len(data)]
+        self.parts.append(data)
+        self.size += len(data)
+        return location
+
+    def close_shard(self):
+        if not self.parts:
+            return
+        name = f"postings_{len(self.files):04d}.bin"
+        (self.out_dir / name).write_bytes(b"".join(self.parts))
+        self.files.append(name)
+        self.parts, self.size = [], 0
+
+
+def _trie_shards(names):
+    """
+    {first character: {"trie", "term_ids"}} over every word of every name.
+    """
+    shards = {}
+    for term_id, name in enumerate(names):
+        words = {name} | {w for w in name.split("_") if w}
+        for word in words:
+            shard = shards.setdefault(word[0], {"trie": {}, "term_ids": set()})
+            shard["term_ids"].add(term_id)
+            node = shard["trie"]
+            for ch in word[1:]:
+                node = node.setdefault("c", {}).setdefault(ch, {})
+            node.setdefault("t", []).append(term_id)
+    return shards
+
+
+def _shard_key(ch):
+    return ch if ch.isalnum() and ch.isascii() else f"u{ord(ch):04x}"
+
+
+def export_search_index(out_dir: Path, recipes, all_ingredients, labels):
+    """
+    Write the sharded search index for recipes (dicts with "cuisine"),
+    their exported ingredient lists and picker labels. Returns the manifest.
+    """
+    out_dir = Path(out_dir)
+    tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    n = len(recipes)
+
+    cuisine_names = sorted({r["cuisine"] for r in recipes})
+    cuisine_index = {c: i for i, c in enumerate(cuisine_names)}
+    cuisine_codes = np.fromiter((cuisine_index[r["cuisine"]] for r in recipes), dtype=np.int64, count=n)
+
+    vocabulary = {}
+    lengths = np.fromiter((len(ings) for ings in all_ingredients), dtype=np.int64, count=n)
+    terms = np.fromiter(
+        (vocabulary.setdefault(x.lower(), len(vocabulary)) for ings in all_ingredients for x in ings),
+        dtype=np.int64,
+        count=int(lengths.sum()),
+    )
+    names = list(vocabulary)
+    term_recipes = np.repeat(np.arange(n, dtype=np.int64), lengths)
+
+    writer = _PostingWriter(tmp_dir)
+    cuisines = []
+    # the cuisine partition: every recipe is in exactly one of these lists
+    for name, ids in zip(cuisine_names, _postings(cuisine_codes, np.arange(n), len(cuisine_names))):
+        shard, offset, length = writer.add(ids)
+        cuisines.append({"name": name, "count": len(ids), "shard": shard,
+                         "offset": offset, "length": length})
+    term_info = []
+    for name, ids in zip(names, _postings(terms, term_recipes, len(names))):
+        term_info.append([name, len(ids), *writer.add(ids)])
+    writer.close_shard()
+
+    tries = {}
+    for ch, shard in sorted(_trie_shards(names).items()):
+        fname = f"trie_{_shard_key(ch)}.json"
+        payload = {
+            "trie": shard["trie"],
+            "terms": {str(t): term_info[t] for t in sorted(shard["term_ids"])},
+        }
+        (tmp_dir / fname).write_text(
+            json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8"
+        )
+        tries[ch] = fname
+
+    label_files = []
+    for start in range(0, n, LABEL_BLOCK):
+        fname = f"labels_{start // LABEL_BLOCK:04d}.json"
+        (tmp_dir / fname).write_text(
+            json.dumps(labels[start:start + LABEL_BLOCK], ensure_ascii=False, separators=(",", ":")),
+            encoding="utf-8",
+        )
+        label_files.append(fname)
+
+    manifest = {
+        "format": SEARCH_FORMAT,
+        "count": n,
+        "cuisines": cuisines,
+        "tries": tries,
+        "postings": writer.files,
+        "label_block": LABEL_BLOCK,
+        "labels": label_files,
+    }
+    (tmp_dir / MANIFEST_NAME).write_text(
+        json.dumps(manifest, ensure_ascii=False, separators=(",", ":")), encoding="utf-8"
+    )
+
+    # swap the whole directory so clients never mix two exports
+    old_dir = out_dir.with_name(out_dir.name + ".old")
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if out_dir.exists():
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest
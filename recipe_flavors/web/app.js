@@ -7,6 +7,8 @@ import {
 } from "./js/flavor.js";
 
 import { heatmapSpec, barsSpec, upsertVegaView } from "./js/charts.js";
+import { loadFlavorNet } from "./js/network.js";
+import { RemoteScorer, scorerUrl } from "./js/scorer.js";
 
 import {
   uniqueCuisines,
@@ -14,13 +16,22 @@ import {
   fillRecipeSelect,
   fillCuisineSelect,
   fetchJSON,
-  fetchRecipe
+  fetchRecipe,
+  MAX_SHOW
 } from "./js/ui.js";
+import { loadSearchIndex } from "./js/search.js";
 
 // ------------------ state ------------------
 
 let allIndex = [];
-let flavorMap = null;
+// sharded search index; null for exports without one (then allIndex is used)
+let searchIndex = null;
+const filterSeq = { A: 0, B: 0 }; // drops results of superseded keystrokes
+// flavor network lookup; rows are fetched for the ingredients in play
+let flavorNetReady = null;
+let flavorNet = null;
+// optional local scoring service for the what-if editor
+let remoteScorer = null;
 
 const views = {
   heatmapA: null, barsA: null,
@@ -39,9 +50,6 @@ let originalScoreA = null;
 let originalCoverageA = null;
 let editWiredA = false;
 
-// suggestions
-let neighborMap = null;
-
 // ------------------ helpers ------------------
 
 function setMeta(prefix, data) {
@@ -86,25 +94,17 @@ function updateDelta() {
 
 // ------------------ suggestions (top 10 compatible) ------------------
 
-function buildNeighborMapFromFlavorMap(fm) {
-  const nm = {}; // ingredient -> [{other, w}]
-  for (const key of Object.keys(fm)) {
-    const w = fm[key];
-    const [a, b] = key.split("|");
-    if (!nm[a]) nm[a] = [];
-    if (!nm[b]) nm[b] = [];
-    nm[a].push({ other: b, w });
-    nm[b].push({ other: a, w });
-  }
-  return nm;
+async function ensureFlavorRows(ings) {
+  flavorNet = await flavorNetReady;
+  await flavorNet.ensure(ings);
 }
 
-function topSuggestedAdditions(nm, currentIngs, k = 10) {
+function topSuggestedAdditions(net, currentIngs, k = 10) {
   const currentSet = new Set(currentIngs);
   const stats = new Map(); // other -> {sum, cnt, max}
 
   for (const ing of currentIngs) {
-    const neigh = nm[ing] || [];
+    const neigh = net.neighbors(ing);
     for (const { other, w } of neigh) {
       if (currentSet.has(other)) continue;
 
@@ -128,11 +128,11 @@ function topSuggestedAdditions(nm, currentIngs, k = 10) {
 
 function renderSuggestionsA() {
   const box = document.getElementById("suggestA");
-  if (!box || !editedIngredientsA || !neighborMap) return;
+  if (!box || !editedIngredientsA || !flavorNet) return;
 
   box.innerHTML = "";
 
-  const top = topSuggestedAdditions(neighborMap, editedIngredientsA, 10);
+  const top = topSuggestedAdditions(flavorNet, editedIngredientsA, 10);
 
   if (top.length === 0) {
     box.innerHTML = `<span class="small">No suggestions (try adding more base ingredients).</span>`;
@@ -174,11 +174,34 @@ function renderChipsA() {
   }
 }
 
+async function scoreEditsA() {
+  if (remoteScorer) {
+    // suggestions still read neighbour rows; fetch them alongside
+    const [scored] = await Promise.all([
+      remoteScorer.score(editedIngredientsA),
+      ensureFlavorRows(editedIngredientsA)
+    ]);
+    if (!scored) return null; // superseded by a newer edit
+    return {
+      score: scored.score_avg,
+      coverage: scored.pair_coverage,
+      heat: scored.heatmap,
+      contrib: scored.contributions
+    };
+  }
+  await ensureFlavorRows(editedIngredientsA);
+  return {
+    score: computeScoreAvg(flavorNet, editedIngredientsA),
+    coverage: computeCoverage(flavorNet, editedIngredientsA),
+    heat: buildHeatmapLong(flavorNet, editedIngredientsA),
+    contrib: buildContributions(flavorNet, editedIngredientsA)
+  };
+}
+
 async function applyEditsA() {
-  const score = computeScoreAvg(flavorMap, editedIngredientsA);
-  const coverage = computeCoverage(flavorMap, editedIngredientsA);
-  const heat = buildHeatmapLong(flavorMap, editedIngredientsA);
-  const contrib = buildContributions(flavorMap, editedIngredientsA);
+  const scored = await scoreEditsA();
+  if (!scored) return;
+  const { score, coverage, heat, contrib } = scored;
 
   await upsertVegaView(views, "heatmapA", "#heatmapA", heatmapSpec(heat));
   await upsertVegaView(views, "barsA", "#barsA", barsSpec(contrib));
@@ -246,6 +269,7 @@ async function loadA() {
 
   wireEditUIAOnce();
   renderChipsA();
+  await ensureFlavorRows(editedIngredientsA);
   renderSuggestionsA();
   updateDelta();
 }
@@ -259,23 +283,46 @@ async function loadB() {
 
 // ------------------ filters ------------------
 
-function refreshA() {
+// -> {list, total, truncated} with list holding (at least) the first
+// MAX_SHOW matches, or null when a newer filter call on the same side started
+// meanwhile; truncated when the search index could not expand a short word
+async function filteredList(side, cuisine, search) {
+  if (!searchIndex) {
+    const list = filterList(allIndex, cuisine, search);
+    return { list, total: list.length, truncated: false };
+  }
+  const seq = ++filterSeq[side];
+  const found = await searchIndex.search(cuisine, search);
+  const ids = found ? found.ids : null;
+  const truncated = found ? found.truncated : false;
+  const total = ids ? ids.length : searchIndex.count;
+  const first = ids
+    ? ids.subarray(0, MAX_SHOW)
+    : Uint32Array.from({ length: Math.min(MAX_SHOW, total) }, (_, i) => i);
+  const list = await searchIndex.entries(first);
+  return seq === filterSeq[side] ? { list, total, truncated } : null;
+}
+
+async function refreshA() {
   const cuisine = document.getElementById("cuisineSelectA").value;
   const search = document.getElementById("searchInputA").value;
   const selectA = document.getElementById("recipeSelectA");
   const keep = selectA.value || null;
 
-  const list = filterList(allIndex, cuisine, search);
-  fillRecipeSelect(selectA, list, keep);
+  const found = await filteredList("A", cuisine, search);
+  if (!found) return;
+  const { list, total, truncated } = found;
+  fillRecipeSelect(selectA, list, keep, total, truncated);
 
   if (list.length === 0) {
-    document.getElementById("metaA").innerHTML = `<span style="color:#b00"><b>No recipes match filters.</b></span>`;
+    const hint = truncated ? " A word matched too many ingredients; refine your search." : "";
+    document.getElementById("metaA").innerHTML = `<span style="color:#b00"><b>No recipes match filters.</b>${hint}</span>`;
     return;
   }
   loadA().catch(console.error);
 }
 
-function refreshB() {
+async function refreshB() {
   if (!compareEnabled) return;
 
   const cuisine = document.getElementById("cuisineSelectB").value;
@@ -283,11 +330,14 @@ function refreshB() {
   const selectB = document.getElementById("recipeSelectB");
   const keep = selectB.value || null;
 
-  const list = filterList(allIndex, cuisine, search);
-  fillRecipeSelect(selectB, list, keep);
+  const found = await filteredList("B", cuisine, search);
+  if (!found) return;
+  const { list, total, truncated } = found;
+  fillRecipeSelect(selectB, list, keep, total, truncated);
 
   if (list.length === 0) {
-    document.getElementById("metaB").innerHTML = `<span style="color:#b00"><b>No recipes match filters.</b></span>`;
+    const hint = truncated ? " A word matched too many ingredients; refine your search." : "";
+    document.getElementById("metaB").innerHTML = `<span style="color:#b00"><b>No recipes match filters.</b>${hint}</span>`;
     currentB = null;
     updateDelta();
     return;
@@ -308,7 +358,7 @@ function setCompareEnabled(enabled) {
     section.classList.remove("hidden");
     compareBtn.classList.add("hidden");
     closeBtn.classList.remove("hidden");
-    refreshB();
+    refreshB().catch(console.error);
   } else {
     section.classList.add("hidden");
     compareBtn.classList.remove("hidden");
@@ -321,24 +371,29 @@ function setCompareEnabled(enabled) {
 // ------------------ main ------------------
 
 async function main() {
-  allIndex = await fetchJSON("./data/index.json", "index.json");
-  flavorMap = await fetchJSON("./data/flavor_map.json", "flavor_map.json (run python src/export_flavor_map.py)");
-
-  // build neighbor map once for fast suggestions
-  neighborMap = buildNeighborMapFromFlavorMap(flavorMap);
-
-  const cuisines = uniqueCuisines(allIndex);
+  // the flavor network is only needed by the what-if editor; don't block on it
+  flavorNetReady = loadFlavorNet();
+  const url = scorerUrl();
+  if (url) remoteScorer = new RemoteScorer(url);
+  searchIndex = await loadSearchIndex();
+  let cuisines;
+  if (searchIndex) {
+    cuisines = searchIndex.manifest.cuisines.map(c => c.name);
+  } else {
+    allIndex = await fetchJSON("./data/index.json", "index.json");
+    cuisines = uniqueCuisines(allIndex);
+  }
   fillCuisineSelect(document.getElementById("cuisineSelectA"), cuisines);
   fillCuisineSelect(document.getElementById("cuisineSelectB"), cuisines);
 
   // A events
-  document.getElementById("cuisineSelectA").addEventListener("change", refreshA);
-  document.getElementById("searchInputA").addEventListener("input", refreshA);
+  document.getElementById("cuisineSelectA").addEventListener("change", () => refreshA().catch(console.error));
+  document.getElementById("searchInputA").addEventListener("input", () => refreshA().catch(console.error));
   document.getElementById("recipeSelectA").addEventListener("change", () => loadA().catch(console.error));
 
   // B events
-  document.getElementById("cuisineSelectB").addEventListener("change", refreshB);
-  document.getElementById("searchInputB").addEventListener("input", refreshB);
+  document.getElementById("cuisineSelectB").addEventListener("change", () => refreshB().catch(console.error));
+  document.getElementById("searchInputB").addEventListener("input", () => refreshB().catch(console.error));
   document.getElementById("recipeSelectB").addEventListener("change", () => loadB().catch(console.error));
 
   // compare
@@ -346,7 +401,7 @@ async function main() {
   document.getElementById("closeCompareBtn").addEventListener("click", () => setCompareEnabled(false));
 
   setCompareEnabled(false);
-  refreshA();
+  await refreshA();
 }
 
 main().catch((e) => {
@@ -3,7 +3,9 @@ export function canonKey(a, b) {
   return (a < b) ? `${a}|${b}` : `${b}|${a}`;
 }
 
+// flavorMap: the "a|b" -> weight dict, or a lookup from js/network.js
 export function pairWeight(flavorMap, a, b) {
+  if (typeof flavorMap?.weight === "function") return flavorMap.weight(a, b);
   const k = canonKey(a, b);
   if (!k) return 0;
   return flavorMap?.[k] ?? 0;
@@ -63,6 +65,48 @@ export function buildContributions(flavorMap, ings) {
   return out;
 }
 
+// Packed shard record (see src/recipe_shards.py) -> the recipe JSON shape
+export function expandPackedRecipe(rec, vocabulary) {
+  const ings = rec.ingredients.map(i => vocabulary[i]);
+  const n = ings.length;
+  // weights hold the upper triangle (i < j) row by row
+  const weight = (i, j) => {
+    if (i === j) return 0;
+    if (i > j) [i, j] = [j, i];
+    return rec.weights[i * n - (i * (i + 1)) / 2 + (j - i - 1)];
+  };
+
+  const heatmap = [];
+  for (let i = 0; i < n; i++) {
+    for (let j = 0; j < n; j++) {
+      heatmap.push({ x: ings[i], y: ings[j], value: weight(i, j) });
+    }
+  }
+
+  const contributions = ings.map((ingredient, i) => ({ ingredient, mean: rec.contributions[i] }));
+  contributions.sort((p, q) => q.mean - p.mean);
+
+  const out = {
+    id: rec.id,
+    cuisine: rec.cuisine,
+    ingredients: ings,
+    score_avg: rec.score_avg,
+    pair_coverage: rec.pair_coverage,
+    heatmap,
+    contributions
+  };
+
+  // precomputed additions (vocab IDs) and removals (ingredient positions)
+  if (rec.suggestions) {
+    const row = (ingredient, gain) => ({ ingredient, gain, score_avg: rec.score_avg + gain });
+    out.suggestions = {
+      add: rec.suggestions.add.map(([i, gain]) => row(vocabulary[i], gain)),
+      remove: rec.suggestions.remove.map(([p, gain]) => row(ings[p], gain))
+    };
+  }
+  return out;
+}
+
 export function normalizeIngredient(s) {
   return s.trim().toLowerCase().replace(/\s+/g, "_");
 }
@@ -0,0 +1,130 @@
+import { canonKey } from "./flavor.js";
+import { fetchJSON } from "./ui.js";
+
+// ------------------ compact flavor network (see src/export_flavor_map.py) ------------------
+
+const NET_DIR = "./data/flavor_net";
+
+export class FlavorNet {
+  constructor(manifest) {
+    this.names = manifest.names;
+    this.index = new Map(manifest.names.map((name, i) => [name, i]));
+    this.indptr = manifest.indptr;
+    this.ArrayType = manifest.dtype === "uint16" ? Uint16Array : Uint32Array;
+    this.width = this.ArrayType.BYTES_PER_ELEMENT;
+    this.rowsUrl = `${NET_DIR}/${manifest.rows}`;
+    this.rows = new Map(); // ingredient ID -> { ids, weights }
+    this.whole = null;     // full rows.bin, when the server ignores ranges
+    this.probed = false;   // whether a range request has been answered yet
+  }
+
+  rowFromBuffer(i, buf) {
+    const n = this.indptr[i + 1] - this.indptr[i];
+    return {
+      ids: new this.ArrayType(buf, 0, n),
+      weights: new this.ArrayType(buf, n * this.width, n)
+    };
+  }
+
+  async fetchRow(i) {
+    const start = 2 * this.width * this.indptr[i];
+    const end = 2 * this.width * this.indptr[i + 1];
+    if (start === end) return this.rowFromBuffer(i, new ArrayBuffer(0));
+    if (this.whole) return this.rowFromBuffer(i, this.whole.slice(start, end));
+
+    const resp = await fetch(this.rowsUrl, { headers: { Range: `bytes=${start}-${end - 1}` } });
+    if (!resp.ok) throw new Error(`Could not load flavor rows (${this.rowsUrl}): ${resp.status}`);
+    let buf = await resp.arrayBuffer();
+    this.probed = true;
+    // servers without range support send the whole file; keep it for later rows
+    if (resp.status === 200) {
+      this.whole = buf;
+      buf = buf.slice(start, end);
+    }
+    return this.rowFromBuffer(i, buf);
+  }
+
+  // Load the neighbour rows of every known ingredient in ings
+  async ensure(ings) {
+    const missing = [];
+    for (const name of ings) {
+      const i = this.index.get(name);
+      if (i !== undefined && !this.rows.has(i)) missing.push(i);
+    }
+    const unique = [...new Set(missing)];
+    // one request first, so a server without range support sends rows.bin only once
+    if (!this.probed && unique.length > 1) {
+      const first = unique.shift();
+      this.rows.set(first, await this.fetchRow(first));
+    }
+    const rows = await Promise.all(unique.map(i => this.fetchRow(i)));
+    unique.forEach((i, k) => this.rows.set(i, rows[k]));
+  }
+
+  weight(a, b) {
+    if (a === b) return 0;
+    const i = this.index.get(a);
+    const j = this.index.get(b);
+    if (i === undefined || j === undefined) return 0;
+    const row = this.rows.get(i);
+    if (!row) return 0;
+    // neighbour IDs are sorted
+    let lo = 0;
+    let hi = row.ids.length;
+    while (lo < hi) {
+      const mid = (lo + hi) >> 1;
+      if (row.ids[mid] < j) lo = mid + 1;
+      else hi = mid;
+    }
+    return row.ids[lo] === j ? row.weights[lo] : 0;
+  }
+
+  neighbors(ing) {
+    const row = this.rows.get(this.index.get(ing));
+    if (!row) return [];
+    const out = [];
+    for (let k = 0; k < row.ids.length; k++) {
+      out.push({ other: this.names[row.ids[k]], w: row.weights[k] });
+    }
+    return out;
+  }
+}
+
+// Monolithic flavor_map.json behind the same interface, for older exports
+export class FlavorMapLookup {
+  constructor(flavorMap) {
+    this.flavorMap = flavorMap;
+    this.neighborMap = {}; // ingredient -> [{other, w}]
+    for (const key of Object.keys(flavorMap)) {
+      const w = flavorMap[key];
+      const [a, b] = key.split("|");
+      if (!this.neighborMap[a]) this.neighborMap[a] = [];
+      if (!this.neighborMap[b]) this.neighborMap[b] = [];
+      this.neighborMap[a].push({ other: b, w });
+      this.neighborMap[b].push({ other: a, w });
+    }
+  }
+
+  async ensure() {}
+
+  weight(a, b) {
+    const k = canonKey(a, b);
+    if (!k) return 0;
+    return this.flavorMap[k] ?? 0;
+  }
+
+  neighbors(ing) {
+    return this.neighborMap[ing] || [];
+  }
+}
+
+export async function loadFlavorNet() {
+  const resp = await fetch(`${NET_DIR}/manifest.json`);
+  // dev servers answer missing files with index.html, so also check the type
+  if (resp.ok && resp.headers.get("content-type")?.includes("json")) {
+    return new FlavorNet(await resp.json());
+  }
+
+  const flavorMap = await fetchJSON("./data/flavor_map.json", "flavor_map.json (run python src/export_flavor_map.py)");
+  return new FlavorMapLookup(flavorMap);
+}
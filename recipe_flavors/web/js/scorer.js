@@ -0,0 +1,28 @@
+// ------------------ remote scoring (see src/scoring_service.py) ------------------
+
+// Open the app with ?scorer=http://127.0.0.1:8765 to score edits on the
+// local service instead of in the browser.
+export function scorerUrl() {
+  return new URLSearchParams(window.location.search).get("scorer");
+}
+
+export class RemoteScorer {
+  constructor(url) {
+    this.url = url.replace(/\/$/, "");
+    this.latest = 0; // only the newest edit's answer is used
+  }
+
+  // -> {score_avg, pair_coverage, heatmap, contributions}, or null when a
+  // newer edit was sent in the meantime
+  async score(ings) {
+    const ticket = ++this.latest;
+    const resp = await fetch(`${this.url}/score`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ recipes: [{ ingredients: ings }] })
+    });
+    if (!resp.ok) throw new Error(`Scoring service error ${resp.status}: ${await resp.text()}`);
+    const { results } = await resp.json();
+    return ticket === this.latest ? results[0] : null;
+  }
+}
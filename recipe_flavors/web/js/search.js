@@ -0,0 +1,243 @@
+import { tokenizeSearch } from "./ui.js";
+
+// ------------------ sharded search index (see src/search_index.py) ------------------
+
+const SEARCH_DIR = "./data/search";
+
+// most ingredients one typed word may expand to (by prefix or substring);
+// beyond that the match is reported as truncated and the UI asks for a
+// longer word
+const MAX_PREFIX_TERMS = 256;
+// typed words whose matches are kept (earlier words of a query are re-used
+// on every keystroke)
+const WORD_CACHE_SIZE = 64;
+
+function decodePostings(bytes) {
+  const out = new Uint32Array(bytes.length); // at least one byte per ID
+  let n = 0;
+  let value = 0;
+  let shift = 0;
+  let last = 0;
+  for (let k = 0; k < bytes.length; k++) {
+    const b = bytes[k];
+    value += (b & 0x7f) * 2 ** shift;
+    shift += 7;
+    if (!(b & 0x80)) {
+      last += value;
+      out[n++] = last;
+      value = 0;
+      shift = 0;
+    }
+  }
+  return out.subarray(0, n);
+}
+
+// first index in sorted a[lo..] with a[i] >= x, by galloping then bisection
+function gallop(a, lo, x) {
+  let step = 1;
+  let hi = lo;
+  while (hi < a.length && a[hi] < x) {
+    lo = hi + 1;
+    hi += step;
+    step *= 2;
+  }
+  hi = Math.min(hi, a.length);
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1;
+    if (a[mid] < x) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+}
+
+function intersect(a, b) {
+  if (a.length > b.length) [a, b] = [b, a];
+  const out = new Uint32Array(a.length);
+  let n = 0;
+  let j = 0;
+  for (let i = 0; i < a.length && j < b.length; i++) {
+    j = gallop(b, j, a[i]);
+    if (b[j] === a[i]) out[n++] = a[i];
+  }
+  return out.subarray(0, n);
+}
+
+// union of sorted ID lists below count, through a byte mask: linear in the
+// inputs plus count, instead of sorting their concatenation
+function union(lists, count) {
+  if (lists.length === 1) return lists[0];
+  const mask = new Uint8Array(count);
+  let total = 0;
+  for (const l of lists) {
+    for (let k = 0; k < l.length; k++) mask[l[k]] = 1;
+    total += l.length;
+  }
+  const out = new Uint32Array(Math.min(total, count));
+  let n = 0;
+  for (let id = 0; id < count; id++) {
+    if (mask[id]) out[n++] = id;
+  }
+  return out.subarray(0, n);
+}
+
+export class SearchIndex {
+  constructor(manifest) {
+    this.manifest = manifest;
+    this.count = manifest.count;
+    this.cuisines = new Map(manifest.cuisines.map(c => [c.name, c]));
+    this.tries = new Map();    // first character -> Promise<trie shard>
+    this.postings = new Map(); // "shard:offset" -> Promise<Uint32Array>
+    this.labels = new Map();   // label block -> Promise<string[]>
+    this.wholeShards = new Map(); // posting shard -> ArrayBuffer, when ranges are ignored
+    this.words = new Map();    // typed word -> Promise<Uint32Array>
+  }
+
+  cached(map, key, load) {
+    let p = map.get(key);
+    if (!p) {
+      p = load();
+      p.catch(() => map.delete(key));
+      map.set(key, p);
+    }
+    return p;
+  }
+
+  fetchJSON(file) {
+    return fetch(`${SEARCH_DIR}/${file}`).then(resp => {
+      if (!resp.ok) throw new Error(`Could not load ${file}: ${resp.status}`);
+      return resp.json();
+    });
+  }
+
+  async fetchPosting(shard, offset, length) {
+    if (length === 0) return new Uint32Array(0);
+    let buf = this.wholeShards.get(shard);
+    if (!buf) {
+      const url = `${SEARCH_DIR}/${this.manifest.postings[shard]}`;
+      const resp = await fetch(url, { headers: { Range: `bytes=${offset}-${offset + length - 1}` } });
+      if (!resp.ok) throw new Error(`Could not load ${url}: ${resp.status}`);
+      buf = await resp.arrayBuffer();
+      if (resp.status === 206) return decodePostings(new Uint8Array(buf));
+      // servers without range support send the whole shard; keep it
+      this.wholeShards.set(shard, buf);
+    }
+    return decodePostings(new Uint8Array(buf, offset, length));
+  }
+
+  posting([shard, offset, length]) {
+    return this.cached(this.postings, `${shard}:${offset}`, () => this.fetchPosting(shard, offset, length));
+  }
+
+  trie(ch) {
+    const file = this.manifest.tries[ch];
+    if (!file) return Promise.resolve(null);
+    return this.cached(this.tries, ch, () => this.fetchJSON(file));
+  }
+
+  // {terms, truncated}: posting locations of the ingredients having a word
+  // starting with prefix; truncated when more than MAX_PREFIX_TERMS do
+  async prefixTerms(prefix) {
+    const none = { terms: [], truncated: false };
+    const shard = await this.trie(prefix[0]);
+    if (!shard) return none;
+    let node = shard.trie;
+    for (const ch of prefix.slice(1)) {
+      node = node.c?.[ch];
+      if (!node) return none;
+    }
+    const ids = new Set();
+    const stack = [node];
+    while (stack.length && ids.size < MAX_PREFIX_TERMS) {
+      const n = stack.pop();
+      for (const t of n.t || []) ids.add(t);
+      for (const child of Object.values(n.c || {})) stack.push(child);
+    }
+    // [name, recipes, shard, offset, length]
+    return { terms: [...ids].map(t => shard.terms[t]), truncated: stack.length > 0 };
+  }
+
+  // {terms, truncated} like prefixTerms, for ingredients whose name contains
+  // text anywhere; loads every trie shard, so only used as a fallback
+  async substringTerms(text) {
+    const shards = await Promise.all(Object.keys(this.manifest.tries).map(ch => this.trie(ch)));
+    const terms = [];
+    for (const shard of shards) {
+      for (const t of Object.values(shard?.terms || {})) {
+        if (!t[0].toLowerCase().includes(text)) continue;
+        if (terms.length >= MAX_PREFIX_TERMS) return { terms, truncated: true };
+        terms.push(t);
+      }
+    }
+    return { terms, truncated: false };
+  }
+
+  // {ids, truncated}: recipes matching one typed word. Words of ingredient
+  // and cuisine names are matched by prefix; when nothing starts with the
+  // word, names containing it anywhere match instead (as the plain label
+  // filter does, so "ato" still finds tomato)
+  async matchWord(word) {
+    let { terms, truncated } = await this.prefixTerms(word);
+    let cuisines = [...this.cuisines].filter(([name]) => name.toLowerCase().startsWith(word));
+    if (!terms.length && !cuisines.length) {
+      ({ terms, truncated } = await this.substringTerms(word));
+      cuisines = [...this.cuisines].filter(([name]) => name.toLowerCase().includes(word));
+    }
+    const lists = await Promise.all([
+      ...terms.map(t => this.posting(t.slice(2))),
+      ...cuisines.map(([, c]) => this.posting([c.shard, c.offset, c.length])),
+    ]);
+    return { ids: lists.length ? union(lists, this.count) : new Uint32Array(0), truncated };
+  }
+
+  wordPosting(word) {
+    if (this.words.size >= WORD_CACHE_SIZE && !this.words.has(word)) {
+      this.words.delete(this.words.keys().next().value);
+    }
+    return this.cached(this.words, word, () => this.matchWord(word));
+  }
+
+  // {ids, truncated} with the sorted matching recipe IDs, or null when
+  // nothing is filtered; truncated when a word matched too many ingredients
+  // to expand them all, so ids may miss recipes
+  async search(cuisine, text) {
+    const words = tokenizeSearch(text);
+    const parts = [];
+    if (cuisine !== "All") {
+      const c = this.cuisines.get(cuisine);
+      if (!c) return { ids: new Uint32Array(0), truncated: false };
+      parts.push(this.posting([c.shard, c.offset, c.length]).then(ids => ({ ids, truncated: false })));
+    }
+    for (const word of words) parts.push(this.wordPosting(word));
+    if (!parts.length) return null;
+
+    const matches = await Promise.all(parts);
+    const truncated = matches.some(m => m.truncated);
+    const lists = matches.map(m => m.ids).sort((a, b) => a.length - b.length);
+    let result = lists[0];
+    for (const l of lists.slice(1)) {
+      if (!result.length) break;
+      result = intersect(result, l);
+    }
+    return { ids: result, truncated };
+  }
+
+  labelBlock(k) {
+    return this.cached(this.labels, k, () => this.fetchJSON(this.manifest.labels[k]));
+  }
+
+  // [{id, label}] for recipe IDs, fetching their label blocks
+  async entries(ids) {
+    const block = this.manifest.label_block;
+    const blocks = [...new Set(Array.from(ids, id => Math.floor(id / block)))];
+    const loaded = new Map();
+    await Promise.all(blocks.map(async k => loaded.set(k, await this.labelBlock(k))));
+    return Array.from(ids, id => ({ id, label: loaded.get(Math.floor(id / block))[id % block] }));
+  }
+}
+
+// null when the export has no search index (older exports)
+export async function loadSearchIndex() {
+  const resp = await fetch(`${SEARCH_DIR}/manifest.json`);
+  if (!resp.ok || !resp.headers.get("content-type")?.includes("json")) return null;
+  return new SearchIndex(await resp.json());
+}
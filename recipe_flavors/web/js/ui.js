@@ -1,3 +1,5 @@
+import { expandPackedRecipe } from "./flavor.js";
+
 export function tokenizeSearch(s) {
   return s.toLowerCase().trim().split(/\s+/).filter(Boolean);
 }
@@ -17,10 +19,14 @@ export function filterList(allIndex, cuisineValue, searchValue) {
   });
 }
 
-export function fillRecipeSelect(selectEl, list, keepId = null) {
+export const MAX_SHOW = 400;
+
+// total: number of matches when list only holds the first MAX_SHOW of them
+// truncated: the search skipped ingredients of a too-short word
+export function fillRecipeSelect(selectEl, list, keepId = null, total = list.length, truncated = false) {
   selectEl.innerHTML = "";
 
-  const maxShow = 400;
+  const maxShow = MAX_SHOW;
   const shown = list.slice(0, maxShow);
 
   for (const item of shown) {
@@ -30,10 +36,17 @@ export function fillRecipeSelect(selectEl, list, keepId = null) {
     selectEl.appendChild(opt);
   }
 
-  if (list.length > maxShow) {
+  if (total > maxShow) {
     const opt = document.createElement("option");
     opt.disabled = true;
-    opt.textContent = `… showing first ${maxShow} of ${list.length} (refine search)`;
+    opt.textContent = `… showing first ${maxShow} of ${total} (refine search)`;
+    selectEl.appendChild(opt);
+  }
+
+  if (truncated) {
+    const opt = document.createElement("option");
+    opt.disabled = true;
+    opt.textContent = "… too many ingredients match a short word; some recipes may be missing (refine your search)";
     selectEl.appendChild(opt);
   }
 
@@ -65,7 +78,49 @@ export async function fetchJSON(url, niceNameForError) {
   return await resp.json();
 }
 
+// ------------------ packed recipe shards ------------------
+
+const SHARD_DIR = "./data/shards";
+let shardManifest; // undefined = not probed yet, null = no shards exported
+const shardOffsets = new Map(); // shard file -> byte offsets
+
+async function loadShardManifest() {
+  if (shardManifest !== undefined) return shardManifest;
+  const resp = await fetch(`${SHARD_DIR}/manifest.json`);
+  // dev servers answer missing files with index.html, so also check the type
+  const isJson = resp.headers.get("content-type")?.includes("json");
+  shardManifest = resp.ok && isJson ? await resp.json() : null;
+  return shardManifest;
+}
+
+async function fetchRange(url, start, end) {
+  const resp = await fetch(url, { headers: { Range: `bytes=${start}-${end - 1}` } });
+  if (!resp.ok) throw new Error(`Could not load recipe shard (${url}): ${resp.status}`);
+  let buf = await resp.arrayBuffer();
+  // servers without range support send the whole file
+  if (resp.status === 200) buf = buf.slice(start, end);
+  return new TextDecoder().decode(buf);
+}
+
+async function fetchPackedRecipe(manifest, recipeId) {
+  const id = Number(recipeId);
+  const shard = manifest.shards[Math.floor(id / manifest.shard_size)];
+  if (!shard) throw new Error(`Recipe ${recipeId} is not in any shard`);
+
+  let offsets = shardOffsets.get(shard.file);
+  if (!offsets) {
+    offsets = await fetchJSON(`${SHARD_DIR}/${shard.index}`, "shard index");
+    shardOffsets.set(shard.file, offsets);
+  }
+  const k = id - shard.first_id;
+  const text = await fetchRange(`${SHARD_DIR}/${shard.file}`, offsets[k], offsets[k + 1]);
+  return expandPackedRecipe(JSON.parse(text), manifest.vocabulary);
+}
+
 export async function fetchRecipe(recipeId) {
+  const manifest = await loadShardManifest();
+  if (manifest) return await fetchPackedRecipe(manifest, recipeId);
+
   const url = `./data/recipe_${String(recipeId).padStart(4, "0")}.json`;
   return await fetchJSON(url, "recipe JSON");
 }
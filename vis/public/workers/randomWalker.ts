@@ -83,9 +83,7 @@ function randomSample<T>(array: T[]): T {
 
 // Helper function to get ingredients from recipe
 function getIngredientsFromRecipe(recipe: Recipe): string[] {
-  return recipe.NER_Simple.slice(1, -1)
-    .split(",")
-    .map((ing) => ing.trim().replaceAll("'", "").replaceAll('"', ""));
+  return recipe.ingredients;
 }
 
 // The main random walk algorithm - moved to worker
@@ -8,6 +8,7 @@ import {
 } from "./flavor/flavor";
 
 import { heatmapSpec, barsSpec, upsertVegaView } from "./flavor/charts";
+import { loadFlavorNet, type FlavorLookup } from "./flavor/network";
 
 import {
   uniqueCuisines,
@@ -21,7 +22,9 @@ import {
 export default function FlavourComponent() {
   useEffect(() => {
     let allIndex: any[] = [];
-    let flavorMap: Record<string, number> | null = null;
+    // flavor network lookup; rows are fetched for the ingredients in play
+    let flavorNetReady: Promise<FlavorLookup> | null = null;
+    let flavorNet: FlavorLookup | null = null;
 
     const views: Record<string, any> = {
       heatmapA: null,
@@ -40,11 +43,6 @@ export default function FlavourComponent() {
     let originalCoverageA: number | null = null;
     let editWiredA = false;
 
-    let neighborMap: Record<
-      string,
-      Array<{ other: string; w: number }>
-    > | null = null;
-
     function setMeta(prefix: string, data: any) {
       const meta = document.getElementById(`meta${prefix}`);
       if (!meta) return;
@@ -101,25 +99,21 @@ export default function FlavourComponent() {
   `;
     }
 
-    function buildNeighborMapFromFlavorMap(fm: Record<string, number>) {
-      const nm: Record<string, Array<{ other: string; w: number }>> = {};
-      for (const key of Object.keys(fm)) {
-        const w = fm[key];
-        const [a, b] = key.split("|");
-        if (!nm[a]) nm[a] = [];
-        if (!nm[b]) nm[b] = [];
-        nm[a].push({ other: b, w });
-        nm[b].push({ other: a, w });
-      }
-      return nm;
+    async function ensureFlavorRows(ings: string[]) {
+      flavorNet = await flavorNetReady!;
+      await flavorNet.ensure(ings);
     }
 
-    function topSuggestedAdditions(nm: any, currentIngs: string[], k = 10) {
+    function topSuggestedAdditions(
+      net: FlavorLookup,
+      currentIngs: string[],
+      k = 10
+    ) {
       const currentSet = new Set(currentIngs);
       const stats = new Map();
 
       for (const ing of currentIngs) {
-        const neigh = nm[ing] || [];
+        const neigh = net.neighbors(ing);
         for (const { other, w } of neigh) {
           if (currentSet.has(other)) continue;
 
@@ -145,11 +139,11 @@ export default function FlavourComponent() {
 
     function renderSuggestionsA() {
       const box = document.getElementById("suggestA");
-      if (!box || !editedIngredientsA || !neighborMap) return;
+      if (!box || !editedIngredientsA || !flavorNet) return;
 
       box.innerHTML = "";
 
-      const top = topSuggestedAdditions(neighborMap, editedIngredientsA, 10);
+      const top = topSuggestedAdditions(flavorNet, editedIngredientsA, 10);
 
       if (top.length === 0) {
         box.innerHTML = `<span class="text-sm text-zinc-300">No suggestions (try adding more base ingredients).</span>`;
@@ -195,11 +189,12 @@ export default function FlavourComponent() {
     }
 
     async function applyEditsA() {
-      if (!flavorMap || !editedIngredientsA) return;
-      const score = computeScoreAvg(flavorMap, editedIngredientsA);
-      const coverage = computeCoverage(flavorMap, editedIngredientsA);
-      const heat = buildHeatmapLong(flavorMap, editedIngredientsA);
-      const contrib = buildContributions(flavorMap, editedIngredientsA);
+      if (!flavorNetReady || !editedIngredientsA) return;
+      await ensureFlavorRows(editedIngredientsA);
+      const score = computeScoreAvg(flavorNet!, editedIngredientsA);
+      const coverage = computeCoverage(flavorNet!, editedIngredientsA);
+      const heat = buildHeatmapLong(flavorNet!, editedIngredientsA);
+      const contrib = buildContributions(flavorNet!, editedIngredientsA);
 
       await upsertVegaView(views, "heatmapA", "#heatmapA", heatmapSpec(heat));
       await upsertVegaView(views, "barsA", "#barsA", barsSpec(contrib));
@@ -279,6 +274,7 @@ export default function FlavourComponent() {
 
       wireEditUIAOnce();
       renderChipsA();
+      await ensureFlavorRows(editedIngredientsA);
       renderSuggestionsA();
       updateDelta();
     }
@@ -366,13 +362,9 @@ export default function FlavourComponent() {
     }
 
     async function main() {
+      // the flavor network is only needed by the what-if editor; don't block on it
+      flavorNetReady = loadFlavorNet();
       allIndex = await fetchJSON(`/data/index.json`, "index.json");
-      flavorMap = await fetchJSON(
-        `/data/flavor_map.json`,
-        "flavor_map.json (run python src/export_flavor_map.py)"
-      );
-
-      neighborMap = buildNeighborMapFromFlavorMap(flavorMap);
 
       const cuisines = uniqueCuisines(allIndex);
       fillCuisineSelect(
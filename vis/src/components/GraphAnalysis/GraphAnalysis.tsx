@@ -5,17 +5,12 @@ import { GraphVisualization } from "./GraphVisualization";
 import { RecipeSelector } from "./RecipeSelector";
 import { ValueSlider } from "./ValueSlider";
 import { useNeighborhoodExploration } from "./useNeighborhoodExploration";
+import { loadCorpus, type Corpus, type RecipeDetails } from "./corpus";
+import type { Recipe } from "./graphHelpers";
 import type { FreqMap } from "../../App";
 import { Loader2, AlertCircle, RefreshCw } from "lucide-react";
 
-export interface Recipe {
-  index: number;
-  title: string;
-  ingredients: string;
-  directions: string;
-  link: string;
-  NER_Simple: string;
-}
+export type { Recipe };
 
 interface graphAnalysisData {
   title: string;
@@ -44,6 +39,8 @@ const GraphAnalysisComponent = ({ freqMap }: { freqMap: FreqMap }) => {
   const [data, setData] = useState<Recipe[] | null>(null);
   const [selected, setSelected] = useState<Recipe[]>([]);
   const [selectedRecipe, setSelectedRecipe] = useState<Recipe | null>(null);
+  const [details, setDetails] = useState<RecipeDetails | null>(null);
+  const corpusRef = useRef<Corpus | null>(null);
   const [isLoadingData, setIsLoadingData] = useState(true);
   const [error, setError] = useState<string | null>(null);
 
@@ -65,13 +62,9 @@ const GraphAnalysisComponent = ({ freqMap }: { freqMap: FreqMap }) => {
         setIsLoadingData(true);
         setError(null);
 
-        const response = await fetch("/recipes.json");
-        if (!response.ok) {
-          throw new Error(`Failed to fetch recipes: ${response.status}`);
-        }
-
-        const d = await response.json();
-        setData(d);
+        const corpus = await loadCorpus();
+        corpusRef.current = corpus;
+        setData(corpus.recipes);
       } catch (err) {
         console.error("Error loading recipes:", err);
         setError("Failed to load recipe data. Please try again later.");
@@ -90,6 +83,22 @@ const GraphAnalysisComponent = ({ freqMap }: { freqMap: FreqMap }) => {
     };
   }, []);
 
+  // Links and directions are fetched per recipe, only when one is opened
+  useEffect(() => {
+    setDetails(null);
+    if (!selectedRecipe || !corpusRef.current) return;
+    let cancelled = false;
+    corpusRef.current
+      .details(selectedRecipe)
+      .then((d) => {
+        if (!cancelled) setDetails(d);
+      })
+      .catch((err) => console.error("Error loading recipe details:", err));
+    return () => {
+      cancelled = true;
+    };
+  }, [selectedRecipe]);
+
   const handleRecipeSelect = useCallback((recipe: Recipe) => {
     setSelected((prevSelected) => {
       if (prevSelected.some((r) => r.index === recipe.index)) {
@@ -476,7 +485,7 @@ const GraphAnalysisComponent = ({ freqMap }: { freqMap: FreqMap }) => {
                       {selectedRecipe.title}
                     </h4>
                     <a
-                      href={selectedRecipe.link}
+                      href={details?.link}
                       target="_blank"
                       className="text-yellow-300 hover:text-yellow-500 underline text-sm transition-colors"
                     >
@@ -506,8 +515,11 @@ const GraphAnalysisComponent = ({ freqMap }: { freqMap: FreqMap }) => {
                     <h5 className="text-lg font-semibold text-yellow-300 mb-2">
                       Directions
                     </h5>
-                    <div className="text-gray-300 bg-zinc-900/50 p-3 rounded border border-zinc-700 text-sm max-h-48 overflow-y-auto">
-                      {selectedRecipe.directions || "No directions available"}
+                    <div className="text-gray-300 bg-zinc-900/50 p-3 rounded border border-zinc-700 text-sm max-h-48 overflow-y-auto whitespace-pre-line">
+                      {details === null
+                        ? "Loading directions..."
+                        : details.directions.join("\n") ||
+                          "No directions available"}
                     </div>
                   </div>
                 </div>
@@ -524,10 +536,7 @@ const GraphAnalysisComponent = ({ freqMap }: { freqMap: FreqMap }) => {
 
 // Helper function to get ingredients from recipe
 const getIngredientsFromRecipe = (recipe: Recipe): string[] => {
-  return recipe.NER_Simple.slice(1, -1)
-    .split(",")
-    .map((ing) => ing.trim().replaceAll("'", "").replaceAll('"', ""))
-    .filter((ing) => ing.length > 0);
+  return recipe.ingredients;
 };
 
 export const GraphAnalysis = memo(GraphAnalysisComponent);
@@ -0,0 +1,174 @@
+import type { Recipe } from "./graphHelpers";
+
+// ------------------ columnar recipe corpus (see data_proc/export_corpus.py) ------------------
+
+type CorpusManifest = {
+  format: string;
+  count: number;
+  vocab: string[];
+  id_dtype: "uint16" | "uint32";
+  details_block: number;
+  details_offsets: number[];
+  files: {
+    ingredient_sizes: string;
+    ingredient_ids: string;
+    titles: string;
+    details: string;
+  };
+};
+
+export type RecipeDetails = {
+  index: number; // row in the source CSV
+  link: string;
+  directions: string[];
+};
+
+export interface Corpus {
+  recipes: Recipe[];
+  details(recipe: Recipe): Promise<RecipeDetails>;
+}
+
+const CORPUS_DIR = "/corpus";
+
+async function fetchOk(url: string, init?: RequestInit) {
+  const resp = await fetch(url, init);
+  if (!resp.ok) throw new Error(`Failed to fetch ${url}: ${resp.status}`);
+  return resp;
+}
+
+// Columns are gzipped at export time; inflate them here unless the server
+// already did (some send .gz files with Content-Encoding: gzip)
+async function fetchGzip(url: string): Promise<ArrayBuffer> {
+  const buf = await (await fetchOk(url)).arrayBuffer();
+  const head = new Uint8Array(buf, 0, Math.min(2, buf.byteLength));
+  if (head[0] !== 0x1f || head[1] !== 0x8b) return buf;
+  const stream = new Blob([buf])
+    .stream()
+    .pipeThrough(new DecompressionStream("gzip"));
+  return new Response(stream).arrayBuffer();
+}
+
+export class ColumnarCorpus implements Corpus {
+  manifest: CorpusManifest;
+  recipes: Recipe[];
+  detailsUrl: string;
+  blocks = new Map<number, Promise<RecipeDetails[]>>();
+  whole: ArrayBuffer | null = null; // full details.jsonl, when the server ignores ranges
+
+  constructor(
+    manifest: CorpusManifest,
+    sizes: Uint8Array,
+    ids: Uint16Array | Uint32Array,
+    titles: string[]
+  ) {
+    this.manifest = manifest;
+    this.detailsUrl = `${CORPUS_DIR}/${manifest.files.details}`;
+    const vocab = manifest.vocab;
+    this.recipes = new Array(manifest.count);
+    let offset = 0;
+    for (let r = 0; r < manifest.count; r++) {
+      const n = sizes[r];
+      const ingredients = new Array<string>(n);
+      for (let k = 0; k < n; k++) ingredients[k] = vocab[ids[offset + k]];
+      offset += n;
+      this.recipes[r] = { index: r, title: titles[r], ingredients };
+    }
+  }
+
+  async fetchBlock(b: number): Promise<RecipeDetails[]> {
+    const start = this.manifest.details_offsets[b];
+    const end = this.manifest.details_offsets[b + 1];
+    let buf: ArrayBuffer;
+    if (this.whole) {
+      buf = this.whole.slice(start, end);
+    } else {
+      const resp = await fetchOk(this.detailsUrl, {
+        headers: { Range: `bytes=${start}-${end - 1}` },
+      });
+      buf = await resp.arrayBuffer();
+      // servers without range support send the whole file; keep it for later blocks
+      if (resp.status === 200) {
+        this.whole = buf;
+        buf = buf.slice(start, end);
+      }
+    }
+    return new TextDecoder()
+      .decode(buf)
+      .split("\n")
+      .filter((line) => line.length > 0)
+      .map((line) => JSON.parse(line) as RecipeDetails);
+  }
+
+  details(recipe: Recipe) {
+    const b = Math.floor(recipe.index / this.manifest.details_block);
+    let block = this.blocks.get(b);
+    if (!block) {
+      block = this.fetchBlock(b);
+      block.catch(() => this.blocks.delete(b));
+      this.blocks.set(b, block);
+    }
+    return block.then(
+      (rows) => rows[recipe.index % this.manifest.details_block]
+    );
+  }
+}
+
+// recipes.json rows from older exports (lists stored as strings)
+type LegacyRecipe = {
+  index: number;
+  title: string;
+  directions: string;
+  link: string;
+  NER_Simple: string;
+};
+
+export class LegacyCorpus implements Corpus {
+  recipes: Recipe[];
+  rows: LegacyRecipe[];
+
+  constructor(rows: LegacyRecipe[]) {
+    this.rows = rows;
+    this.recipes = rows.map((row, r) => ({
+      index: r,
+      title: row.title,
+      ingredients: row.NER_Simple.slice(1, -1)
+        .split(",")
+        .map((ing) => ing.trim().replaceAll("'", "").replaceAll('"', ""))
+        .filter((ing) => ing.length > 0),
+    }));
+  }
+
+  async details(recipe: Recipe) {
+    const row = this.rows[recipe.index];
+    let directions: string[];
+    try {
+      directions = JSON.parse(row.directions);
+    } catch {
+      directions = [row.directions];
+    }
+    return { index: row.index, link: row.link, directions };
+  }
+}
+
+export async function loadCorpus(): Promise<Corpus> {
+  const resp = await fetch(`${CORPUS_DIR}/manifest.json`);
+  // dev servers answer unknown paths with index.html
+  if (resp.ok && resp.headers.get("content-type")?.includes("json")) {
+    const manifest = (await resp.json()) as CorpusManifest;
+    const [sizes, ids, titles] = await Promise.all([
+      fetchGzip(`${CORPUS_DIR}/${manifest.files.ingredient_sizes}`),
+      fetchGzip(`${CORPUS_DIR}/${manifest.files.ingredient_ids}`),
+      fetchGzip(`${CORPUS_DIR}/${manifest.files.titles}`),
+    ]);
+    const IdArray = manifest.id_dtype === "uint16" ? Uint16Array : Uint32Array;
+    return new ColumnarCorpus(
+      manifest,
+      new Uint8Array(sizes),
+      new IdArray(ids),
+      new TextDecoder().decode(titles).split("\n")
+    );
+  }
+
+  const rows = (await (await fetchOk("/recipes.json")).json()) as LegacyRecipe[];
+  return new LegacyCorpus(rows);
+}
@@ -1,13 +1,12 @@
 import type { FreqMap } from "../../App";
 import type { Graph, GraphEdge as GE, GraphNode as GN } from "reagraph";
 
+// A recipe of the loaded corpus; index is its position in the corpus.
+// Links and directions are fetched on demand (see corpus.ts).
 export interface Recipe {
   index: number;
   title: string;
-  ingredients: string;
-  directions: string;
-  link: string;
-  NER_Simple: string;
+  ingredients: string[];
 }
 
 export interface Ingredient {
@@ -56,12 +55,7 @@ function createSymmetricEdgeId(id1: string, id2: string): string {
 }
 
 export const getIngredientsFromRecipe = (recipe: Recipe): string[] => {
-  return (
-    recipe.NER_Simple.slice(1, -1)
-      .split(",")
-      // .map((ing) => ing.trim().replaceAll("'", ""));
-      .map((ing) => ing.trim().replaceAll("'", "").replaceAll('"', ""))
-  );
+  return recipe.ingredients;
 };
 
 export function constructRecipeGraph(
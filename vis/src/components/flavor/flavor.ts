@@ -3,18 +3,25 @@ export function canonKey(a: string, b: string) {
   return a < b ? `${a}|${b}` : `${b}|${a}`;
 }
 
+type WeightLookup = { weight(a: string, b: string): number };
+
+// the "a|b" -> weight dict, or a lookup from ./network
+export type FlavorMap = Record<string, number> | WeightLookup;
+
 export function pairWeight(
-  flavorMap: Record<string, number>,
+  flavorMap: FlavorMap,
   a: string,
   b: string
 ) {
+  if (typeof flavorMap?.weight === "function")
+    return (flavorMap as WeightLookup).weight(a, b);
   const k = canonKey(a, b);
   if (!k) return 0;
-  return flavorMap?.[k] ?? 0;
+  return (flavorMap as Record<string, number>)?.[k] ?? 0;
 }
 
 export function computeScoreAvg(
-  flavorMap: Record<string, number>,
+  flavorMap: FlavorMap,
   ings: string[]
 ) {
   const n = ings.length;
@@ -31,7 +38,7 @@ export function computeScoreAvg(
 }
 
 export function computeCoverage(
-  flavorMap: Record<string, number>,
+  flavorMap: FlavorMap,
   ings: string[]
 ) {
   const n = ings.length;
@@ -48,7 +55,7 @@ export function computeCoverage(
 }
 
 export function buildHeatmapLong(
-  flavorMap: Record<string, number>,
+  flavorMap: FlavorMap,
   ings: string[]
 ) {
   const out: Array<{ x: string; y: string; value: number }> = [];
@@ -61,7 +68,7 @@ export function buildHeatmapLong(
 }
 
 export function buildContributions(
-  flavorMap: Record<string, number>,
+  flavorMap: FlavorMap,
   ings: string[]
 ) {
   const out: Array<{ ingredient: string; mean: number }> = [];
@@ -79,6 +86,80 @@ export function buildContributions(
   return out;
 }
 
+export type PackedRecipe = {
+  id: number;
+  cuisine: string;
+  ingredients: number[];
+  score_avg: number;
+  pair_coverage: number;
+  weights: number[];
+  contributions: number[];
+  suggestions?: {
+    add: Array<[number, number]>; // [vocab ID, gain]
+    remove: Array<[number, number]>; // [ingredient position, gain]
+  };
+};
+
+export type Suggestion = { ingredient: string; gain: number; score_avg: number };
+
+// Packed shard record (see recipe_flavors/src/recipe_shards.py) -> recipe JSON shape
+export function expandPackedRecipe(rec: PackedRecipe, vocabulary: string[]) {
+  const ings = rec.ingredients.map((i) => vocabulary[i]);
+  const n = ings.length;
+  // weights hold the upper triangle (i < j) row by row
+  const weight = (i: number, j: number) => {
+    if (i === j) return 0;
+    if (i > j) [i, j] = [j, i];
+    return rec.weights[i * n - (i * (i + 1)) / 2 + (j - i - 1)];
+  };
+
+  const heatmap: Array<{ x: string; y: string; value: number }> = [];
+  for (let i = 0; i < n; i++) {
+    for (let j = 0; j < n; j++) {
+      heatmap.push({ x: ings[i], y: ings[j], value: weight(i, j) });
+    }
+  }
+
+  const contributions = ings.map((ingredient, i) => ({
+    ingredient,
+    mean: rec.contributions[i],
+  }));
+  contributions.sort((p, q) => q.mean - p.mean);
+
+  const out: {
+    id: number;
+    cuisine: string;
+    ingredients: string[];
+    score_avg: number;
+    pair_coverage: number;
+    heatmap: typeof heatmap;
+    contributions: typeof contributions;
+    suggestions?: { add: Suggestion[]; remove: Suggestion[] };
+  } = {
+    id: rec.id,
+    cuisine: rec.cuisine,
+    ingredients: ings,
+    score_avg: rec.score_avg,
+    pair_coverage: rec.pair_coverage,
+    heatmap,
+    contributions,
+  };
+
+  // precomputed additions (vocab IDs) and removals (ingredient positions)
+  if (rec.suggestions) {
+    const row = (ingredient: string, gain: number): Suggestion => ({
+      ingredient,
+      gain,
+      score_avg: rec.score_avg + gain,
+    });
+    out.suggestions = {
+      add: rec.suggestions.add.map(([i, gain]) => row(vocabulary[i], gain)),
+      remove: rec.suggestions.remove.map(([p, gain]) => row(ings[p], gain)),
+    };
+  }
+  return out;
+}
+
 export function normalizeIngredient(s: string) {
   return s.trim().toLowerCase().replace(/\s+/g, "_");
 }
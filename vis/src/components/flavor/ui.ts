@@ -1,3 +1,5 @@
+import { expandPackedRecipe, type PackedRecipe } from "./flavor";
+
 export function tokenizeSearch(s: string) {
   return s.toLowerCase().trim().split(/\s+/).filter(Boolean);
 }
@@ -79,7 +81,74 @@ export async function fetchJSON(url: string, niceNameForError: string) {
   return await resp.json();
 }
 
+// ------------------ packed recipe shards ------------------
+
+type ShardManifest = {
+  format: string;
+  count: number;
+  shard_size: number;
+  vocabulary: string[];
+  shards: Array<{ file: string; index: string; first_id: number; count: number }>;
+};
+
+const SHARD_DIR = "/data/shards";
+let shardManifest: ShardManifest | null | undefined; // undefined = not probed yet
+const shardOffsets = new Map<string, number[]>();
+
+async function loadShardManifest() {
+  if (shardManifest !== undefined) return shardManifest;
+  const resp = await fetch(`${SHARD_DIR}/manifest.json`);
+  // dev servers answer missing files with index.html, so also check the type
+  const isJson = resp.headers.get("content-type")?.includes("json");
+  shardManifest =
+    resp.ok && isJson ? ((await resp.json()) as ShardManifest) : null;
+  return shardManifest;
+}
+
+async function fetchRange(url: string, start: number, end: number) {
+  const resp = await fetch(url, {
+    headers: { Range: `bytes=${start}-${end - 1}` },
+  });
+  if (!resp.ok)
+    throw new Error(`Could not load recipe shard (${url}): ${resp.status}`);
+  let buf = await resp.arrayBuffer();
+  // servers without range support send the whole file
+  if (resp.status === 200) buf = buf.slice(start, end);
+  return new TextDecoder().decode(buf);
+}
+
+async function fetchPackedRecipe(
+  manifest: ShardManifest,
+  recipeId: string | number
+) {
+  const id = Number(recipeId);
+  const shard = manifest.shards[Math.floor(id / manifest.shard_size)];
+  if (!shard) throw new Error(`Recipe ${recipeId} is not in any shard`);
+
+  let offsets = shardOffsets.get(shard.file);
+  if (!offsets) {
+    offsets = (await fetchJSON(
+      `${SHARD_DIR}/${shard.index}`,
+      "shard index"
+    )) as number[];
+    shardOffsets.set(shard.file, offsets);
+  }
+  const k = id - shard.first_id;
+  const text = await fetchRange(
+    `${SHARD_DIR}/${shard.file}`,
+    offsets[k],
+    offsets[k + 1]
+  );
+  return expandPackedRecipe(
+    JSON.parse(text) as PackedRecipe,
+    manifest.vocabulary
+  );
+}
+
 export async function fetchRecipe(recipeId: string | number) {
+  const manifest = await loadShardManifest();
+  if (manifest) return await fetchPackedRecipe(manifest, recipeId);
+
   const url = `/data/recipe_${String(recipeId).padStart(4, "0")}.json`;
   return await fetchJSON(url, "recipe JSON");
 }